@@ -1,4 +1,5 @@
 import os
+import sys
 from pathlib import Path
 from decouple import config
 
@@ -24,6 +25,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'rh.compressao.CompressaoMiddleware',
+    'rh.middleware.InstrumentacaoMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -36,15 +39,23 @@ ROOT_URLCONF = 'hr_manager.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'rh.instrumentacao.DjangoTemplatesInstrumentado',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'rh.context_processors.cache_empresa',
+            ],
+            # Templates compilados uma vez por processo; em DEBUG o autoreload
+            # do runserver limpa o cache quando um template muda
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
             ],
         },
     },
@@ -74,6 +85,11 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    # collectstatic grava nomes com hash e variantes .br/.gz (rh.compressao)
+    'staticfiles': {'BACKEND': 'rh.compressao.EstaticosComprimidos'},
+}
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -92,3 +108,77 @@ MESSAGE_STORAGE = 'django.contrib.messages.storage.session.SessionStorage'
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 AUTH_USER_MODEL = 'rh.Usuario'
+
+# Instrumentação de desempenho (rh.middleware.InstrumentacaoMiddleware)
+RH_METRICAS_ATIVAS = config('RH_METRICAS_ATIVAS', default=True, cast=bool)
+RH_ORCAMENTO_ACAO = config('RH_ORCAMENTO_ACAO', default='log')
+# Em "manage.py test" exceder um orçamento faz o teste falhar
+if sys.argv[1:2] == ['test']:
+    RH_ORCAMENTO_ACAO = 'erro'
+RH_ORCAMENTO_CONSULTAS = {
+    'dashboard': 4,
+    'dashboard_widget': 6,
+    'dashboard_data': 12,
+    'funcionario_list': 10,
+    'funcionario_detail': 8,
+    'faltas_do_dia': 10,
+    'marcar_presenca': 10,
+    # 6 consultas da view + gravação da sessão quando há mensagens (SessionStorage)
+    'ferias_list': 9,
+    'ferias_calendario_data': 4,
+    'folha_pagamento_list': 8,
+    'documentos_validade': 4,
+    'documentos_busca': 4,
+    'pesquisa_global': 3,
+}
+
+# Cobertura dos departamentos nas férias (rh.cobertura)
+# Fração máxima do efetivo ativo ausente em simultâneo
+RH_COBERTURA_MAX_AUSENTES = config('RH_COBERTURA_MAX_AUSENTES', default=0.3, cast=float)
+# 'bloquear' impede a aprovação/solicitação; 'avisar' apenas mostra um alerta
+RH_COBERTURA_ACAO = config('RH_COBERTURA_ACAO', default='bloquear')
+
+# Ficheiros protegidos (rh.arquivos): '' (Django envia), 'nginx' ou 'apache'
+RH_ARQUIVOS_SERVIDOR = config('RH_ARQUIVOS_SERVIDOR', default='')
+RH_ARQUIVOS_PREFIXO_INTERNO = config('RH_ARQUIVOS_PREFIXO_INTERNO', default='/protegido/')
+# Únicas pastas de MEDIA_ROOT servidas sem autenticação (fotos e logos)
+RH_MEDIA_PUBLICA = ['funcionarios/', 'empresas/']
+
+# Validade de documentos (rh.validade_documentos)
+# Horizontes, em dias, dos grupos do resumo de documentos a vencer
+RH_VALIDADE_HORIZONTES = [7, 30, 60]
+# Documentos já vencidos há até este número de dias continuam no resumo
+RH_VALIDADE_DIAS_VENCIDOS = config('RH_VALIDADE_DIAS_VENCIDOS', default=30, cast=int)
+
+# Uploads em streaming com hash, deteção de tipo e limite de tamanho (rh.upload)
+FILE_UPLOAD_HANDLERS = ['rh.upload.ArquivoStreamingHandler']
+RH_UPLOAD_MAX_BYTES = config('RH_UPLOAD_MAX_BYTES', default=25 * 1024 * 1024, cast=int)
+
+# Cache por empresa com invalidação por versão (rh.cache_empresa). Os
+# contadores de versão têm de ser partilhados por todos os workers:
+# ficheiros (padrão; RH_CACHE_LOCATION num disco local comum aos workers)
+# ou base de dados (RH_CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache,
+# RH_CACHE_LOCATION=rh_cache, após createcachetable). A memória do processo
+# (...locmem.LocMemCache) só serve com um único processo (rh.W001).
+CACHES = {
+    'default': {
+        'BACKEND': config('RH_CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('RH_CACHE_LOCATION', default=str(BASE_DIR / 'cache')),
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+RH_CACHE_ALIAS = 'default'
+RH_CACHE_TIMEOUT = config('RH_CACHE_TIMEOUT', default=300, cast=int)
+
+# Compressão das respostas (rh.compressao.CompressaoMiddleware)
+RH_COMPRESSAO_MIN_BYTES = config('RH_COMPRESSAO_MIN_BYTES', default=1024, cast=int)
+RH_COMPRESSAO_BROTLI_QUALIDADE = config('RH_COMPRESSAO_BROTLI_QUALIDADE', default=5, cast=int)
+
+# Widgets do dashboard (rh.dashboard): TTL, em segundos, do HTML em cache
+# de cada widget, por nome; os ausentes usam o TTL definido no widget
+RH_DASHBOARD_TTL = {}
+
+# Calendário de dias úteis (rh.calendario): intervalo, em segundos, entre
+# verificações das versões dos feriados feitas por cada processo
+RH_CALENDARIO_REVALIDAR = config('RH_CALENDARIO_REVALIDAR', default=5, cast=int)
@@ -1,5 +1,8 @@
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+from django.views.static import serve
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -9,5 +12,14 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Documentos e comprovantes só por rh.views.arquivo_protegido
+    urlpatterns += [
+        re_path(
+            r'^%s(?P<path>(?:%s).*)$' % (
+                re.escape(settings.MEDIA_URL.lstrip('/')),
+                '|'.join(re.escape(pasta) for pasta in settings.RH_MEDIA_PUBLICA),
+            ),
+            serve, {'document_root': settings.MEDIA_ROOT},
+        ),
+    ]
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
@@ -1,10 +1,12 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from .models import (
-    Empresa, Departamento, Cargo, Funcionario, Ferias, Falta,
+    Empresa, Departamento, Cargo, Funcionario, Ferias, MovimentoFerias, Falta,
     FolhaPagamento, AvaliacaoDesempenho, Documento, Treinamento,
     ParticipacaoTreinamento, Advertencia, Beneficio, BeneficioFuncionario,
-    TurnoTrabalho, Presenca, JustificativaFalta, ConfiguracaoRH
+    TurnoTrabalho, Presenca, JustificativaFalta, ConfiguracaoRH, Feriado,
+    ArquivoConteudo
 )
+from .saldo_ferias import alterar_status, alterar_status_em_lote
 
 
 @admin.register(Empresa)
@@ -56,12 +58,72 @@ class FuncionarioAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(Feriado)
+class FeriadoAdmin(admin.ModelAdmin):
+    list_display = ('data', 'nome', 'empresa')
+    list_filter = ('empresa',)
+    search_fields = ('nome',)
+    date_hierarchy = 'data'
+
+
 @admin.register(Ferias)
 class FeriasAdmin(admin.ModelAdmin):
     list_display = ('funcionario', 'data_inicio', 'data_fim', 'dias_uteis', 'status', 'solicitada_em')
     list_filter = ('status', 'data_inicio', 'solicitada_em')
     search_fields = ('funcionario__nome_completo',)
     readonly_fields = ('solicitada_em', 'aprovada_em')
+    actions = ['aprovar_selecionadas', 'rejeitar_selecionadas']
+
+    def _alterar_em_lote(self, request, queryset, status):
+        # Um UPDATE por empresa; saldo e cobertura tratados em lote
+        ids_por_empresa = {}
+        for empresa_id, pk in queryset.values_list('empresa_id', 'pk'):
+            ids_por_empresa.setdefault(empresa_id, []).append(pk)
+        alteradas = 0
+        recusadas = 0
+        for empresa_id, ids in ids_por_empresa.items():
+            resultado = alterar_status_em_lote(Empresa(pk=empresa_id), ids, status, request.user)
+            alteradas += len(resultado.alteradas)
+            recusadas += len(resultado.sem_saldo) + len(resultado.sem_cobertura)
+        self.message_user(request, f'{alteradas} férias alteradas para "{status}".', messages.SUCCESS)
+        if recusadas:
+            self.message_user(request, f'{recusadas} recusadas por saldo ou cobertura insuficientes.', messages.WARNING)
+
+    @admin.action(description='Aprovar férias selecionadas')
+    def aprovar_selecionadas(self, request, queryset):
+        self._alterar_em_lote(request, queryset, 'Aprovada')
+
+    @admin.action(description='Rejeitar férias selecionadas')
+    def rejeitar_selecionadas(self, request, queryset):
+        self._alterar_em_lote(request, queryset, 'Rejeitada')
+
+    def save_model(self, request, obj, form, change):
+        # Mudanças de status passam pelo livro de saldo de férias
+        if change and 'status' not in form.changed_data:
+            return super().save_model(request, obj, form, change)
+        status = obj.status
+        obj.status = form.initial.get('status', 'Solicitada') if change else 'Solicitada'
+        super().save_model(request, obj, form, change)
+        alterar_status(obj, status, request.user)
+
+
+@admin.register(MovimentoFerias)
+class MovimentoFeriasAdmin(admin.ModelAdmin):
+    list_display = ('funcionario', 'tipo', 'dias', 'data', 'periodo', 'ferias')
+    list_filter = ('tipo', 'empresa')
+    search_fields = ('funcionario__nome_completo', 'descricao')
+    raw_id_fields = ('funcionario', 'ferias')
+
+
+@admin.register(ArquivoConteudo)
+class ArquivoConteudoAdmin(admin.ModelAdmin):
+    list_display = ('hash', 'tamanho', 'referencias', 'criado_em')
+    list_filter = ('criado_em',)
+    search_fields = ('hash',)
+    readonly_fields = ('hash', 'nome', 'tamanho', 'referencias', 'criado_em')
+
+    def has_add_permission(self, request):
+        return False
 
 
 @admin.register(Falta)
@@ -0,0 +1,130 @@
+"""
+Armazenamento endereçado por conteúdo para os ficheiros de RH.
+
+Os uploads de Documento, Falta, JustificativaFalta e Advertencia são
+gravados em MEDIA_ROOT/cas/ab/cd/<sha256><ext>, com a extensão do tipo
+detetado pelo conteúdo (rh.upload.detetar_tipo): o SHA-256 é calculado
+enquanto o ficheiro é copiado para um temporário e, se um blob com o mesmo
+conteúdo já existe, o temporário é descartado. Cada blob tem uma linha em
+ArquivoConteudo com o número de registos que o referenciam, mantido pelos
+sinais em rh.signals; o comando limpar_arquivos remove os blobs sem
+referências.
+
+Como os nomes continuam relativos a MEDIA_ROOT, a entrega protegida
+(rh.arquivos, X-Accel-Redirect/X-Sendfile) funciona sem alterações.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+
+PASTA_CAS = 'cas'
+# Temporários dos uploads em curso (mesmo sistema de ficheiros: gravar é renomear)
+PASTA_TMP = posixpath.join(PASTA_CAS, 'tmp')
+
+
+def nome_blob(hash_conteudo, extensao):
+    return posixpath.join(PASTA_CAS, hash_conteudo[:2], hash_conteudo[2:4], f'{hash_conteudo}{extensao}')
+
+
+def hash_do_nome(nome):
+    """SHA-256 contido num nome de blob, ou None para ficheiros fora do CAS"""
+    if not nome or not nome.startswith(PASTA_CAS + '/'):
+        return None
+    return posixpath.splitext(posixpath.basename(nome))[0]
+
+
+@deconstructible(path='rh.armazenamento.ArmazenamentoDeduplicado')
+class ArmazenamentoDeduplicado(FileSystemStorage):
+    """FileSystemStorage que grava cada conteúdo distinto uma única vez"""
+
+    def get_available_name(self, name, max_length=None):
+        # O nome final vem do hash em _save; não há colisões a evitar
+        return name
+
+    def _save(self, name, content):
+        from .upload import detetar_tipo, extensao_do_tipo
+
+        if getattr(content, 'erro_upload', None):
+            raise ValueError(f'Upload rejeitado não pode ser gravado: {content.erro_upload}')
+        if getattr(content, 'sha256', None) and hasattr(content, 'temporary_file_path'):
+            # Recebido por rh.upload.ArquivoStreamingHandler: hash e tipo já calculados
+            extensao = extensao_do_tipo(content.tipo_mime)
+            return self._guardar_blob(nome_blob(content.sha256, extensao), content.temporary_file_path())
+
+        pasta_tmp = self.path(PASTA_TMP)
+        os.makedirs(pasta_tmp, exist_ok=True)
+
+        sha = hashlib.sha256()
+        inicio = b''
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        with tempfile.NamedTemporaryFile(dir=pasta_tmp, delete=False) as tmp:
+            try:
+                for bloco in content.chunks():
+                    if len(inicio) < 64:
+                        inicio += bloco[:64 - len(inicio)]
+                    sha.update(bloco)
+                    tmp.write(bloco)
+            except BaseException:
+                os.unlink(tmp.name)
+                raise
+
+        extensao = extensao_do_tipo(detetar_tipo(inicio, name))
+        return self._guardar_blob(nome_blob(sha.hexdigest(), extensao), tmp.name)
+
+    def _guardar_blob(self, nome, caminho_tmp):
+        """Move o temporário para o blob `nome`, ou descarta-o se o blob já existe"""
+        destino = self.path(nome)
+        if os.path.exists(destino):
+            if os.path.exists(caminho_tmp):
+                os.unlink(caminho_tmp)
+            # Renova o mtime para que limpar_arquivos não apague um blob reutilizado agora
+            os.utime(destino)
+        else:
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            os.replace(caminho_tmp, destino)
+            if self.file_permissions_mode is not None:
+                os.chmod(destino, self.file_permissions_mode)
+        return nome
+
+    def delete(self, name):
+        # Blobs partilhados só são apagados pelo comando limpar_arquivos
+        if hash_do_nome(name) is None:
+            super().delete(name)
+
+
+armazenamento_documentos = ArmazenamentoDeduplicado()
+
+
+def obter_armazenamento():
+    """Callable usado no parâmetro storage= dos FileFields"""
+    return armazenamento_documentos
+
+
+def ajustar_referencias(nome, delta):
+    """Soma `delta` às referências do blob `nome` (criando a linha se preciso)"""
+    from .models import ArquivoConteudo
+
+    hash_conteudo = hash_do_nome(nome)
+    if hash_conteudo is None or delta == 0:
+        return
+    atualizadas = ArquivoConteudo.objects.filter(hash=hash_conteudo).update(referencias=F('referencias') + delta)
+    if atualizadas:
+        return
+    try:
+        tamanho = armazenamento_documentos.size(nome)
+    except OSError:
+        tamanho = 0
+    try:
+        with transaction.atomic():
+            ArquivoConteudo.objects.create(hash=hash_conteudo, nome=nome, tamanho=tamanho, referencias=max(delta, 0))
+    except IntegrityError:
+        # Outro upload do mesmo conteúdo criou a linha entretanto
+        ArquivoConteudo.objects.filter(hash=hash_conteudo).update(referencias=F('referencias') + delta)
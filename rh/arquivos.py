@@ -0,0 +1,148 @@
+"""
+Entrega de ficheiros protegidos (documentos, comprovantes, advertências).
+
+A view verifica a empresa do registo e delega a transferência ao
+servidor web, conforme RH_ARQUIVOS_SERVIDOR:
+
+- 'nginx': cabeçalho X-Accel-Redirect para RH_ARQUIVOS_PREFIXO_INTERNO,
+  que no nginx deve ser uma location interna apontando para MEDIA_ROOT:
+
+      location /protegido/ {
+          internal;
+          alias /caminho/para/media/;
+      }
+
+- 'apache' (mod_xsendfile) ou 'lighttpd': cabeçalho X-Sendfile com o
+  caminho absoluto;
+- vazio (padrão): o próprio Django envia o ficheiro, com suporte a
+  pedidos Range (retoma de downloads e navegação em PDFs).
+
+As pastas destes ficheiros não devem ser servidas publicamente em /media/
+(ver RH_MEDIA_PUBLICA).
+
+Só os tipos de TIPOS_INLINE são mostrados no navegador; tudo o resto é
+entregue como anexo application/octet-stream. Todas as respostas levam
+X-Content-Type-Options: nosniff e Content-Security-Policy: sandbox, para
+que um ficheiro enviado por um utilizador nunca corra como página da
+aplicação.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+from .models import Documento, Falta, JustificativaFalta, Advertencia
+
+
+# tipo na URL -> (modelo, campo do ficheiro)
+ARQUIVOS_PROTEGIDOS = {
+    'documento': (Documento, 'arquivo'),
+    'falta': (Falta, 'arquivo_comprovante'),
+    'justificativa': (JustificativaFalta, 'arquivo_comprovante'),
+    'advertencia': (Advertencia, 'arquivo_documento'),
+}
+
+# Tipos que podem ser abertos no navegador (Content-Disposition: inline)
+TIPOS_INLINE = frozenset({'application/pdf', 'image/png', 'image/jpeg'})
+
+TAMANHO_BLOCO = 64 * 1024
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _intervalo(cabecalho, tamanho):
+    """
+    Interpreta um cabeçalho Range de intervalo único. Devolve (inicio, fim)
+    inclusivos, None se o cabeçalho deve ser ignorado (resposta completa),
+    ou False se o intervalo é válido mas não é satisfazível (416).
+    """
+    correspondencia = _RANGE.match(cabecalho.strip())
+    if not correspondencia:
+        return None  # múltiplos intervalos ou sintaxe desconhecida: resposta completa
+    inicio, fim = correspondencia.groups()
+    if not inicio and not fim:
+        return None
+    if not inicio:
+        # Sufixo: últimos N bytes
+        sufixo = int(fim)
+        if sufixo == 0 or tamanho == 0:
+            return False
+        return max(tamanho - sufixo, 0), tamanho - 1
+    inicio = int(inicio)
+    if fim and int(fim) < inicio:
+        return None  # range-spec inválido (RFC 9110, 14.1.1): ignorado
+    if inicio >= tamanho:
+        return False
+    fim = min(int(fim), tamanho - 1) if fim else tamanho - 1
+    return inicio, fim
+
+
+def _ler_trecho(arquivo, inicio, tamanho):
+    try:
+        arquivo.seek(inicio)
+        restante = tamanho
+        while restante > 0:
+            bloco = arquivo.read(min(TAMANHO_BLOCO, restante))
+            if not bloco:
+                break
+            restante -= len(bloco)
+            yield bloco
+    finally:
+        arquivo.close()
+
+
+def _proteger(response):
+    response['X-Content-Type-Options'] = 'nosniff'
+    response['Content-Security-Policy'] = 'sandbox'
+    return response
+
+
+def resposta_arquivo(request, arquivo, como_anexo=False, nome=None, tipo_mime=None):
+    """
+    Resposta HTTP que entrega o FieldFile `arquivo` pelo meio configurado.
+    `nome` é o nome sugerido ao navegador (por omissão, o do ficheiro).
+    `tipo_mime` é o tipo detetado no upload; sem ele, o tipo vem da extensão.
+    Tipos fora de TIPOS_INLINE são sempre entregues como anexo binário.
+    """
+    nome = nome or os.path.basename(arquivo.name)
+    tipo = tipo_mime or mimetypes.guess_type(nome)[0]
+    if tipo not in TIPOS_INLINE:
+        tipo = 'application/octet-stream'
+        como_anexo = True
+    disposicao = content_disposition_header(como_anexo, nome)
+    servidor = getattr(settings, 'RH_ARQUIVOS_SERVIDOR', '')
+
+    if servidor == 'nginx':
+        prefixo = getattr(settings, 'RH_ARQUIVOS_PREFIXO_INTERNO', '/protegido/')
+        response = HttpResponse(content_type=tipo)
+        response['X-Accel-Redirect'] = prefixo.rstrip('/') + '/' + quote(arquivo.name)
+        response['Content-Disposition'] = disposicao
+        return _proteger(response)
+    if servidor in ('apache', 'lighttpd'):
+        response = HttpResponse(content_type=tipo)
+        response['X-Sendfile'] = arquivo.path
+        response['Content-Disposition'] = disposicao
+        return _proteger(response)
+
+    tamanho = arquivo.size
+    intervalo = _intervalo(request.headers.get('Range', ''), tamanho) if 'Range' in request.headers else None
+    if intervalo is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{tamanho}'
+        return _proteger(response)
+    if intervalo is None:
+        response = FileResponse(arquivo.open('rb'), as_attachment=como_anexo, filename=nome, content_type=tipo)
+    else:
+        inicio, fim = intervalo
+        arquivo.open('rb')
+        response = StreamingHttpResponse(
+            _ler_trecho(arquivo.file, inicio, fim - inicio + 1), status=206, content_type=tipo
+        )
+        response['Content-Range'] = f'bytes {inicio}-{fim}/{tamanho}'
+        response['Content-Length'] = str(fim - inicio + 1)
+        response['Content-Disposition'] = disposicao
+    response['Accept-Ranges'] = 'bytes'
+    return _proteger(response)
@@ -0,0 +1,302 @@
+"""
+Cache por empresa com invalidação por versão.
+
+As chaves têm o formato rh:<empresa>:<nome>:<versões>:<partes>. Cada
+empresa tem um contador de versão por grupo (normalmente o nome do
+modelo, ex.: 'cargo') e um contador geral (GRUPO_EMPRESA). Os sinais em
+rh.signals incrementam o contador do modelo e o geral a cada gravação ou
+remoção, o que torna inalcançáveis, em O(1), todas as entradas que
+dependem desse grupo; as antigas expiram pelo TIMEOUT do backend.
+
+Os contadores começam no instante atual em milissegundos, para que um
+contador perdido (reinício ou expulsão do cache) nunca volte a um valor
+já usado. Fora de uma transação a invalidação é imediata. Dentro de uma,
+os pares (empresa, grupo) são juntados num conjunto da transação e cada
+par é incrementado uma vez no commit, por mais linhas que a transação
+grave (remoções em cascata, delete() de querysets); um leitor concorrente
+que tenha guardado dados antigos antes do commit não fica com eles. Para
+as leituras da própria transação, um par também é incrementado na hora,
+mas só na primeira gravação depois de cada leitura desse grupo.
+
+Escritas em lote (update(), bulk_create()) não disparam sinais e devem
+chamar invalidar() explicitamente.
+
+As mesmas versões servem de ETag (condicional()): um pedido condicional
+cujo ETag não mudou recebe 304 sem que a view seja executada. As páginas
+completas (cache_view(), pagina_em_cache()) dependem também de
+GRUPO_CABECALHO, incrementado quando a própria Empresa é gravada.
+
+O backend é o cache RH_CACHE_ALIAS de CACHES e tem de ser partilhado por
+todos os processos da aplicação (padrão: ficheiros; ver settings). Com a
+memória local (LocMemCache) cada worker teria os seus contadores, e uma
+gravação num worker não invalidaria as páginas, ETags, dados de
+referência e widgets guardados nos outros até expirarem; só serve para
+um único processo (runserver), e a verificação rh.W001 avisa quando é
+usada com DEBUG=False.
+"""
+import functools
+import hashlib
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+
+
+GRUPO_EMPRESA = 'empresa'
+# Dados da Empresa mostrados no cabeçalho das páginas (base.html): todas as
+# páginas guardadas dependem dele, sem depender de todas as gravações
+GRUPO_CABECALHO = 'cabecalho'
+# "Empresa" dos dados partilhados por todas (ex.: feriados sem empresa)
+EMPRESA_GLOBAL = 'global'
+
+
+def _cache():
+    return caches[getattr(settings, 'RH_CACHE_ALIAS', 'default')]
+
+
+def _timeout(timeout):
+    return getattr(settings, 'RH_CACHE_TIMEOUT', 300) if timeout is None else timeout
+
+
+def _chave_versao(empresa_id, grupo):
+    return f'rh:{empresa_id}:versao:{grupo}'
+
+
+def versoes(empresa_id, grupos):
+    """Versões atuais dos grupos da empresa (uma ida ao cache)"""
+    grupos = tuple(grupos) or (GRUPO_EMPRESA,)
+    lote = _lote_atual(transaction.get_connection())
+    if lote is not None:
+        # A próxima gravação destes grupos nesta transação volta a incrementar na hora
+        lote.sem_leitura -= {(empresa_id, g) for g in grupos}
+    cache = _cache()
+    chaves = {_chave_versao(empresa_id, g): g for g in grupos}
+    atuais = cache.get_many(list(chaves))
+    resultado = {}
+    for chave, grupo in chaves.items():
+        valor = atuais.get(chave)
+        if valor is None:
+            valor = int(time.time() * 1000)
+            # add(): se outro processo criou o contador entretanto, prevalece o dele
+            if not cache.add(chave, valor, None):
+                valor = cache.get(chave, valor)
+        resultado[grupo] = valor
+    return resultado
+
+
+def _incrementar(pares):
+    cache = _cache()
+    for empresa_id, grupo in pares:
+        chave = _chave_versao(empresa_id, grupo)
+        try:
+            cache.incr(chave)
+        except ValueError:
+            cache.set(chave, int(time.time() * 1000), None)
+
+
+class _Lote:
+    """Pares (empresa, grupo) a incrementar no commit da transação atual"""
+
+    def __init__(self, conexao):
+        self.conexao = conexao
+        # O Django substitui a lista de callbacks num rollback (total ou de
+        # savepoint): se a lista mudou, o callback deste lote pode ter sido
+        # descartado e as gravações seguintes precisam de um lote novo.
+        self.callbacks = conexao.run_on_commit
+        self.pares = set()
+        self.sem_leitura = set()
+
+    def ativo(self):
+        return self.conexao.in_atomic_block and self.callbacks is self.conexao.run_on_commit
+
+    def executar(self):
+        if getattr(self.conexao, '_rh_lote_cache', None) is self:
+            self.conexao._rh_lote_cache = None
+        _incrementar(self.pares)
+
+
+def _lote_atual(conexao, criar=False):
+    lote = getattr(conexao, '_rh_lote_cache', None)
+    if lote is not None and lote.ativo():
+        return lote
+    if not criar:
+        return None
+    lote = conexao._rh_lote_cache = _Lote(conexao)
+    transaction.on_commit(lote.executar)
+    return lote
+
+
+def invalidar(empresa_id, *grupos):
+    """Invalida os grupos indicados (e o geral) da empresa"""
+    if empresa_id is None:
+        return
+    pares = {(empresa_id, g) for g in {*grupos, GRUPO_EMPRESA}}
+    conexao = transaction.get_connection()
+    if not conexao.in_atomic_block:
+        _incrementar(pares)
+        return
+    lote = _lote_atual(conexao, criar=True)
+    lote.pares |= pares
+    novos = pares - lote.sem_leitura
+    if novos:
+        _incrementar(novos)
+        lote.sem_leitura |= novos
+
+
+def invalidar_tudo(empresa_id):
+    """Invalida todos os grupos da empresa (após importações ou gerações em lote)"""
+    from django.apps import apps
+
+    invalidar(empresa_id, GRUPO_CABECALHO, *(m._meta.model_name for m in apps.get_app_config('rh').get_models()))
+
+
+def _resumo(partes):
+    texto = repr(partes)
+    if len(texto) <= 80:
+        return texto.replace(' ', '')
+    return hashlib.sha1(texto.encode()).hexdigest()
+
+
+def chave(empresa_id, nome, grupos=(GRUPO_EMPRESA,), partes=()):
+    atuais = versoes(empresa_id, grupos)
+    assinatura = '.'.join(str(atuais[g]) for g in sorted(atuais))
+    return f'rh:{empresa_id}:{nome}:{assinatura}:{_resumo(partes)}'
+
+
+def obter(empresa_id, nome, calcular, grupos=(GRUPO_EMPRESA,), partes=(), timeout=None):
+    """Valor em cache ou calcular(), guardado sob as versões atuais dos grupos"""
+    cache = _cache()
+    k = chave(empresa_id, nome, grupos, partes)
+    valor = cache.get(k)
+    if valor is None:
+        valor = calcular()
+        cache.set(k, valor, _timeout(timeout))
+    return valor
+
+
+def em_cache(nome, grupos=(GRUPO_EMPRESA,), timeout=None):
+    """
+    Decorador para funções cujo primeiro argumento é o id da empresa; os
+    restantes argumentos fazem parte da chave:
+
+        @em_cache('cargos_ativos', grupos=['cargo'])
+        def cargos_ativos(empresa_id): ...
+    """
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(empresa_id, *args, **kwargs):
+            return obter(
+                empresa_id, nome, lambda: funcao(empresa_id, *args, **kwargs),
+                grupos, (args, sorted(kwargs.items())), timeout,
+            )
+        envoltorio.sem_cache = funcao
+        return envoltorio
+    return decorador
+
+
+def _pode_usar_cache(request):
+    if request.method not in ('GET', 'HEAD') or not request.user.is_authenticated:
+        return False
+    # Mensagens pendentes seriam mostradas (e consumidas) na página guardada
+    mensagens = getattr(request, '_messages', None)
+    return not (mensagens is not None and len(mensagens))
+
+
+def cache_view(nome, grupos=(GRUPO_EMPRESA,), timeout=None, partes_pedido=None):
+    """
+    Decorador de views: guarda a resposta por empresa, caminho, parâmetros
+    GET e versões dos grupos. A chave inclui o cookie CSRF, porque a
+    página contém tokens CSRF válidos só para essa sessão do navegador.
+    `partes_pedido(request)` devolve partes extra da chave, para respostas
+    que variam por outros dados do pedido (ex.: rh.parciais.partes_fragmento).
+    A página inclui o cabeçalho, por isso GRUPO_CABECALHO junta-se aos grupos.
+    """
+    grupos = _com_cabecalho(grupos)
+
+    def decorador(view):
+        @functools.wraps(view)
+        def envoltorio(request, *args, **kwargs):
+            if not _pode_usar_cache(request):
+                return view(request, *args, **kwargs)
+            cache = _cache()
+            partes = (
+                request.user.pk, request.path, sorted(request.GET.lists()),
+                request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+                *(partes_pedido(request) if partes_pedido else ()),
+            )
+            k = chave(request.user.empresa_id, f'view:{nome}', grupos, partes)
+            response = cache.get(k)
+            if response is not None:
+                return response
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response = response.render()
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                cache.set(k, response, _timeout(timeout))
+            return response
+        return envoltorio
+    return decorador
+
+
+def etag_empresa(grupos=(GRUPO_EMPRESA,), por_dia=False, partes_pedido=None):
+    """
+    Função de ETag para condition(): utilizador, versões dos grupos e o
+    cookie CSRF (as páginas levam tokens CSRF); `por_dia` junta a data
+    para respostas que dependem de hoje e `partes_pedido`, como em
+    cache_view(), outras partes do pedido. Sem ETag (None) quando o pedido
+    não pode ser servido do cache do navegador.
+    """
+    def etag(request, *args, **kwargs):
+        if not _pode_usar_cache(request) or request.user.empresa_id is None:
+            return None
+        atuais = versoes(request.user.empresa_id, grupos)
+        partes = [str(request.user.pk), *(str(atuais[g]) for g in sorted(atuais))]
+        csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME)
+        if csrf:
+            partes.append(hashlib.sha1(csrf.encode()).hexdigest()[:10])
+        if por_dia:
+            partes.append(date.today().isoformat())
+        if partes_pedido:
+            partes.extend(str(parte) for parte in partes_pedido(request))
+        return '-'.join(partes)
+    return etag
+
+
+def condicional(grupos=(GRUPO_EMPRESA,), por_dia=False, partes_pedido=None):
+    """
+    Decorador de views: ETag pelas versões da empresa e 304 Not Modified
+    para If-None-Match igual, sem executar a view. A resposta fica privada
+    e com no-cache, para o navegador revalidar sempre.
+    """
+    def decorador(view):
+        view_condicional = condition(etag_func=etag_empresa(grupos, por_dia, partes_pedido))(view)
+
+        @functools.wraps(view)
+        def envoltorio(request, *args, **kwargs):
+            response = view_condicional(request, *args, **kwargs)
+            if response.has_header('ETag'):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return envoltorio
+    return decorador
+
+
+def _com_cabecalho(grupos):
+    grupos = tuple(grupos)
+    return grupos if GRUPO_CABECALHO in grupos else (*grupos, GRUPO_CABECALHO)
+
+
+def pagina_em_cache(nome, grupos=(GRUPO_EMPRESA,), timeout=None, partes_pedido=None):
+    """condicional() e cache_view() com os mesmos grupos e partes (páginas de lista)"""
+    grupos = _com_cabecalho(grupos)
+
+    def decorador(view):
+        return condicional(grupos, partes_pedido=partes_pedido)(
+            cache_view(nome, grupos, timeout, partes_pedido)(view)
+        )
+    return decorador
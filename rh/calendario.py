@@ -0,0 +1,141 @@
+"""
+Calendário de dias úteis com feriados de Moçambique.
+
+A contagem de dias úteis num intervalo é feita em tempo constante:
+aritmética de semanas para os fins de semana e busca binária (bisect)
+numa lista ordenada de feriados para descontar os que caem em dias de
+semana. As listas de feriados são mantidas em cache no processo por
+(empresa, ano), junto com as versões do grupo 'feriado' da empresa e dos
+feriados globais (rh.cache_empresa). O processo que grava um Feriado
+limpa o seu cache na hora (rh.signals); os outros comparam as versões, no
+máximo uma vez a cada RH_CALENDARIO_REVALIDAR segundos por lista, e
+recarregam-na quando mudaram.
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from calendar import monthrange
+from datetime import date, timedelta
+
+from django.conf import settings
+
+from . import cache_empresa
+
+
+# Feriados nacionais de data fixa (mês, dia)
+FERIADOS_NACIONAIS = [
+    (1, 1, 'Dia da Fraternidade Universal'),
+    (2, 3, 'Dia dos Heróis Moçambicanos'),
+    (4, 7, 'Dia da Mulher Moçambicana'),
+    (5, 1, 'Dia Internacional dos Trabalhadores'),
+    (6, 25, 'Dia da Independência Nacional'),
+    (9, 7, 'Dia da Vitória'),
+    (9, 25, 'Dia das Forças Armadas de Libertação Nacional'),
+    (10, 4, 'Dia da Paz e Reconciliação'),
+    (12, 25, 'Dia da Família'),
+]
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def feriados_nacionais(ano):
+    """Devolve {data: nome} dos feriados nacionais do ano.
+
+    Quando um feriado coincide com um domingo, é gozado na segunda-feira seguinte.
+    """
+    resultado = {}
+    for mes, dia, nome in FERIADOS_NACIONAIS:
+        data = date(ano, mes, dia)
+        resultado[data] = nome
+        if data.weekday() == 6:
+            resultado.setdefault(data + timedelta(days=1), f'{nome} (transferido)')
+    return resultado
+
+
+def _versao_feriados(empresa_id):
+    versao = cache_empresa.versoes(cache_empresa.EMPRESA_GLOBAL, ['feriado'])['feriado']
+    if empresa_id is None:
+        return (versao,)
+    return versao, cache_empresa.versoes(empresa_id, ['feriado'])['feriado']
+
+
+def feriados(ano, empresa_id=None):
+    """Lista ordenada dos feriados do ano que caem de segunda a sexta"""
+    chave = (empresa_id, ano)
+    agora = time.monotonic()
+    atual = _cache.get(chave)
+    if atual is not None:
+        versao, verificada_em, lista = atual
+        if agora - verificada_em < getattr(settings, 'RH_CALENDARIO_REVALIDAR', 5):
+            return lista
+        nova_versao = _versao_feriados(empresa_id)
+        if nova_versao == versao:
+            with _lock:
+                _cache[chave] = (versao, agora, lista)
+            return lista
+    else:
+        nova_versao = _versao_feriados(empresa_id)
+
+    from django.db.models import Q
+    from .models import Feriado
+
+    datas = set(feriados_nacionais(ano))
+    filtro = Q(empresa__isnull=True)
+    if empresa_id is not None:
+        filtro |= Q(empresa_id=empresa_id)
+    datas.update(
+        Feriado.objects.filter(filtro, data__year=ano).values_list('data', flat=True)
+    )
+    lista = tuple(sorted(d for d in datas if d.weekday() < 5))
+    with _lock:
+        _cache[chave] = (nova_versao, agora, lista)
+    return lista
+
+
+def limpar_cache():
+    with _lock:
+        _cache.clear()
+
+
+def _dias_semana_ate(k):
+    # Dias de segunda a sexta entre as posições [0, k) a partir de uma segunda-feira
+    semanas, resto = divmod(k, 7)
+    return semanas * 5 + min(resto, 5)
+
+
+def dias_semana(inicio, fim):
+    """Dias de segunda a sexta no intervalo fechado [inicio, fim], em O(1)"""
+    if fim < inicio:
+        return 0
+    offset = inicio.weekday()
+    total = (fim - inicio).days + 1
+    return _dias_semana_ate(offset + total) - _dias_semana_ate(offset)
+
+
+def feriados_no_intervalo(inicio, fim, empresa_id=None):
+    """Número de feriados em dias de semana no intervalo fechado [inicio, fim]"""
+    if fim < inicio:
+        return 0
+    total = 0
+    for ano in range(inicio.year, fim.year + 1):
+        lista = feriados(ano, empresa_id)
+        total += bisect_right(lista, fim) - bisect_left(lista, inicio)
+    return total
+
+
+def dias_uteis(inicio, fim, empresa_id=None):
+    """Dias úteis (segunda a sexta, exceto feriados) no intervalo fechado [inicio, fim]"""
+    return dias_semana(inicio, fim) - feriados_no_intervalo(inicio, fim, empresa_id)
+
+
+def dias_uteis_mes(ano, mes, empresa_id=None):
+    return dias_uteis(date(ano, mes, 1), date(ano, mes, monthrange(ano, mes)[1]), empresa_id)
+
+
+def eh_dia_util(data, empresa_id=None):
+    if data.weekday() >= 5:
+        return False
+    lista = feriados(data.year, empresa_id)
+    i = bisect_left(lista, data)
+    return not (i < len(lista) and lista[i] == data)
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register()
+def cache_partilhado(app_configs, **kwargs):
+    """rh.cache_empresa precisa de um cache comum a todos os processos"""
+    alias = getattr(settings, 'RH_CACHE_ALIAS', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND', '')
+    if settings.DEBUG or not backend.endswith('LocMemCache'):
+        return []
+    return [Warning(
+        f'O cache "{alias}" ({backend}) é local a cada processo.',
+        hint='Com vários workers, uma gravação num deles não invalida as páginas, ETags e widgets '
+             'guardados nos outros. Use FileBasedCache ou DatabaseCache (RH_CACHE_BACKEND).',
+        id='rh.W001',
+    )]
@@ -0,0 +1,223 @@
+"""
+Verificação de sobreposição de férias e de cobertura dos departamentos.
+
+As férias que intersectam a janela pedida são carregadas numa única
+consulta por intervalo (data_inicio <= fim e data_fim >= inicio, servida
+pelo índice (empresa, data_fim, data_inicio)) e o número máximo de
+ausentes em simultâneo é obtido com uma varredura (sweep-line) sobre os
+eventos de início/fim, em O(n log n) no número de férias encontradas,
+independentemente do tamanho do departamento ou do histórico.
+"""
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count
+
+from .models import Ferias, Funcionario
+
+
+# Férias que ocupam o calendário do departamento
+STATUS_OCUPA = ('Solicitada', 'Aprovada')
+
+
+@dataclass
+class ResultadoCobertura:
+    efetivo: int
+    limite: int
+    max_ausentes: int = 0
+    dias_criticos: list = field(default_factory=list)
+
+    @property
+    def excedido(self):
+        return self.max_ausentes > self.limite
+
+    def mensagem(self):
+        dias = ', '.join(f'{d:%d/%m/%Y}' for d in self.dias_criticos[:5])
+        if len(self.dias_criticos) > 5:
+            dias += '…'
+        return (f'Cobertura do departamento comprometida: até {self.max_ausentes} de '
+                f'{self.efetivo} funcionários ausentes em simultâneo (limite {self.limite}) '
+                f'em {dias}.')
+
+
+def ferias_sobrepostas(funcionario_id, inicio, fim, excluir_id=None):
+    """Férias solicitadas/aprovadas do funcionário que intersectam [inicio, fim]"""
+    qs = Ferias.objects.filter(
+        funcionario_id=funcionario_id,
+        status__in=STATUS_OCUPA,
+        data_inicio__lte=fim,
+        data_fim__gte=inicio,
+    )
+    if excluir_id is not None:
+        qs = qs.exclude(pk=excluir_id)
+    return qs
+
+
+def limite_ausentes(efetivo):
+    """Máximo de ausentes simultâneos permitido para um departamento com este efetivo"""
+    fracao = getattr(settings, 'RH_COBERTURA_MAX_AUSENTES', 0.3)
+    return max(1, int(efetivo * fracao))
+
+
+def _eventos(intervalos, inicio, fim):
+    """
+    Eventos (dia, +1/-1) dos intervalos recortados a [inicio, fim].
+
+    Intervalos sobrepostos do mesmo funcionário são fundidos antes, para
+    que cada pessoa conte uma só vez por dia.
+    """
+    por_funcionario = {}
+    for func_id, ini, fi in intervalos:
+        ini, fi = max(ini, inicio), min(fi, fim)
+        if ini <= fi:
+            por_funcionario.setdefault(func_id, []).append((ini, fi))
+
+    eventos = []
+    for lista in por_funcionario.values():
+        lista.sort()
+        atual_ini, atual_fim = lista[0]
+        for ini, fi in lista[1:]:
+            if ini <= atual_fim + timedelta(days=1):
+                atual_fim = max(atual_fim, fi)
+            else:
+                eventos.append((atual_ini, 1))
+                eventos.append((atual_fim + timedelta(days=1), -1))
+                atual_ini, atual_fim = ini, fi
+        eventos.append((atual_ini, 1))
+        eventos.append((atual_fim + timedelta(days=1), -1))
+    return eventos
+
+
+def pico_ausencias(intervalos, inicio, fim):
+    """
+    Recebe (funcionario_id, data_inicio, data_fim) e devolve
+    (max_ausentes, dias_com_o_maximo) dentro de [inicio, fim].
+    """
+    eventos = _eventos(intervalos, inicio, fim)
+    # Saídas antes de entradas no mesmo dia (-1 < 1)
+    eventos.sort()
+    maximo = 0
+    ativos = 0
+    trechos = []  # [(inicio, fim_exclusivo)] com o máximo corrente
+    for i, (dia, delta) in enumerate(eventos):
+        ativos += delta
+        proximo = eventos[i + 1][0] if i + 1 < len(eventos) else None
+        if proximo is None or proximo == dia:
+            continue
+        if ativos > maximo:
+            maximo = ativos
+            trechos = [(dia, proximo)]
+        elif ativos == maximo and maximo > 0:
+            trechos.append((dia, proximo))
+
+    dias = []
+    for ini, fim_exclusivo in trechos:
+        dias.extend(ini + timedelta(days=n) for n in range((fim_exclusivo - ini).days))
+    return maximo, dias
+
+
+def ausentes_por_dia(intervalos, inicio, fim):
+    """
+    Número de funcionários ausentes em cada dia de [inicio, fim], como
+    lista indexada pelo deslocamento a partir de `inicio`.
+
+    Os eventos são acumulados num vetor de diferenças e somados uma vez,
+    em O(n + dias) em vez de O(n * dias).
+    """
+    total_dias = (fim - inicio).days + 1
+    diferencas = [0] * (total_dias + 1)
+    for dia, delta in _eventos(intervalos, inicio, fim):
+        diferencas[(dia - inicio).days] += delta
+    contagens = []
+    ativos = 0
+    for delta in diferencas[:total_dias]:
+        ativos += delta
+        contagens.append(ativos)
+    return contagens
+
+
+def verificar_cobertura(ferias):
+    """
+    Calcula o pico de ausências no departamento do funcionário durante as
+    férias indicadas, contando-as como se já estivessem aprovadas.
+    """
+    funcionario = ferias.funcionario
+    inicio, fim = ferias.data_inicio, ferias.data_fim
+
+    intervalos = list(
+        Ferias.objects.filter(
+            empresa_id=funcionario.empresa_id,
+            funcionario__departamento_id=funcionario.departamento_id,
+            status__in=STATUS_OCUPA,
+            data_fim__gte=inicio,
+            data_inicio__lte=fim,
+        ).exclude(pk=ferias.pk).values_list('funcionario_id', 'data_inicio', 'data_fim')
+    )
+    intervalos.append((funcionario.id, inicio, fim))
+
+    efetivo = Funcionario.objects.filter(
+        departamento_id=funcionario.departamento_id, status='Ativo'
+    ).count()
+    resultado = ResultadoCobertura(efetivo=efetivo, limite=limite_ausentes(efetivo))
+    resultado.max_ausentes, resultado.dias_criticos = pico_ausencias(intervalos, inicio, fim)
+    return resultado
+
+
+def verificar_cobertura_em_lote(ferias_lista):
+    """
+    Versão em lote de verificar_cobertura para várias férias (da mesma
+    empresa): duas consultas no total, uma por intervalo para todas as
+    férias dos departamentos envolvidos e uma para o efetivo de cada
+    departamento. As contagens diárias de cada departamento são calculadas
+    uma vez e cada pedido lê o máximo do seu trecho.
+
+    Recebe objetos com funcionario_id, data_inicio, data_fim e
+    funcionario.departamento_id; devolve {ferias.pk: ResultadoCobertura}.
+    """
+    if not ferias_lista:
+        return {}
+    empresa_id = ferias_lista[0].empresa_id
+    por_departamento = {}
+    for ferias in ferias_lista:
+        por_departamento.setdefault(ferias.funcionario.departamento_id, []).append(ferias)
+    inicio = min(f.data_inicio for f in ferias_lista)
+    fim = max(f.data_fim for f in ferias_lista)
+    ids_lote = {f.pk for f in ferias_lista}
+
+    intervalos = {dep: [] for dep in por_departamento}
+    for dep, func_id, ini, fi in Ferias.objects.filter(
+        empresa_id=empresa_id,
+        funcionario__departamento_id__in=por_departamento,
+        status__in=STATUS_OCUPA,
+        data_fim__gte=inicio,
+        data_inicio__lte=fim,
+    ).exclude(pk__in=ids_lote).values_list('funcionario__departamento_id', 'funcionario_id', 'data_inicio', 'data_fim'):
+        intervalos[dep].append((func_id, ini, fi))
+
+    efetivos = dict(
+        Funcionario.objects.filter(departamento_id__in=por_departamento, status='Ativo')
+        .values('departamento_id').annotate(total=Count('id')).values_list('departamento_id', 'total')
+    )
+
+    resultados = {}
+    for dep, lote in por_departamento.items():
+        # Os pedidos do lote contam como aprovados
+        todos = intervalos[dep] + [(f.funcionario_id, f.data_inicio, f.data_fim) for f in lote]
+        contagens = ausentes_por_dia(todos, inicio, fim)
+        efetivo = efetivos.get(dep, 0)
+        for ferias in lote:
+            trecho = contagens[(ferias.data_inicio - inicio).days:(ferias.data_fim - inicio).days + 1]
+            maximo = max(trecho, default=0)
+            resultados[ferias.pk] = ResultadoCobertura(
+                efetivo=efetivo,
+                limite=limite_ausentes(efetivo),
+                max_ausentes=maximo,
+                dias_criticos=[ferias.data_inicio + timedelta(days=n) for n, c in enumerate(trecho) if c == maximo],
+            )
+    return resultados
+
+
+def cobertura_bloqueia():
+    """True se a violação do limite deve impedir a operação (em vez de só avisar)"""
+    return getattr(settings, 'RH_COBERTURA_ACAO', 'bloquear') == 'bloquear'
@@ -0,0 +1,222 @@
+"""
+Compressão das respostas e dos ficheiros estáticos.
+
+CompressaoMiddleware comprime, com Brotli (se o pacote brotli estiver
+instalado) ou gzip, conforme o Accept-Encoding do navegador, as respostas
+de texto (HTML, JSON, CSV, JavaScript, SVG...) com pelo menos
+RH_COMPRESSAO_MIN_BYTES. Respostas em streaming (exportações) são
+comprimidas bloco a bloco, sem juntar o corpo em memória. Ficam de fora
+as respostas já codificadas, os ficheiros entregues com suporte a Range
+(rh.arquivos) ou pelo servidor web (X-Accel-Redirect / X-Sendfile) e os
+tipos já comprimidos (PDF, imagens, xlsx).
+
+HTML e JSON juntam texto do pedido (filtros, pesquisa) a tokens CSRF e
+dados pessoais, e o tamanho comprimido pode revelá-los (BREACH). Esses
+tipos só usam gzip, com os helpers do Django e o mesmo enchimento
+aleatório do GZipMiddleware (max_random_bytes); o Brotli não tem onde
+colocar enchimento e fica para os restantes tipos.
+
+EstaticosComprimidos é o armazenamento de STATIC_ROOT: o collectstatic
+grava os ficheiros com o hash do conteúdo no nome (manifesto do Django) e,
+para os tipos de texto, as variantes .br e .gz ao lado, com a compressão
+máxima, uma só vez. O servidor web envia a variante pré-comprimida e, como
+o nome muda com o conteúdo, pode usar cache de longa duração:
+
+    location /static/ {
+        alias /caminho/para/staticfiles/;
+        gzip_static on;
+        brotli_static on;  # módulo ngx_brotli
+        expires max;
+        add_header Cache-Control "public, immutable";
+    }
+"""
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+TIPOS_COMPRIMIVEIS = {
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+    'text/csv',
+    'text/css',
+    'text/html',
+    'text/javascript',
+    'text/plain',
+    'text/xml',
+}
+# Tipos que podem refletir o pedido junto de segredos: só gzip com enchimento
+TIPOS_SO_GZIP = {'text/html', 'application/json'}
+# Como GZipMiddleware.max_random_bytes
+BYTES_ALEATORIOS = 100
+EXTENSOES_COMPRIMIVEIS = {'.css', '.js', '.mjs', '.map', '.svg', '.html', '.txt', '.json', '.xml', '.ttf', '.otf', '.eot'}
+
+
+def _min_bytes():
+    return getattr(settings, 'RH_COMPRESSAO_MIN_BYTES', 1024)
+
+
+def codificacao_aceite(accept_encoding, brotli_permitido=True):
+    """'br', 'gzip' ou None, pela preferência do servidor entre as aceites (q > 0)"""
+    aceites = {}
+    for parte in accept_encoding.split(','):
+        nome, _, parametros = parte.partition(';')
+        qualidade = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith('q='):
+            try:
+                qualidade = float(parametros[2:])
+            except ValueError:
+                qualidade = 0.0
+        aceites[nome.strip().lower()] = qualidade
+    for codificacao in ('br', 'gzip'):
+        if codificacao == 'br' and (brotli is None or not brotli_permitido):
+            continue
+        if aceites.get(codificacao, aceites.get('*', 0.0)) > 0:
+            return codificacao
+    return None
+
+
+def _compressor_brotli():
+    return brotli.Compressor(quality=getattr(settings, 'RH_COMPRESSAO_BROTLI_QUALIDADE', 5))
+
+
+def comprimir_conteudo(codificacao, dados):
+    if codificacao == 'gzip':
+        return compress_string(dados, max_random_bytes=BYTES_ALEATORIOS)
+    compressor = _compressor_brotli()
+    return compressor.process(dados) + compressor.finish()
+
+
+def comprimir_sequencia(codificacao, sequencia):
+    if codificacao == 'gzip':
+        yield from compress_sequence(sequencia, max_random_bytes=BYTES_ALEATORIOS)
+        return
+    compressor = _compressor_brotli()
+    for bloco in sequencia:
+        saida = compressor.process(bloco)
+        if saida:
+            yield saida
+    yield compressor.finish()
+
+
+async def comprimir_sequencia_async(codificacao, sequencia):
+    if codificacao == 'gzip':
+        # Um membro gzip por bloco, como o GZipMiddleware em modo assíncrono
+        async for bloco in sequencia:
+            yield compress_string(bloco, max_random_bytes=BYTES_ALEATORIOS)
+        return
+    compressor = _compressor_brotli()
+    async for bloco in sequencia:
+        saida = compressor.process(bloco)
+        if saida:
+            yield saida
+    yield compressor.finish()
+
+
+def _tipo(response):
+    return response.get('Content-Type', '').split(';')[0].strip().lower()
+
+
+def _comprimivel(response):
+    if response.has_header('Content-Encoding') or response.status_code == 206:
+        return False
+    if any(response.has_header(h) for h in ('Accept-Ranges', 'X-Accel-Redirect', 'X-Sendfile')):
+        return False
+    if _tipo(response) not in TIPOS_COMPRIMIVEIS:
+        return False
+    return response.streaming or len(response.content) >= _min_bytes()
+
+
+class CompressaoMiddleware:
+    """Brotli/gzip negociado por Accept-Encoding, com mitigação BREACH (ver docstring do módulo)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not _comprimivel(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codificacao = codificacao_aceite(
+            request.headers.get('Accept-Encoding', ''), brotli_permitido=_tipo(response) not in TIPOS_SO_GZIP
+        )
+        if codificacao is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = comprimir_sequencia_async(codificacao, response.streaming_content)
+            else:
+                response.streaming_content = comprimir_sequencia(codificacao, response.streaming_content)
+            del response['Content-Length']
+        else:
+            comprimido = comprimir_conteudo(codificacao, response.content)
+            if len(comprimido) >= len(response.content):
+                return response
+            response.content = comprimido
+            response['Content-Length'] = str(len(comprimido))
+
+        # O corpo mudou: um ETag forte passa a fraco (como no GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = codificacao
+        return response
+
+
+class EstaticosComprimidos(ManifestStaticFilesStorage):
+    """Manifesto com hash no nome e variantes .br/.gz pré-comprimidas"""
+
+    # Sem manifesto (desenvolvimento, testes) os nomes sem hash continuam válidos
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        finais = {}
+        for nome, nome_hash, processado in super().post_process(paths, dry_run, **options):
+            # Ficheiros ajustáveis (CSS) aparecem mais de uma vez; vale o último nome
+            if nome_hash and not isinstance(processado, Exception):
+                finais[nome] = nome_hash
+            yield nome, nome_hash, processado
+        if dry_run:
+            return
+        pendentes = [
+            nome for nome in set(finais.values())
+            if os.path.splitext(nome)[1].lower() in EXTENSOES_COMPRIMIVEIS
+        ]
+        # zlib e brotli libertam o GIL: as threads comprimem em paralelo
+        with ThreadPoolExecutor() as executor:
+            list(executor.map(self.gravar_comprimidos, pendentes))
+
+    def gravar_comprimidos(self, nome):
+        """Grava nome.br e nome.gz se ainda não existirem e forem menores que o original"""
+        caminho = self.path(nome)
+        variantes = [('.gz', lambda dados: gzip.compress(dados, 9, mtime=0))]
+        if brotli is not None:
+            variantes.append(('.br', lambda dados: brotli.compress(dados, quality=11)))
+        dados = None
+        for extensao, comprimir in variantes:
+            destino = caminho + extensao
+            if os.path.exists(destino):
+                continue
+            if dados is None:
+                with open(caminho, 'rb') as f:
+                    dados = f.read()
+            comprimido = comprimir(dados)
+            if len(comprimido) < len(dados):
+                with open(destino, 'wb') as f:
+                    f.write(comprimido)
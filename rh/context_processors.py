@@ -0,0 +1,32 @@
+from .cache_empresa import GRUPO_EMPRESA, versoes
+
+
+class VersoesDados:
+    """
+    Versões do cache da empresa do utilizador, lidas só quando usadas
+    (ex.: {% cache 300 filtros request.user.empresa_id versoes_dados.cargo %}).
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self._lidas = {}
+
+    def __getitem__(self, grupo):
+        empresa_id = getattr(self.request.user, 'empresa_id', None)
+        if empresa_id is None:
+            return ''
+        if grupo not in self._lidas:
+            self._lidas[grupo] = versoes(empresa_id, [grupo])[grupo]
+        return self._lidas[grupo]
+
+    def __str__(self):
+        return str(self[GRUPO_EMPRESA])
+
+
+def cache_empresa(request):
+    """Chaves dos fragmentos em cache: versões da empresa e secção do menu"""
+    return {
+        'versoes_dados': VersoesDados(request),
+        # Primeiro segmento do caminho: o menu lateral só muda de uma secção para outra
+        'secao_menu': request.path.strip('/').split('/', 1)[0],
+    }
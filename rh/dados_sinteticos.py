@@ -0,0 +1,279 @@
+import random
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import (
+    Departamento, Cargo, TurnoTrabalho, Funcionario, Presenca, Falta,
+    Ferias, FolhaPagamento
+)
+from .saldo_ferias import recalcular_saldos
+from .pesquisa import reindexar
+from .cache_empresa import invalidar_tudo
+from .utils import calcular_inss_moz, calcular_irps_moz
+
+
+NOMES = [
+    'Ana', 'Carlos', 'Fátima', 'João', 'Maria', 'Paulo', 'Rosa', 'Samuel',
+    'Teresa', 'Víctor', 'Amélia', 'Benedito', 'Celeste', 'Domingos', 'Ercília',
+    'Felisberto', 'Graça', 'Hélder', 'Isabel', 'Jacinto',
+]
+APELIDOS = [
+    'Machava', 'Cossa', 'Mondlane', 'Sitoe', 'Nhantumbo', 'Macuácua', 'Tembe',
+    'Chissano', 'Langa', 'Mabunda', 'Muianga', 'Nhaca', 'Bila', 'Cumbe', 'Zimba',
+]
+NIVEIS = [codigo for codigo, _ in Cargo._meta.get_field('nivel_hierarquico').choices]
+
+
+class GeradorDadosSinteticos:
+    """
+    Gera um tenant realista para testes de desempenho.
+
+    Os registos são inseridos em lote (bulk_create, ou executemany para as
+    presenças) e os valores derivam de um gerador aleatório com semente fixa,
+    por isso duas execuções com os mesmos parâmetros produzem os mesmos dados.
+    Numa empresa que já tem dados sintéticos, siglas, matrículas, e-mails e
+    CPFs continuam a numeração das execuções anteriores.
+    """
+
+    def __init__(self, empresa, semente=42, lote=2000):
+        self.empresa = empresa
+        self.random = random.Random(semente)
+        self.lote = lote
+        self.prefixo = f'{empresa.pk}'
+
+    @transaction.atomic
+    def gerar(self, departamentos=5, cargos_por_departamento=4, turnos=3,
+              funcionarios=100, meses=12, data_fim=None):
+        """Gera todos os dados e devolve a contagem por modelo"""
+        data_fim = data_fim or date.today()
+        data_inicio = self._subtrair_meses(data_fim, meses)
+
+        deps = self.gerar_departamentos(departamentos)
+        cargos = self.gerar_cargos(deps, cargos_por_departamento)
+        lista_turnos = self.gerar_turnos(turnos)
+        funcs = self.gerar_funcionarios(funcionarios, cargos, lista_turnos, data_inicio)
+
+        contagem = {
+            'departamentos': len(deps),
+            'cargos': len(cargos),
+            'turnos': len(lista_turnos),
+            'funcionarios': len(funcs),
+            'presencas': self.gerar_presencas(funcs, data_inicio, data_fim),
+            'faltas': self.gerar_faltas(funcs, data_inicio, data_fim),
+            'ferias': self.gerar_ferias(funcs, data_inicio, data_fim),
+            'folhas_pagamento': self.gerar_folhas(funcs, data_inicio, data_fim),
+            'movimentos_ferias': recalcular_saldos(Funcionario.objects.filter(empresa=self.empresa), data_fim),
+            # bulk_create não dispara os sinais que mantêm o índice de pesquisa
+            'indice_pesquisa': reindexar(self.empresa.pk),
+        }
+        # bulk_create também não incrementa as versões do cache da empresa
+        invalidar_tudo(self.empresa.pk)
+        return contagem
+
+    def gerar_departamentos(self, quantidade):
+        inicio = self._ultimo_numero(Departamento, 'sigla', f'D{self.prefixo}-') or 0
+        objs = [
+            Departamento(
+                empresa=self.empresa,
+                nome=f'Departamento {n}',
+                sigla=f'D{self.prefixo}-{n}'[:10],
+            )
+            for n in range(inicio + 1, inicio + quantidade + 1)
+        ]
+        return Departamento.objects.bulk_create(objs, batch_size=self.lote)
+
+    def gerar_cargos(self, departamentos, por_departamento):
+        objs = []
+        for dep in departamentos:
+            for i in range(por_departamento):
+                objs.append(Cargo(
+                    empresa=self.empresa,
+                    departamento=dep,
+                    nome=f'Cargo {dep.sigla}/{i + 1}',
+                    nivel_hierarquico=self.random.choice(NIVEIS),
+                    salario_base=Decimal(self.random.randrange(8000, 120000, 500)),
+                ))
+        return Cargo.objects.bulk_create(objs, batch_size=self.lote)
+
+    def gerar_turnos(self, quantidade):
+        modelos = [
+            ('8h', Decimal('8'), Decimal('40'), 5),
+            ('6h', Decimal('6'), Decimal('30'), 5),
+            ('12h', Decimal('12'), Decimal('48'), 4),
+            ('4h', Decimal('4'), Decimal('20'), 5),
+        ]
+        existentes = TurnoTrabalho.objects.filter(empresa=self.empresa).count()
+        objs = []
+        for i in range(quantidade):
+            tipo, diarias, semanais, dias = modelos[i % len(modelos)]
+            objs.append(TurnoTrabalho(
+                empresa=self.empresa,
+                nome=f'Turno {existentes + i + 1}',
+                tipo=tipo,
+                horas_diarias=diarias,
+                horas_semanais=semanais,
+                dias_trabalho_semana=dias,
+            ))
+        return TurnoTrabalho.objects.bulk_create(objs, batch_size=self.lote)
+
+    def gerar_funcionarios(self, quantidade, cargos, turnos, data_inicio):
+        rnd = self.random
+        hoje = date.today()
+        ultimo = self._ultimo_numero(Funcionario, 'matricula', f'E{self.prefixo}-')
+        inicio = 0 if ultimo is None else ultimo + 1
+        objs = []
+        for i in range(inicio, inicio + quantidade):
+            cargo = rnd.choice(cargos)
+            # A maioria já estava na empresa no início do período
+            if rnd.random() < 0.9:
+                admissao = data_inicio - timedelta(days=rnd.randint(30, 3650))
+            else:
+                admissao = data_inicio + timedelta(days=rnd.randint(0, max((hoje - data_inicio).days, 1)))
+            status = rnd.choices(['Ativo', 'Afastado', 'Demitido'], weights=[92, 5, 3])[0]
+            objs.append(Funcionario(
+                empresa=self.empresa,
+                matricula=f'E{self.prefixo}-{i:07d}',
+                nome_completo=f'{rnd.choice(NOMES)} {rnd.choice(APELIDOS)} {i}',
+                email_corporativo=f'func{i}.e{self.prefixo}@exemplo.co.mz',
+                cpf=f'{self.prefixo[-4:]:0>4}{i:010d}',
+                data_nascimento=date(rnd.randint(1960, 2003), rnd.randint(1, 12), rnd.randint(1, 28)),
+                endereco='Av. 24 de Julho, Maputo',
+                cargo=cargo,
+                departamento_id=cargo.departamento_id,
+                turno=rnd.choice(turnos) if turnos else None,
+                data_admissao=admissao,
+                tipo_contrato=rnd.choice(['Efetivo', 'PrazoDeterminado']),
+                salario_atual=cargo.salario_base,
+                status=status,
+            ))
+        return Funcionario.objects.bulk_create(objs, batch_size=self.lote)
+
+    def gerar_presencas(self, funcionarios, data_inicio, data_fim):
+        """
+        Gera um registo de presença por funcionário e dia útil.
+
+        É a tabela mais volumosa (milhões de linhas em tenants grandes), por
+        isso as linhas são montadas como tuplas já adaptadas para a base de
+        dados e inseridas com executemany, sem instanciar modelos.
+        """
+        rnd = self.random
+        ops = connection.ops
+        agora = ops.adapt_datetimefield_value(timezone.now())
+        dias = [(d, ops.adapt_datefield_value(d)) for d in self._dias(data_inicio, data_fim) if d.weekday() < 5]
+        # Horários possíveis pré-adaptados: entrada entre 07:30 e 08:45
+        horarios = {m: ops.adapt_timefield_value(time(m // 60, m % 60)) for m in range(7 * 60, 18 * 60)}
+        limite_atraso = 8 * 60 + 10
+
+        campos = ['empresa_id', 'funcionario_id', 'data', 'hora_entrada', 'hora_saida',
+                  'horas_trabalhadas', 'status', 'observacao', 'criada_em', 'atualizada_em']
+        total = 0
+        linhas = []
+        for func in funcionarios:
+            for dia, dia_db in dias:
+                if dia < func.data_admissao:
+                    continue
+                if rnd.random() < 0.04:
+                    linhas.append((self.empresa.pk, func.pk, dia_db, None, None, '0', 'Falta', '', agora, agora))
+                else:
+                    entrada = 450 + int(rnd.random() * 46)
+                    saida = entrada + 450 + int(rnd.random() * 91)
+                    linhas.append((
+                        self.empresa.pk, func.pk, dia_db, horarios[entrada], horarios[saida],
+                        f'{(saida - entrada) / 60:.2f}',
+                        'Atraso' if entrada > limite_atraso else 'Presente',
+                        '', agora, agora,
+                    ))
+                if len(linhas) >= self.lote:
+                    total += self._inserir_linhas(Presenca, campos, linhas)
+                    linhas = []
+        if linhas:
+            total += self._inserir_linhas(Presenca, campos, linhas)
+        return total
+
+    def gerar_faltas(self, funcionarios, data_inicio, data_fim):
+        rnd = self.random
+        periodo = (data_fim - data_inicio).days
+        tipos = [codigo for codigo, _ in Falta.TIPO_FALTA]
+        objs = []
+        for func in funcionarios:
+            for _ in range(rnd.randint(0, 4)):
+                objs.append(Falta(
+                    empresa=self.empresa,
+                    funcionario=func,
+                    data=data_inicio + timedelta(days=rnd.randint(0, periodo)),
+                    tipo=rnd.choice(tipos),
+                    motivo='Gerada automaticamente',
+                ))
+        Falta.objects.bulk_create(objs, batch_size=self.lote)
+        return len(objs)
+
+    def gerar_ferias(self, funcionarios, data_inicio, data_fim):
+        rnd = self.random
+        periodo = (data_fim - data_inicio).days
+        objs = []
+        for func in funcionarios:
+            for _ in range(max(1, periodo // 365) if rnd.random() < 0.8 else 0):
+                inicio = data_inicio + timedelta(days=rnd.randint(0, max(periodo - 30, 0)))
+                fim = inicio + timedelta(days=rnd.randint(4, 29))
+                dias_totais = (fim - inicio).days + 1
+                objs.append(Ferias(
+                    empresa=self.empresa,
+                    funcionario=func,
+                    data_inicio=inicio,
+                    data_fim=fim,
+                    dias_totais=dias_totais,
+                    dias_uteis=max(1, dias_totais * 5 // 7),
+                    status=rnd.choices(['Aprovada', 'Solicitada', 'Rejeitada', 'Gozada'], weights=[50, 20, 10, 20])[0],
+                ))
+        Ferias.objects.bulk_create(objs, batch_size=self.lote)
+        return len(objs)
+
+    def gerar_folhas(self, funcionarios, data_inicio, data_fim):
+        objs = []
+        competencias = sorted({(d.year, d.month) for d in self._dias(data_inicio, data_fim)})
+        for func in funcionarios:
+            salario = func.salario_atual
+            inss = calcular_inss_moz(salario)
+            irps = calcular_irps_moz(salario, inss)
+            for ano, mes in competencias:
+                objs.append(FolhaPagamento(
+                    empresa=self.empresa,
+                    funcionario=func,
+                    mes_referencia=mes,
+                    ano_referencia=ano,
+                    salario_base=salario,
+                    inss=inss,
+                    irrf=irps,
+                    salario_liquido=salario - inss - irps,
+                    data_pagamento=date(ano, mes, 25 if mes != 2 else 28),
+                ))
+        FolhaPagamento.objects.bulk_create(objs, batch_size=self.lote)
+        return len(objs)
+
+    @staticmethod
+    def _ultimo_numero(modelo, campo, prefixo):
+        """Maior número já usado em `campo` após `prefixo` (None se não há registos)"""
+        valores = modelo.objects.filter(**{f'{campo}__startswith': prefixo}).values_list(campo, flat=True)
+        return max((int(v[len(prefixo):]) for v in valores if v[len(prefixo):].isdigit()), default=None)
+
+    @staticmethod
+    def _inserir_linhas(modelo, campos, linhas):
+        tabela = connection.ops.quote_name(modelo._meta.db_table)
+        colunas = ', '.join(connection.ops.quote_name(modelo._meta.get_field(c).column) for c in campos)
+        marcadores = ', '.join(['%s'] * len(campos))
+        with connection.cursor() as cursor:
+            cursor.executemany(f'INSERT INTO {tabela} ({colunas}) VALUES ({marcadores})', linhas)
+        return len(linhas)
+
+    @staticmethod
+    def _dias(inicio, fim):
+        for n in range((fim - inicio).days + 1):
+            yield inicio + timedelta(days=n)
+
+    @staticmethod
+    def _subtrair_meses(data, meses):
+        ano, mes = divmod(data.year * 12 + data.month - 1 - meses, 12)
+        return date(ano, mes + 1, 1)
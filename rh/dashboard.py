@@ -0,0 +1,111 @@
+"""
+Widgets do dashboard.
+
+A página do dashboard é só o esqueleto, sem consultas: cada widget é
+pedido pelo navegador, em paralelo, a dashboard/widgets/<nome>/, e o
+widget mais lento já não atrasa o primeiro byte da página. O HTML de
+cada widget fica em cache por empresa (rh.cache_empresa) com o seu
+próprio TTL (RH_DASHBOARD_TTL sobrepõe o padrão) e é invalidado pelas
+versões dos modelos de que depende; os widgets que dependem da data
+(aniversariantes do mês, admissões dos últimos 30 dias) incluem o dia na
+chave. O navegador revalida cada widget por ETag.
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Callable
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.template.loader import render_to_string
+
+from . import cache_empresa
+from .models import Cargo, Departamento, Ferias, Funcionario
+
+
+@dataclass(frozen=True)
+class Widget:
+    nome: str
+    template: str
+    grupos: tuple
+    ttl: int
+    contexto: Callable
+    por_dia: bool = False
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'RH_DASHBOARD_TTL', {}).get(self.nome, self.ttl)
+
+    @property
+    def id_grafico(self):
+        return f'grafico-{self.nome}'
+
+
+def _totais(empresa_id, hoje):
+    ativos = Funcionario.objects.filter(empresa_id=empresa_id, status='Ativo')
+    return {
+        'total_funcionarios': ativos.count(),
+        'funcionarios_recentes': ativos.filter(data_admissao__gte=hoje - timedelta(days=30)).count(),
+        'total_departamentos': Departamento.objects.filter(empresa_id=empresa_id, ativo=True).count(),
+        'total_cargos': Cargo.objects.filter(empresa_id=empresa_id, ativo=True).count(),
+    }
+
+
+def _departamentos(empresa_id, hoje):
+    departamentos = Departamento.objects.filter(funcionario__empresa_id=empresa_id, ativo=True).annotate(
+        total_funcionarios=Count('funcionario', filter=Q(funcionario__status='Ativo'))
+    ).order_by('-total_funcionarios')[:5]
+    return {'grafico': {
+        'tipo': 'bar',
+        'rotulos': [d.nome for d in departamentos],
+        'valores': [d.total_funcionarios for d in departamentos],
+    }}
+
+
+def _status(empresa_id, hoje):
+    linhas = Funcionario.objects.filter(empresa_id=empresa_id).values('status').annotate(
+        total=Count('id')
+    ).order_by('status')
+    return {'grafico': {
+        'tipo': 'doughnut',
+        'rotulos': [linha['status'] for linha in linhas],
+        'valores': [linha['total'] for linha in linhas],
+    }}
+
+
+def _aniversariantes(empresa_id, hoje):
+    return {'aniversariantes': Funcionario.objects.filter(
+        empresa_id=empresa_id, data_nascimento__month=hoje.month, status='Ativo'
+    ).select_related('departamento').order_by('data_nascimento__day')[:10]}
+
+
+def _ferias_recentes(empresa_id, hoje):
+    return {'ferias_recentes': Ferias.objects.filter(
+        funcionario__empresa_id=empresa_id, status__in=['Aprovada', 'Solicitada']
+    ).select_related('funcionario').order_by('-solicitada_em')[:5]}
+
+
+WIDGETS = {w.nome: w for w in [
+    Widget('totais', 'rh/parciais/widget_totais.html', ('funcionario', 'departamento', 'cargo'), 300, _totais,
+           por_dia=True),
+    Widget('departamentos', 'rh/parciais/widget_grafico.html', ('funcionario', 'departamento'), 600, _departamentos),
+    Widget('status', 'rh/parciais/widget_grafico.html', ('funcionario',), 600, _status),
+    Widget('aniversariantes', 'rh/parciais/widget_aniversariantes.html', ('funcionario', 'departamento'), 3600,
+           _aniversariantes, por_dia=True),
+    Widget('ferias_recentes', 'rh/parciais/widget_ferias_recentes.html', ('ferias', 'funcionario'), 120,
+           _ferias_recentes),
+]}
+
+
+def renderizar(widget, request, hoje=None):
+    """HTML do widget para a empresa do utilizador, do cache se as versões não mudaram"""
+    hoje = hoje or date.today()
+    empresa_id = request.user.empresa_id
+
+    def calcular():
+        contexto = {'widget': widget, **widget.contexto(empresa_id, hoje)}
+        return render_to_string(widget.template, contexto, request)
+
+    partes = (hoje.isoformat(),) if widget.por_dia else ()
+    return cache_empresa.obter(
+        empresa_id, f'widget:{widget.nome}', calcular, widget.grupos, partes, widget.timeout
+    )
@@ -10,6 +10,19 @@ from .models import (
 )
 from django.forms import inlineformset_factory
 import datetime
+from .calendario import dias_uteis
+from .cobertura import ferias_sobrepostas
+from .referencia import dados_referencia
+
+
+def usar_opcoes_em_cache(campo, queryset, opcoes):
+    """
+    Liga um ModelChoiceField às opções de rh.referencia: o queryset só é
+    consultado para validar o valor enviado, não para desenhar o select.
+    """
+    campo.queryset = queryset
+    vazio = [('', campo.empty_label)] if campo.empty_label is not None else []
+    campo.choices = vazio + list(opcoes)
 
 
 class EmpresaRHRegisterForm(UserCreationForm):
@@ -187,17 +200,16 @@ class FuncionarioForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
 
         if empresa:
-            self.fields['cargo'].queryset = Cargo.objects.filter(
-                empresa=empresa,
-                ativo=True
+            dados = dados_referencia(empresa.pk)
+            usar_opcoes_em_cache(
+                self.fields['cargo'], Cargo.objects.filter(empresa=empresa, ativo=True), dados.cargos
             )
-            self.fields['departamento'].queryset = Departamento.objects.filter(
-                empresa=empresa,
-                ativo=True
+            usar_opcoes_em_cache(
+                self.fields['departamento'], Departamento.objects.filter(empresa=empresa, ativo=True),
+                dados.departamentos,
             )
-            self.fields['turno'].queryset = TurnoTrabalho.objects.filter(
-                empresa=empresa,
-                ativo=True
+            usar_opcoes_em_cache(
+                self.fields['turno'], TurnoTrabalho.objects.filter(empresa=empresa, ativo=True), dados.turnos
             )
 
 
@@ -231,10 +243,23 @@ class FeriasForm(forms.ModelForm):
             
             dias_totais = (data_fim - data_inicio).days + 1
             cleaned_data['dias_totais'] = dias_totais
-            # Calcula dias úteis (simplificado)
-            dias_uteis = sum(1 for i in range(dias_totais) 
-                           if (data_inicio + datetime.timedelta(days=i)).weekday() < 5)
-            cleaned_data['dias_uteis'] = dias_uteis
+            # Calcula dias úteis (fins de semana e feriados excluídos)
+            funcionario = cleaned_data.get('funcionario')
+            cleaned_data['dias_uteis'] = dias_uteis(
+                data_inicio, data_fim, funcionario.empresa_id if funcionario else None
+            )
+
+            if funcionario and ferias_sobrepostas(
+                funcionario.id, data_inicio, data_fim, excluir_id=self.instance.pk
+            ).exists():
+                raise forms.ValidationError(
+                    "O funcionário já tem férias solicitadas ou aprovadas neste período."
+                )
+            if funcionario and cleaned_data['dias_uteis'] > funcionario.saldo_ferias:
+                raise forms.ValidationError(
+                    f"Saldo de férias insuficiente: {funcionario.saldo_ferias} dias disponíveis, "
+                    f"{cleaned_data['dias_uteis']} dias úteis pedidos."
+                )
         
         return cleaned_data
 
@@ -346,7 +371,7 @@ class DocumentoForm(forms.ModelForm):
             'tipo': forms.Select(attrs={'class': 'form-select'}),
             'numero': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Número do documento'}),
             'descricao': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Descrição'}),
-            'arquivo': forms.FileInput(attrs={'class': 'form-control'}),
+            'arquivo': forms.FileInput(attrs={'class': 'form-control', 'accept': 'application/pdf,image/*,.doc,.docx,.odt'}),
         }
 
 
@@ -471,6 +496,20 @@ class FuncionarioSearchForm(forms.Form):
         widget=forms.Select(attrs={'class': 'form-select'})
     )
 
+    def __init__(self, *args, **kwargs):
+        empresa = kwargs.pop('empresa', None)
+        super().__init__(*args, **kwargs)
+
+        if empresa:
+            dados = dados_referencia(empresa.pk)
+            usar_opcoes_em_cache(
+                self.fields['departamento'], Departamento.objects.filter(empresa=empresa, ativo=True),
+                dados.departamentos,
+            )
+            usar_opcoes_em_cache(
+                self.fields['cargo'], Cargo.objects.filter(empresa=empresa, ativo=True), dados.cargos
+            )
+
 
 class FeriasSearchForm(forms.Form):
     funcionario = forms.ModelChoiceField(
@@ -492,6 +531,13 @@ class FeriasSearchForm(forms.Form):
         widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Ano'})
     )
 
+    def __init__(self, *args, **kwargs):
+        empresa = kwargs.pop('empresa', None)
+        super().__init__(*args, **kwargs)
+
+        if empresa:
+            self.fields['funcionario'].queryset = Funcionario.objects.filter(empresa=empresa)
+
 
 class FolhaPagamentoSearchForm(forms.Form):
     funcionario = forms.ModelChoiceField(
@@ -513,6 +559,14 @@ class FolhaPagamentoSearchForm(forms.Form):
         widget=forms.Select(attrs={'class': 'form-select'})
     )
 
+    def __init__(self, *args, **kwargs):
+        empresa = kwargs.pop('empresa', None)
+        super().__init__(*args, **kwargs)
+
+        if empresa:
+            self.fields['funcionario'].queryset = Funcionario.objects.filter(empresa=empresa)
+            self.fields['departamento'].queryset = Departamento.objects.filter(empresa=empresa)
+
 
 class TurnoTrabalhoForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,163 @@
+"""
+Pesquisa de texto integral nos PDFs de Documento.
+
+O comando indexar_documentos (execução periódica) extrai o texto com pypdf
+num pool de processos e grava-o em TextoDocumento; o índice de texto é
+mantido pelo próprio banco (FTS5 em SQLite, GIN sobre to_tsvector em
+PostgreSQL, ver migração 0009). A extração é incremental: só entram os
+documentos PDF sem texto ou cujo ficheiro mudou desde a última extração
+(TextoDocumento.origem diferente de Documento.arquivo), consultados no
+banco, sem percorrer MEDIA_ROOT. Com o armazenamento deduplicado, ficheiros
+de conteúdo igual são extraídos uma única vez.
+
+A pesquisa é sempre limitada à empresa: em SQLite o id da empresa é uma
+coluna indexada do FTS5 e entra na própria expressão MATCH.
+"""
+import re
+from dataclasses import dataclass
+
+from django.db import connection
+from django.db.models import F
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .armazenamento import armazenamento_documentos
+from .models import Documento, TextoDocumento
+
+
+# Limite de texto guardado por documento (PDFs digitalizados enormes)
+MAX_CARACTERES = 500_000
+TERMOS_MAX = 10
+MARCA_INICIO, MARCA_FIM = '⟦', '⟧'
+
+
+@dataclass
+class ResultadoPesquisa:
+    documento: Documento
+    trecho: str
+    relevancia: float
+
+
+def documentos_pendentes(empresa_id=None):
+    """PDFs sem texto extraído ou cujo ficheiro mudou desde a extração"""
+    qs = Documento.objects.filter(arquivo__iendswith='.pdf').exclude(texto__origem=F('arquivo'))
+    if empresa_id:
+        qs = qs.filter(empresa_id=empresa_id)
+    return qs
+
+
+def textos_obsoletos():
+    """Textos de documentos cujo ficheiro deixou de ser PDF"""
+    return TextoDocumento.objects.exclude(documento__arquivo__iendswith='.pdf')
+
+
+def extrair_texto(nome, storage=None):
+    from pypdf import PdfReader
+
+    storage = storage or armazenamento_documentos
+    partes = []
+    total = 0
+    with storage.open(nome, 'rb') as f:
+        for pagina in PdfReader(f).pages:
+            texto = pagina.extract_text() or ''
+            partes.append(texto)
+            total += len(texto)
+            if total >= MAX_CARACTERES:
+                break
+    # O NUL não é aceite pelo PostgreSQL em colunas de texto
+    return '\n'.join(partes)[:MAX_CARACTERES].replace('\x00', '')
+
+
+def gravar_textos(linhas, resultados):
+    """
+    Grava (insere ou substitui) o texto dos documentos. `linhas` são tuplos
+    (pk, empresa_id, nome do ficheiro) e `resultados` mapeia o nome do
+    ficheiro para (texto, erro).
+    """
+    objetos = []
+    for pk, empresa_id, nome in linhas:
+        if nome not in resultados:
+            continue
+        texto, erro = resultados[nome]
+        objetos.append(TextoDocumento(
+            documento_id=pk, empresa_id=empresa_id, origem=nome, texto=texto or '', erro=(erro or '')[:200]
+        ))
+    TextoDocumento.objects.bulk_create(
+        objetos, batch_size=200, update_conflicts=True, unique_fields=['documento'],
+        update_fields=['empresa', 'origem', 'texto', 'erro', 'extraido_em'],
+    )
+    return len(objetos)
+
+
+def reconstruir_indice():
+    """Reconstrói o índice FTS5 a partir de rh_textodocumento (só SQLite)"""
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO rh_documento_fts(rh_documento_fts) VALUES ('rebuild')")
+
+
+def _termos(consulta):
+    return re.findall(r'\w+', consulta or '')[:TERMOS_MAX]
+
+
+def _trecho_html(trecho):
+    return mark_safe(escape(trecho).replace(MARCA_INICIO, '<mark>').replace(MARCA_FIM, '</mark>'))
+
+
+def _trecho_local(texto, termos, largura=160):
+    """Trecho à volta do primeiro termo encontrado (bancos sem FTS)"""
+    minusculo = texto.lower()
+    posicao = min((minusculo.find(t.lower()) for t in termos if t.lower() in minusculo), default=0)
+    inicio = max(posicao - largura // 2, 0)
+    trecho = texto[inicio:inicio + largura]
+    for termo in termos:
+        trecho = re.sub(f'({re.escape(termo)})', f'{MARCA_INICIO}\\1{MARCA_FIM}', trecho, flags=re.IGNORECASE)
+    return ('…' if inicio else '') + trecho + '…'
+
+
+def _consultar(empresa_id, termos, limite):
+    """Lista de (documento_id, trecho com marcas, relevância), mais relevantes primeiro"""
+    if connection.vendor == 'sqlite':
+        expressao = ' '.join('"{}"*'.format(t.replace('"', '""')) for t in termos)
+        sql = (
+            "SELECT rowid, snippet(rh_documento_fts, 0, %s, %s, '…', 16), bm25(rh_documento_fts, 1.0, 0.0) AS r "
+            "FROM rh_documento_fts WHERE rh_documento_fts MATCH %s ORDER BY r LIMIT %s"
+        )
+        parametros = [MARCA_INICIO, MARCA_FIM, f'empresa_id : "{int(empresa_id)}" AND texto : ({expressao})', limite]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, parametros)
+            # bm25 é negativo: quanto menor, mais relevante
+            return [(pk, trecho, -r) for pk, trecho, r in cursor.fetchall()]
+
+    if connection.vendor == 'postgresql':
+        sql = (
+            "SELECT documento_id, ts_headline('portuguese', texto, q, %s), "
+            "ts_rank(to_tsvector('portuguese', texto), q) AS r "
+            "FROM rh_textodocumento, plainto_tsquery('portuguese', %s) q "
+            "WHERE empresa_id = %s AND to_tsvector('portuguese', texto) @@ q ORDER BY r DESC LIMIT %s"
+        )
+        opcoes = f'StartSel={MARCA_INICIO}, StopSel={MARCA_FIM}, MaxWords=30, MinWords=10'
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [opcoes, ' '.join(termos), empresa_id, limite])
+            return cursor.fetchall()
+
+    qs = TextoDocumento.objects.filter(empresa_id=empresa_id)
+    for termo in termos:
+        qs = qs.filter(texto__icontains=termo)
+    return [(pk, _trecho_local(texto, termos), 0.0) for pk, texto in qs.values_list('pk', 'texto')[:limite]]
+
+
+def pesquisar(empresa_id, consulta, limite=20):
+    """Documentos da empresa cujo texto contém todos os termos, por relevância"""
+    termos = _termos(consulta)
+    if not termos:
+        return []
+    encontrados = _consultar(empresa_id, termos, limite)
+    documentos = Documento.objects.filter(
+        empresa_id=empresa_id, pk__in=[pk for pk, _, _ in encontrados]
+    ).select_related('funcionario').in_bulk()
+    return [
+        ResultadoPesquisa(documentos[pk], _trecho_html(trecho), relevancia)
+        for pk, trecho, relevancia in encontrados
+        if pk in documentos
+    ]
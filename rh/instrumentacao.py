@@ -0,0 +1,133 @@
+import contextvars
+import threading
+import time
+
+from django.template.backends.django import DjangoTemplates, Template as DjangoTemplate
+
+
+# Métricas da requisição corrente (None fora do middleware)
+_metricas_atuais = contextvars.ContextVar('rh_metricas_atuais', default=None)
+
+
+class MetricasRequisicao:
+    """Acumula as medições de uma única requisição"""
+
+    __slots__ = ('consultas', 'tempo_sql', 'tempo_template', 'tempo_total')
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_sql = 0.0
+        self.tempo_template = 0.0
+        self.tempo_total = 0.0
+
+
+class RegistroMetricas:
+    """Agregados por nome de URL, mantidos em memória no processo"""
+
+    CAMPOS = ('requisicoes', 'consultas', 'tempo_sql', 'tempo_template',
+              'tempo_total', 'max_consultas', 'max_tempo_total', 'orcamento_excedido')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dados = {}
+
+    def registrar(self, view, metricas, excedeu=False):
+        with self._lock:
+            dados = self._dados.get(view)
+            if dados is None:
+                dados = self._dados[view] = dict.fromkeys(self.CAMPOS, 0)
+            dados['requisicoes'] += 1
+            dados['consultas'] += metricas.consultas
+            dados['tempo_sql'] += metricas.tempo_sql
+            dados['tempo_template'] += metricas.tempo_template
+            dados['tempo_total'] += metricas.tempo_total
+            dados['max_consultas'] = max(dados['max_consultas'], metricas.consultas)
+            dados['max_tempo_total'] = max(dados['max_tempo_total'], metricas.tempo_total)
+            if excedeu:
+                dados['orcamento_excedido'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {view: dict(dados) for view, dados in self._dados.items()}
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+
+
+registro = RegistroMetricas()
+
+
+def contar_consulta(execute, sql, params, many, context):
+    """Execute wrapper que conta consultas e tempo de SQL da requisição corrente"""
+    metricas = _metricas_atuais.get()
+    if metricas is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metricas.consultas += 1
+        metricas.tempo_sql += time.perf_counter() - inicio
+
+
+class TemplateInstrumentado(DjangoTemplate):
+    def render(self, context=None, request=None):
+        metricas = _metricas_atuais.get()
+        if metricas is None:
+            return super().render(context, request)
+        inicio = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metricas.tempo_template += time.perf_counter() - inicio
+
+
+class DjangoTemplatesInstrumentado(DjangoTemplates):
+    """Backend de templates do Django que mede o tempo de renderização"""
+
+    def from_string(self, template_code):
+        return TemplateInstrumentado(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TemplateInstrumentado(template.template, self)
+
+
+def formatar_json(snapshot):
+    """Converte o snapshot do registro em dicionário serializável"""
+    views = {}
+    for view, dados in sorted(snapshot.items()):
+        n = dados['requisicoes'] or 1
+        views[view] = {
+            'requisicoes': dados['requisicoes'],
+            'consultas_media': round(dados['consultas'] / n, 2),
+            'consultas_max': dados['max_consultas'],
+            'tempo_sql_ms_medio': round(dados['tempo_sql'] * 1000 / n, 3),
+            'tempo_template_ms_medio': round(dados['tempo_template'] * 1000 / n, 3),
+            'tempo_total_ms_medio': round(dados['tempo_total'] * 1000 / n, 3),
+            'tempo_total_ms_max': round(dados['max_tempo_total'] * 1000, 3),
+            'orcamento_excedido': dados['orcamento_excedido'],
+        }
+    return {'views': views}
+
+
+_METRICAS_PROMETHEUS = [
+    ('rh_requisicoes_total', 'counter', 'Requisições atendidas', 'requisicoes'),
+    ('rh_consultas_sql_total', 'counter', 'Consultas SQL executadas', 'consultas'),
+    ('rh_tempo_sql_segundos_total', 'counter', 'Tempo gasto em SQL', 'tempo_sql'),
+    ('rh_tempo_template_segundos_total', 'counter', 'Tempo gasto renderizando templates', 'tempo_template'),
+    ('rh_tempo_total_segundos_total', 'counter', 'Tempo total das requisições', 'tempo_total'),
+    ('rh_orcamento_consultas_excedido_total', 'counter', 'Requisições acima do orçamento de consultas', 'orcamento_excedido'),
+]
+
+
+def formatar_prometheus(snapshot):
+    """Converte o snapshot do registro no formato texto do Prometheus"""
+    linhas = []
+    for nome, tipo, ajuda, campo in _METRICAS_PROMETHEUS:
+        linhas.append(f'# HELP {nome} {ajuda}')
+        linhas.append(f'# TYPE {nome} {tipo}')
+        for view, dados in sorted(snapshot.items()):
+            linhas.append(f'{nome}{{view="{view}"}} {dados[campo]}')
+    return '\n'.join(linhas) + '\n'
@@ -0,0 +1,171 @@
+"""
+Linha do tempo unificada do funcionário.
+
+Cada fonte (admissão, férias, faltas, exceções de ponto, folhas,
+avaliações, documentos, advertências e treinamentos) é consultada já
+ordenada por (data, id) decrescente e limitada ao tamanho da página; as
+listas são intercaladas com heapq.merge (k-way merge) pela chave
+(data, tipo, id). A paginação usa essa mesma chave como cursor (keyset):
+cada fonte filtra apenas os eventos anteriores ao cursor, por isso
+carregar eventos mais antigos não percorre o histórico já mostrado.
+"""
+import base64
+import heapq
+from datetime import date
+
+from django.db.models import DateField, F, Q
+from django.db.models.functions import Cast, Coalesce
+
+from .models import (
+    Funcionario, Ferias, Falta, Presenca, FolhaPagamento, AvaliacaoDesempenho,
+    Documento, Advertencia, ParticipacaoTreinamento
+)
+
+
+# Estados de ponto que aparecem na linha do tempo
+PRESENCA_EXCECOES = ('Falta', 'Falta_Justificada', 'Atraso', 'Saida_Antecipada')
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def codificar_cursor(data, tipo, pk):
+    texto = f'{data.isoformat()}~{tipo}~{pk}'
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    try:
+        texto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        data, tipo, pk = texto.split('~')
+        return date.fromisoformat(data), tipo, int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise CursorInvalido(str(e))
+
+
+class Fonte:
+    """Uma fonte de eventos: queryset do funcionário, expressão da data e formatação"""
+
+    def __init__(self, tipo, consulta, data, campos, titulo, detalhe=None):
+        self.tipo = tipo
+        self.consulta = consulta
+        self.data = data
+        self.campos = campos
+        self.titulo = titulo
+        self.detalhe = detalhe
+
+    def _antes_do_cursor(self, cursor):
+        # Ordem decrescente por (data, tipo, id): ver módulo
+        data, tipo, pk = cursor
+        if self.tipo < tipo:
+            return Q(data_evento__lte=data)
+        if self.tipo > tipo:
+            return Q(data_evento__lt=data)
+        return Q(data_evento__lt=data) | Q(data_evento=data, pk__lt=pk)
+
+    def eventos(self, funcionario, limite, cursor=None):
+        qs = self.consulta(funcionario).annotate(data_evento=self.data)
+        if cursor is not None:
+            qs = qs.filter(self._antes_do_cursor(cursor))
+        linhas = qs.order_by('-data_evento', '-pk').values('pk', 'data_evento', *self.campos)[:limite]
+        return [
+            {
+                'tipo': self.tipo,
+                'id': linha['pk'],
+                'data': linha['data_evento'],
+                'titulo': self.titulo(linha),
+                'detalhe': self.detalhe(linha) if self.detalhe else '',
+            }
+            for linha in linhas
+        ]
+
+
+FONTES = [
+    Fonte(
+        'admissao',
+        lambda f: Funcionario.objects.filter(pk=f.pk),
+        F('data_admissao'), ['cargo__nome'],
+        lambda l: 'Admissão',
+        lambda l: l['cargo__nome'],
+    ),
+    Fonte(
+        'advertencia',
+        lambda f: Advertencia.objects.filter(funcionario=f),
+        F('data_ocorrencia'), ['tipo', 'motivo'],
+        lambda l: f'Advertência ({l["tipo"]})',
+        lambda l: l['motivo'][:120],
+    ),
+    Fonte(
+        'avaliacao',
+        lambda f: AvaliacaoDesempenho.objects.filter(funcionario=f),
+        F('periodo_fim'), ['nota_final', 'status'],
+        lambda l: f'Avaliação de desempenho - nota {l["nota_final"]}',
+        lambda l: l['status'],
+    ),
+    Fonte(
+        'documento',
+        lambda f: Documento.objects.filter(funcionario=f),
+        Coalesce('data_emissao', Cast('criado_em', DateField())), ['tipo', 'numero'],
+        lambda l: f'Documento {l["tipo"]}',
+        lambda l: l['numero'],
+    ),
+    Fonte(
+        'falta',
+        lambda f: Falta.objects.filter(funcionario=f),
+        F('data'), ['tipo', 'motivo'],
+        lambda l: f'Falta ({l["tipo"]})',
+        lambda l: l['motivo'][:120],
+    ),
+    Fonte(
+        'ferias',
+        lambda f: Ferias.objects.filter(funcionario=f),
+        F('data_inicio'), ['data_fim', 'dias_uteis', 'status'],
+        lambda l: f'Férias - {l["dias_uteis"]} dias úteis',
+        lambda l: f'até {l["data_fim"]:%d/%m/%Y} ({l["status"]})',
+    ),
+    Fonte(
+        'folha',
+        lambda f: FolhaPagamento.objects.filter(funcionario=f),
+        F('data_pagamento'), ['mes_referencia', 'ano_referencia', 'salario_liquido'],
+        lambda l: f'Folha {l["mes_referencia"]:02d}/{l["ano_referencia"]}',
+        lambda l: f'Líquido MZN {l["salario_liquido"]:.2f}',
+    ),
+    Fonte(
+        'presenca',
+        lambda f: Presenca.objects.filter(funcionario=f, status__in=PRESENCA_EXCECOES),
+        F('data'), ['status', 'hora_entrada'],
+        lambda l: f'Ponto: {l["status"].replace("_", " ")}',
+        lambda l: f'entrada {l["hora_entrada"]:%H:%M}' if l['hora_entrada'] else '',
+    ),
+    Fonte(
+        'treinamento',
+        lambda f: ParticipacaoTreinamento.objects.filter(funcionario=f),
+        F('treinamento__data_inicio'), ['treinamento__nome', 'status'],
+        lambda l: f'Treinamento: {l["treinamento__nome"]}',
+        lambda l: l['status'],
+    ),
+]
+
+
+def _chave(evento):
+    return evento['data'], evento['tipo'], evento['id']
+
+
+def linha_tempo(funcionario, limite=20, cursor=None):
+    """
+    Devolve (eventos, proximo_cursor) com até `limite` eventos anteriores ao
+    cursor, do mais recente para o mais antigo. Uma consulta por fonte.
+    """
+    posicao = decodificar_cursor(cursor) if cursor else None
+    fontes = [fonte.eventos(funcionario, limite + 1, posicao) for fonte in FONTES]
+    eventos = []
+    for evento in heapq.merge(*fontes, key=_chave, reverse=True):
+        eventos.append(evento)
+        if len(eventos) > limite:
+            break
+    proximo = None
+    if len(eventos) > limite:
+        eventos = eventos[:limite]
+        proximo = codificar_cursor(*_chave(eventos[-1]))
+    return eventos, proximo
@@ -0,0 +1,41 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rh.models import Empresa
+from rh.validade_documentos import enviar_resumo, resumo_validade
+
+
+class Command(BaseCommand):
+    help = (
+        'Envia a cada empresa o resumo dos documentos vencidos ou a vencer nos horizontes de '
+        'RH_VALIDADE_HORIZONTES (execução diária, ex.: cron). Uma consulta por empresa.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, help='ID da empresa (padrão: todas as ativas)')
+        parser.add_argument('--data', help='Data de referência AAAA-MM-DD (padrão: hoje)')
+        parser.add_argument('--simular', action='store_true', help='Mostra os totais sem enviar e-mails')
+
+    def handle(self, *args, **opcoes):
+        try:
+            hoje = date.fromisoformat(opcoes['data']) if opcoes['data'] else date.today()
+        except ValueError:
+            raise CommandError('Data inválida; use AAAA-MM-DD.')
+
+        empresas = Empresa.objects.filter(ativa=True).select_related('gestor_rh')
+        if opcoes['empresa']:
+            empresas = empresas.filter(pk=opcoes['empresa'])
+            if not empresas.exists():
+                raise CommandError(f'Empresa {opcoes["empresa"]} não existe ou está inativa.')
+
+        enviados = 0
+        for empresa in empresas:
+            resumo = resumo_validade(empresa, hoje)
+            if not resumo.total:
+                continue
+            totais = ', '.join(f'{g.rotulo}: {len(g.documentos)}' for g in resumo.grupos if g.documentos)
+            self.stdout.write(f'{empresa.nome}: {totais}')
+            if not opcoes['simular']:
+                enviados += enviar_resumo(resumo)
+        self.stdout.write(self.style.SUCCESS(f'{enviados} resumos enviados.'))
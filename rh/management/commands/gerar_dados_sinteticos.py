@@ -0,0 +1,67 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from rh.dados_sinteticos import GeradorDadosSinteticos
+from rh.models import Empresa, Usuario
+
+
+class Command(BaseCommand):
+    help = 'Popula uma Empresa com dados sintéticos (departamentos, funcionários, presenças, férias, folhas) para testes de carga'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, help='ID de uma Empresa existente (por omissão cria uma nova)')
+        parser.add_argument('--departamentos', type=int, default=10)
+        parser.add_argument('--cargos-por-departamento', type=int, default=5)
+        parser.add_argument('--turnos', type=int, default=4)
+        parser.add_argument('--funcionarios', type=int, default=1000)
+        parser.add_argument('--meses', type=int, default=12, help='Meses de histórico de presenças, faltas, férias e folhas')
+        parser.add_argument('--data-fim', type=date.fromisoformat, help='Último dia do histórico (AAAA-MM-DD, padrão: hoje)')
+        parser.add_argument('--semente', type=int, default=42, help='Semente do gerador aleatório')
+        parser.add_argument('--lote', type=int, default=5000, help='Tamanho dos lotes de inserção')
+        parser.add_argument('--gestor', help='Cria um gestor RH com este username para a nova empresa')
+        parser.add_argument('--senha', default='senha-sintetica', help='Senha do gestor criado com --gestor')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+
+        with transaction.atomic():
+            empresa = self._obter_empresa(options)
+            gerador = GeradorDadosSinteticos(empresa, semente=options['semente'], lote=options['lote'])
+            totais = gerador.gerar(
+                departamentos=options['departamentos'],
+                cargos_por_departamento=options['cargos_por_departamento'],
+                turnos=options['turnos'],
+                funcionarios=options['funcionarios'],
+                meses=options['meses'],
+                data_fim=options['data_fim'],
+            )
+
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(f'Empresa: {empresa.nome} (id={empresa.pk})')
+        for modelo, total in totais.items():
+            self.stdout.write(f'  {modelo}: {total}')
+        self.stdout.write(self.style.SUCCESS(f'Dados sintéticos gerados em {duracao:.1f}s'))
+
+    def _obter_empresa(self, options):
+        if options['empresa']:
+            if options['gestor']:
+                raise CommandError('--gestor só pode ser usado ao criar uma nova empresa.')
+            try:
+                return Empresa.objects.get(pk=options['empresa'])
+            except Empresa.DoesNotExist:
+                raise CommandError(f'Empresa {options["empresa"]} não existe.')
+
+        numero = (Empresa.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+        empresa = Empresa.objects.create(
+            nome=f'Empresa Sintética {numero}',
+            cnpj=f'SINT-{options["semente"]}-{numero}',
+            endereco='Av. Julius Nyerere, Maputo',
+            telefone='840000000',
+            email=f'rh{numero}@sintetica.co.mz',
+        )
+        if options['gestor']:
+            Usuario.objects.create_user(username=options['gestor'], password=options['senha'], empresa=empresa)
+        return empresa
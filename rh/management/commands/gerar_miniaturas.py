@@ -0,0 +1,78 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from rh.miniaturas import CAMPOS, gerar_miniaturas
+
+
+def _inicializar_worker():
+    # Com o método "spawn" o processo filho começa sem Django configurado
+    import django
+    from django.conf import settings
+
+    if not settings.configured or not apps.ready:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hr_manager.settings')
+        django.setup()
+
+
+def _gerar(tarefa):
+    modelo, pk, campo, nome, recortar = tarefa
+    try:
+        return modelo, pk, campo, gerar_miniaturas(nome, recortar), None
+    except Exception as e:
+        return modelo, pk, campo, None, f'{type(e).__name__}: {e}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera as miniaturas (64/256 px, WebP e JPEG) das fotos de funcionários e logos de '
+        'empresas já existentes, em paralelo num pool de processos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processos', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--todas', action='store_true',
+                            help='Regenera também imagens que já têm miniaturas')
+        parser.add_argument('--empresa', type=int, help='Apenas imagens desta empresa')
+
+    def handle(self, *args, **opcoes):
+        tarefas = []
+        for rotulo, campo, recortar in CAMPOS:
+            modelo = apps.get_model(rotulo)
+            qs = modelo.objects.exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True})
+            if not opcoes['todas']:
+                qs = qs.filter(**{f'{campo}_hash': ''})
+            if opcoes['empresa']:
+                filtro = 'pk' if modelo._meta.model_name == 'empresa' else 'empresa_id'
+                qs = qs.filter(**{filtro: opcoes['empresa']})
+            tarefas.extend((rotulo, pk, campo, nome, recortar) for pk, nome in qs.values_list('pk', campo))
+
+        if not tarefas:
+            self.stdout.write('Nenhuma imagem pendente.')
+            return
+
+        # Os processos filhos não podem herdar as conexões abertas
+        connections.close_all()
+        hashes = {}
+        falhas = 0
+        with ProcessPoolExecutor(max_workers=opcoes['processos'], initializer=_inicializar_worker) as pool:
+            futuros = [pool.submit(_gerar, tarefa) for tarefa in tarefas]
+            for futuro in as_completed(futuros):
+                rotulo, pk, campo, hash_conteudo, erro = futuro.result()
+                if erro:
+                    falhas += 1
+                    self.stderr.write(f'{rotulo} {pk}: {erro}')
+                else:
+                    hashes.setdefault((rotulo, campo), {})[pk] = hash_conteudo
+
+        # Uma atualização em lote por modelo
+        for (rotulo, campo), por_pk in hashes.items():
+            modelo = apps.get_model(rotulo)
+            objs = [modelo(pk=pk, **{f'{campo}_hash': h}) for pk, h in por_pk.items()]
+            modelo.objects.bulk_update(objs, [f'{campo}_hash'], batch_size=500)
+
+        geradas = sum(len(v) for v in hashes.values())
+        self.stdout.write(self.style.SUCCESS(f'{geradas} imagens processadas, {falhas} falhas.'))
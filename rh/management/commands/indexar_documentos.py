@@ -0,0 +1,88 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from rh.indexacao_documentos import (
+    documentos_pendentes, extrair_texto, gravar_textos, reconstruir_indice, textos_obsoletos
+)
+
+
+def _inicializar_worker():
+    # Com o método "spawn" o processo filho começa sem Django configurado
+    import django
+    from django.conf import settings
+
+    if not settings.configured or not apps.ready:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hr_manager.settings')
+        django.setup()
+
+
+def _extrair(nome):
+    try:
+        return nome, extrair_texto(nome), None
+    except Exception as e:
+        return nome, '', f'{type(e).__name__}: {e}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Extrai o texto dos PDFs de documentos novos ou alterados (pypdf, pool de processos) e '
+        'atualiza o índice de pesquisa. Com --continuo fica em execução como worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processos', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--lote', type=int, default=200, help='Documentos por lote gravado')
+        parser.add_argument('--empresa', type=int, help='Apenas documentos desta empresa')
+        parser.add_argument('--continuo', action='store_true',
+                            help='Repete a indexação a cada --intervalo segundos')
+        parser.add_argument('--intervalo', type=int, default=60)
+        parser.add_argument('--reconstruir', action='store_true',
+                            help='Reconstrói o índice de texto a partir dos textos já extraídos')
+
+    def handle(self, *args, **opcoes):
+        if opcoes['reconstruir']:
+            reconstruir_indice()
+            self.stdout.write('Índice de texto reconstruído.')
+        while True:
+            indexados, falhas = self.indexar(opcoes)
+            if indexados or not opcoes['continuo']:
+                self.stdout.write(self.style.SUCCESS(f'{indexados} documentos indexados, {falhas} falhas.'))
+            if not opcoes['continuo']:
+                break
+            time.sleep(opcoes['intervalo'])
+
+    def indexar(self, opcoes):
+        textos_obsoletos().delete()
+        # Uma única leitura dos pendentes; pk crescente para lotes estáveis
+        linhas = list(documentos_pendentes(opcoes['empresa']).order_by('pk').values_list('pk', 'empresa_id', 'arquivo'))
+        if not linhas:
+            return 0, 0
+
+        indexados = falhas = 0
+        pool = None
+        if opcoes['processos'] > 1 and len(linhas) > 1:
+            # Os processos filhos não podem herdar as conexões abertas
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=opcoes['processos'], initializer=_inicializar_worker)
+        try:
+            for i in range(0, len(linhas), opcoes['lote']):
+                lote = linhas[i:i + opcoes['lote']]
+                # Conteúdo igual (mesmo blob) é extraído uma só vez
+                nomes = list(dict.fromkeys(nome for _, _, nome in lote))
+                extraidos = pool.map(_extrair, nomes) if pool else map(_extrair, nomes)
+                resultados = {}
+                for nome, texto, erro in extraidos:
+                    resultados[nome] = (texto, erro)
+                    if erro:
+                        falhas += 1
+                        self.stderr.write(f'{nome}: {erro}')
+                indexados += gravar_textos(lote, resultados)
+        finally:
+            if pool:
+                pool.shutdown()
+        return indexados, falhas
@@ -0,0 +1,138 @@
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from rh.armazenamento import PASTA_CAS, ajustar_referencias, armazenamento_documentos, hash_do_nome
+from rh.arquivos import ARQUIVOS_PROTEGIDOS
+from rh.models import ArquivoConteudo
+
+
+class Command(BaseCommand):
+    help = (
+        'Recolha de lixo do armazenamento deduplicado: apaga blobs sem referências, blobs '
+        'órfãos e temporários antigos. --recontar recalcula as referências a partir dos '
+        'registos; --migrar-legado move ficheiros antigos para o armazenamento deduplicado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=float, default=24,
+                            help='Idade mínima (horas) de um blob para poder ser apagado')
+        parser.add_argument('--recontar', action='store_true')
+        parser.add_argument('--migrar-legado', action='store_true')
+        parser.add_argument('--simular', action='store_true', help='Mostra o que seria apagado, sem apagar')
+
+    def handle(self, *args, **opcoes):
+        self.simular = opcoes['simular']
+        if opcoes['migrar_legado'] and not self.simular:
+            self.migrar_legado()
+        if opcoes['recontar'] and not self.simular:
+            self.recontar()
+        corte = timezone.now() - timedelta(hours=opcoes['horas'])
+        apagados, liberados = self.apagar_sem_referencias(corte)
+        orfaos = self.apagar_orfaos(corte.timestamp())
+        verbo = 'seriam apagados' if self.simular else 'apagados'
+        self.stdout.write(self.style.SUCCESS(
+            f'{apagados} blobs sem referências e {orfaos} ficheiros órfãos {verbo} '
+            f'({liberados / 1024 / 1024:.1f} MB).'
+        ))
+
+    def _referencias_dos_registos(self):
+        contagem = Counter()
+        for modelo, campo in ARQUIVOS_PROTEGIDOS.values():
+            for nome in modelo.objects.filter(**{f'{campo}__startswith': PASTA_CAS + '/'}).values_list(campo, flat=True):
+                contagem[hash_do_nome(nome)] += 1
+        return contagem
+
+    @transaction.atomic
+    def recontar(self):
+        contagem = self._referencias_dos_registos()
+        existentes = {c.hash: c for c in ArquivoConteudo.objects.select_for_update()}
+        for conteudo in existentes.values():
+            conteudo.referencias = contagem.get(conteudo.hash, 0)
+        ArquivoConteudo.objects.bulk_update(existentes.values(), ['referencias'], batch_size=1000)
+        novos = []
+        for hash_conteudo, n in contagem.items():
+            if hash_conteudo not in existentes:
+                for modelo, campo in ARQUIVOS_PROTEGIDOS.values():
+                    nome = modelo.objects.filter(**{f'{campo}__contains': hash_conteudo}).values_list(campo, flat=True).first()
+                    if nome:
+                        break
+                try:
+                    tamanho = armazenamento_documentos.size(nome)
+                except OSError:
+                    tamanho = 0
+                novos.append(ArquivoConteudo(hash=hash_conteudo, nome=nome, tamanho=tamanho, referencias=n))
+        ArquivoConteudo.objects.bulk_create(novos, batch_size=1000)
+        self.stdout.write(f'Referências recontadas: {len(existentes)} atualizadas, {len(novos)} criadas.')
+
+    def apagar_sem_referencias(self, corte):
+        apagados = liberados = 0
+        limite = corte.timestamp()
+        candidatos = ArquivoConteudo.objects.filter(
+            referencias__lte=0, criado_em__lt=corte
+        ).values_list('hash', 'nome', 'tamanho')
+        for hash_conteudo, nome, tamanho in candidatos.iterator():
+            caminho = armazenamento_documentos.path(nome)
+            if os.path.exists(caminho) and os.path.getmtime(caminho) > limite:
+                continue  # reutilizado há pouco por um upload ainda não gravado
+            if self.simular:
+                self.stdout.write(f'  {nome}')
+            else:
+                # Só apaga se continua sem referências no momento da remoção
+                if not ArquivoConteudo.objects.filter(hash=hash_conteudo, referencias__lte=0).delete()[0]:
+                    continue
+                if os.path.exists(caminho):
+                    os.unlink(caminho)
+            apagados += 1
+            liberados += tamanho
+        return apagados, liberados
+
+    def apagar_orfaos(self, limite):
+        """Blobs no disco sem linha em ArquivoConteudo (ex.: transação revertida) e temporários"""
+        raiz = armazenamento_documentos.path(PASTA_CAS)
+        if not os.path.isdir(raiz):
+            return 0
+        conhecidos = set(ArquivoConteudo.objects.values_list('hash', flat=True))
+        apagados = 0
+        for pasta, _, ficheiros in os.walk(raiz):
+            temporarios = os.path.basename(pasta) == 'tmp'
+            for ficheiro in ficheiros:
+                caminho = os.path.join(pasta, ficheiro)
+                if os.path.getmtime(caminho) > limite:
+                    continue
+                if temporarios or os.path.splitext(ficheiro)[0] not in conhecidos:
+                    if self.simular:
+                        self.stdout.write(f'  {os.path.relpath(caminho, raiz)}')
+                    else:
+                        os.unlink(caminho)
+                    apagados += 1
+        return apagados
+
+    def migrar_legado(self):
+        # Agrupados pelo caminho antigo: vários registos podem apontar para o mesmo ficheiro
+        por_nome = {}
+        for modelo, campo in ARQUIVOS_PROTEGIDOS.values():
+            legados = modelo.objects.exclude(**{f'{campo}__startswith': PASTA_CAS + '/'}).exclude(**{campo: ''})
+            for pk, nome in legados.exclude(**{f'{campo}__isnull': True}).values_list('pk', campo).iterator():
+                por_nome.setdefault(nome, []).append((modelo, campo, pk))
+
+        migrados = 0
+        for nome, registos in por_nome.items():
+            if not armazenamento_documentos.exists(nome):
+                for modelo, _, pk in registos:
+                    self.stderr.write(f'{modelo.__name__} {pk}: {nome} não encontrado')
+                continue
+            with armazenamento_documentos.open(nome, 'rb') as f:
+                novo = armazenamento_documentos.save(nome, f)
+            with transaction.atomic():
+                for modelo, campo, pk in registos:
+                    modelo.objects.filter(pk=pk).update(**{campo: novo})
+                ajustar_referencias(novo, len(registos))
+            # Só depois de todos os registos apontarem para o blob
+            armazenamento_documentos.delete(nome)
+            migrados += len(registos)
+        self.stdout.write(f'{migrados} ficheiros migrados para o armazenamento deduplicado.')
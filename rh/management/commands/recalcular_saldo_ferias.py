@@ -0,0 +1,45 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rh.models import Empresa, Funcionario
+from rh.saldo_ferias import creditar_aquisicoes, recalcular_saldos
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstrói o livro de movimentos e o saldo de férias dos funcionários a partir das '
+        'férias aprovadas/gozadas. Com --creditar apenas acrescenta as aquisições vencidas '
+        '(execução diária).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, help='ID da empresa (padrão: todas)')
+        parser.add_argument('--funcionario', type=int, help='ID de um único funcionário')
+        parser.add_argument('--data', help='Data de referência AAAA-MM-DD (padrão: hoje)')
+        parser.add_argument('--creditar', action='store_true',
+                            help='Só credita aquisições em falta, sem reconstruir o livro')
+
+    def handle(self, *args, **opcoes):
+        try:
+            ate = date.fromisoformat(opcoes['data']) if opcoes['data'] else date.today()
+        except ValueError:
+            raise CommandError('Data inválida; use AAAA-MM-DD.')
+
+        empresas = Empresa.objects.all()
+        if opcoes['empresa']:
+            empresas = empresas.filter(pk=opcoes['empresa'])
+            if not empresas.exists():
+                raise CommandError(f'Empresa {opcoes["empresa"]} não existe.')
+
+        operacao = creditar_aquisicoes if opcoes['creditar'] else recalcular_saldos
+        total = 0
+        # Uma transação por empresa mantém os lotes e os bloqueios pequenos
+        for empresa in empresas:
+            funcionarios = Funcionario.objects.filter(empresa=empresa)
+            if opcoes['funcionario']:
+                funcionarios = funcionarios.filter(pk=opcoes['funcionario'])
+            movimentos = operacao(funcionarios, ate)
+            total += movimentos
+            self.stdout.write(f'{empresa.nome}: {movimentos} movimentos')
+        self.stdout.write(self.style.SUCCESS(f'Total: {total} movimentos criados'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rh.models import Empresa
+from rh.pesquisa import reindexar
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstrói o índice da pesquisa global (funcionários, departamentos, cargos, '
+        'treinamentos, advertências e benefícios). Necessário após importações em lote, '
+        'que não disparam os sinais.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, help='ID da empresa (padrão: todas)')
+
+    def handle(self, *args, **opcoes):
+        if opcoes['empresa'] and not Empresa.objects.filter(pk=opcoes['empresa']).exists():
+            raise CommandError(f'Empresa {opcoes["empresa"]} não existe.')
+        total = reindexar(opcoes['empresa'])
+        self.stdout.write(self.style.SUCCESS(f'{total} entradas indexadas.'))
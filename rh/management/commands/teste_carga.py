@@ -0,0 +1,258 @@
+import http.client
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from rh.dados_sinteticos import NOMES
+from rh.dashboard import WIDGETS
+from rh.models import Funcionario, Usuario
+
+
+# Peso relativo de cada fluxo no tráfego simulado
+CENARIOS = {
+    'dashboard': 30,
+    'pesquisa_funcionarios': 30,
+    'marcar_presenca': 30,
+    'exportar_folha': 5,
+    'relogin': 5,
+}
+
+
+def percentil(valores_ordenados, p):
+    """Percentil pelo método nearest-rank sobre uma lista já ordenada"""
+    if not valores_ordenados:
+        return 0.0
+    # round() arredonda .5 para o par: o rank é ceil(p/100 * n)
+    indice = max(0, min(len(valores_ordenados) - 1, math.ceil(p / 100 * len(valores_ordenados)) - 1))
+    return valores_ordenados[indice]
+
+
+class Resultados:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tempos = defaultdict(list)
+        self.erros = defaultdict(int)
+
+    def registrar(self, endpoint, segundos, ok):
+        with self._lock:
+            self.tempos[endpoint].append(segundos)
+            if not ok:
+                self.erros[endpoint] += 1
+
+    def resumo(self, duracao):
+        linhas = {}
+        for endpoint, tempos in sorted(self.tempos.items()):
+            ordenados = sorted(tempos)
+            linhas[endpoint] = {
+                'requisicoes': len(ordenados),
+                'erros': self.erros[endpoint],
+                'p50_ms': round(percentil(ordenados, 50) * 1000, 1),
+                'p95_ms': round(percentil(ordenados, 95) * 1000, 1),
+                'p99_ms': round(percentil(ordenados, 99) * 1000, 1),
+                'max_ms': round(ordenados[-1] * 1000, 1),
+                'req_por_segundo': round(len(ordenados) / duracao, 2),
+            }
+        return linhas
+
+
+class Cliente:
+    """Cliente HTTP mínimo com keep-alive, cookies e token CSRF do Django"""
+
+    def __init__(self, base_url, resultados, timeout=30):
+        partes = urlsplit(base_url)
+        self.host = partes.hostname
+        self.porta = partes.port or (443 if partes.scheme == 'https' else 80)
+        self.https = partes.scheme == 'https'
+        self.timeout = timeout
+        self.resultados = resultados
+        self.cookies = {}
+        self.conexao = None
+
+    def _conectar(self):
+        classe = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        self.conexao = classe(self.host, self.porta, timeout=self.timeout)
+
+    def requisitar(self, endpoint, metodo, caminho, dados=None):
+        corpo = None
+        headers = {'Cookie': '; '.join(f'{k}={v}' for k, v in self.cookies.items())}
+        if dados is not None:
+            dados = dict(dados, csrfmiddlewaretoken=self.cookies.get('csrftoken', ''))
+            corpo = urlencode(dados)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['Referer'] = f'{"https" if self.https else "http"}://{self.host}:{self.porta}{caminho}'
+
+        inicio = time.perf_counter()
+        status = 0
+        try:
+            if self.conexao is None:
+                self._conectar()
+            self.conexao.request(metodo, caminho, body=corpo, headers=headers)
+            response = self.conexao.getresponse()
+            response.read()
+            status = response.status
+            for cabecalho in response.headers.get_all('Set-Cookie') or []:
+                for nome, morsel in SimpleCookie(cabecalho).items():
+                    self.cookies[nome] = morsel.value
+            if response.getheader('Connection', '').lower() == 'close':
+                self.conexao.close()
+                self.conexao = None
+        except (OSError, http.client.HTTPException):
+            if self.conexao is not None:
+                self.conexao.close()
+            self.conexao = None
+        self.resultados.registrar(endpoint, time.perf_counter() - inicio, 200 <= status < 400)
+        return status
+
+    def login(self, usuario, senha):
+        self.cookies.clear()
+        self.requisitar('login_form', 'GET', reverse('login'))
+        status = self.requisitar('login', 'POST', reverse('login'), {'username': usuario, 'password': senha})
+        return status == 302
+
+
+class UtilizadorVirtual(threading.Thread):
+    def __init__(self, numero, opcoes, resultados, funcionarios_ids, fim):
+        super().__init__(daemon=True)
+        self.random = random.Random(opcoes['semente'] + numero)
+        self.opcoes = opcoes
+        self.fim = fim
+        self.funcionarios_ids = funcionarios_ids
+        self.cliente = Cliente(opcoes['url'], resultados)
+        self.iteracoes = 0
+
+    def run(self):
+        if not self.cliente.login(self.opcoes['usuario'], self.opcoes['senha']):
+            return
+        fluxos = list(CENARIOS)
+        pesos = [CENARIOS[f] for f in fluxos]
+        while time.monotonic() < self.fim:
+            if self.opcoes['iteracoes'] and self.iteracoes >= self.opcoes['iteracoes']:
+                break
+            getattr(self, f'fluxo_{self.random.choices(fluxos, pesos)[0]}')()
+            self.iteracoes += 1
+            if self.opcoes['pausa']:
+                time.sleep(self.random.uniform(0, self.opcoes['pausa']))
+
+    def fluxo_dashboard(self):
+        # A página e, como o navegador a seguir, cada widget (rh.dashboard)
+        self.cliente.requisitar('dashboard', 'GET', reverse('dashboard'))
+        for nome in WIDGETS:
+            self.cliente.requisitar(f'widget_{nome}', 'GET', reverse('dashboard_widget', args=[nome]))
+
+    def fluxo_pesquisa_funcionarios(self):
+        parametros = urlencode({'nome': self.random.choice(NOMES)})
+        self.cliente.requisitar('funcionario_list', 'GET', f'{reverse("funcionario_list")}?{parametros}')
+
+    def fluxo_marcar_presenca(self):
+        # Rajada de marcações, como na chegada de um turno
+        for _ in range(self.opcoes['rajada']):
+            self.cliente.requisitar('marcar_presenca', 'POST', reverse('marcar_presenca'), {
+                'funcionario': self.random.choice(self.funcionarios_ids),
+                'tipo_marcacao': self.random.choice(['entrada', 'saida']),
+            })
+
+    def fluxo_exportar_folha(self):
+        self.cliente.requisitar('folha_export', 'GET', f'{reverse("folha_pagamento_list")}?export=excel')
+
+    def fluxo_relogin(self):
+        self.cliente.login(self.opcoes['usuario'], self.opcoes['senha'])
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga HTTP dos fluxos principais (login, dashboard, pesquisa, marcação de ponto, '
+        'exportação da folha). Executa contra um servidor já em execução (runserver, '
+        '"gunicorn hr_manager.wsgi -w 4", waitress) ou, com --embutido, contra um servidor '
+        'WSGI multithread iniciado neste processo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='URL base do servidor')
+        parser.add_argument('--embutido', action='store_true', help='Inicia um servidor WSGI local numa porta livre')
+        parser.add_argument('--usuario', required=True, help='Username do gestor RH usado nas requisições')
+        parser.add_argument('--senha', required=True)
+        parser.add_argument('--utilizadores', type=int, default=10, help='Utilizadores virtuais simultâneos')
+        parser.add_argument('--duracao', type=float, default=30, help='Duração do teste em segundos')
+        parser.add_argument('--iteracoes', type=int, default=0, help='Limite de fluxos por utilizador (0 = sem limite)')
+        parser.add_argument('--rajada', type=int, default=5, help='Marcações de ponto consecutivas por rajada')
+        parser.add_argument('--pausa', type=float, default=0, help='Pausa máxima aleatória entre fluxos (s)')
+        parser.add_argument('--semente', type=int, default=42)
+        parser.add_argument('--json', dest='saida_json', help='Grava o resumo em JSON neste ficheiro')
+
+    def handle(self, *args, **opcoes):
+        try:
+            usuario = Usuario.objects.select_related('empresa').get(username=opcoes['usuario'])
+        except Usuario.DoesNotExist:
+            raise CommandError(f'Usuário {opcoes["usuario"]} não existe.')
+        funcionarios_ids = list(
+            Funcionario.objects.filter(empresa=usuario.empresa, status='Ativo').values_list('id', flat=True)[:5000]
+        )
+        if not funcionarios_ids:
+            raise CommandError('A empresa do usuário não tem funcionários ativos (use gerar_dados_sinteticos).')
+
+        servidor = None
+        if opcoes['embutido']:
+            servidor = self._iniciar_servidor()
+            opcoes['url'] = f'http://127.0.0.1:{servidor.server_port}'
+
+        resultados = Resultados()
+        inicio = time.monotonic()
+        fim = inicio + opcoes['duracao']
+        utilizadores = [
+            UtilizadorVirtual(n, opcoes, resultados, funcionarios_ids, fim)
+            for n in range(opcoes['utilizadores'])
+        ]
+        for u in utilizadores:
+            u.start()
+        for u in utilizadores:
+            u.join()
+        duracao = time.monotonic() - inicio
+
+        if servidor is not None:
+            servidor.shutdown()
+
+        resumo = resultados.resumo(duracao)
+        self._imprimir(resumo, duracao, opcoes)
+        if opcoes['saida_json']:
+            with open(opcoes['saida_json'], 'w', encoding='utf-8') as f:
+                json.dump({
+                    'url': opcoes['url'],
+                    'utilizadores': opcoes['utilizadores'],
+                    'duracao_s': round(duracao, 2),
+                    'endpoints': resumo,
+                }, f, indent=2, ensure_ascii=False)
+
+    def _iniciar_servidor(self):
+        from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+        from django.core.wsgi import get_wsgi_application
+
+        class HandlerSilencioso(WSGIRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        servidor = ThreadedWSGIServer(('127.0.0.1', 0), HandlerSilencioso)
+        servidor.set_app(get_wsgi_application())
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        return servidor
+
+    def _imprimir(self, resumo, duracao, opcoes):
+        self.stdout.write(f'{opcoes["url"]} - {opcoes["utilizadores"]} utilizadores, {duracao:.1f}s')
+        cabecalho = f'{"endpoint":<24}{"req":>8}{"erros":>7}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"max ms":>10}{"req/s":>9}'
+        self.stdout.write(cabecalho)
+        self.stdout.write('-' * len(cabecalho))
+        total = 0
+        for endpoint, r in resumo.items():
+            total += r['requisicoes']
+            self.stdout.write(
+                f'{endpoint:<24}{r["requisicoes"]:>8}{r["erros"]:>7}{r["p50_ms"]:>10}'
+                f'{r["p95_ms"]:>10}{r["p99_ms"]:>10}{r["max_ms"]:>10}{r["req_por_segundo"]:>9}'
+            )
+        self.stdout.write(self.style.SUCCESS(f'Total: {total} requisições ({total / duracao:.1f} req/s)'))
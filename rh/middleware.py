@@ -0,0 +1,76 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .instrumentacao import MetricasRequisicao, _metricas_atuais, contar_consulta, registro
+
+
+logger = logging.getLogger('rh.instrumentacao')
+
+
+class OrcamentoConsultasExcedido(AssertionError):
+    """Levantada quando uma view ultrapassa o orçamento de consultas configurado"""
+
+
+class InstrumentacaoMiddleware:
+    """
+    Mede, por nome de URL, número de consultas, tempo de SQL, tempo de
+    renderização de templates e tempo total de cada requisição.
+
+    Configuração (settings):
+    - RH_METRICAS_ATIVAS: liga/desliga a instrumentação (padrão True)
+    - RH_ORCAMENTO_CONSULTAS: {'nome_da_url': max_consultas}
+    - RH_ORCAMENTO_ACAO: 'log' (padrão) ou 'erro' para falhar nos testes
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'RH_METRICAS_ATIVAS', True):
+            return self.get_response(request)
+
+        metricas = MetricasRequisicao()
+        token = _metricas_atuais.set(metricas)
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conexao in connections.all():
+                    stack.enter_context(conexao.execute_wrapper(contar_consulta))
+                response = self.get_response(request)
+        finally:
+            metricas.tempo_total = time.perf_counter() - inicio
+            _metricas_atuais.reset(token)
+
+        view = self._nome_view(request)
+        if view is None:
+            return response
+
+        orcamento = getattr(settings, 'RH_ORCAMENTO_CONSULTAS', {}).get(view)
+        excedeu = orcamento is not None and metricas.consultas > orcamento
+        registro.registrar(view, metricas, excedeu)
+
+        response['Server-Timing'] = (
+            f'sql;dur={metricas.tempo_sql * 1000:.1f};desc="{metricas.consultas} consultas", '
+            f'tpl;dur={metricas.tempo_template * 1000:.1f}, '
+            f'total;dur={metricas.tempo_total * 1000:.1f}'
+        )
+
+        if excedeu:
+            mensagem = (f'View "{view}" executou {metricas.consultas} consultas '
+                        f'(orçamento: {orcamento})')
+            if getattr(settings, 'RH_ORCAMENTO_ACAO', 'log') == 'erro':
+                raise OrcamentoConsultasExcedido(mensagem)
+            logger.warning(mensagem)
+
+        return response
+
+    @staticmethod
+    def _nome_view(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None or not match.url_name:
+            return None
+        return match.url_name
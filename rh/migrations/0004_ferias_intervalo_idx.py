@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0003_feriado'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ferias',
+            index=models.Index(fields=['empresa', 'data_fim', 'data_inicio'], name='ferias_empresa_intervalo_idx'),
+        ),
+    ]
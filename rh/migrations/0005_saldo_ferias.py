@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0004_ferias_intervalo_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='funcionario',
+            name='saldo_ferias',
+            field=models.IntegerField(default=0, verbose_name='Saldo de Férias (dias)'),
+        ),
+        migrations.CreateModel(
+            name='MovimentoFerias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('Aquisicao', 'Aquisição'), ('Consumo', 'Consumo'), ('Estorno', 'Estorno'), ('Ajuste', 'Ajuste')], max_length=20, verbose_name='Tipo')),
+                ('dias', models.IntegerField(verbose_name='Dias')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('periodo', models.PositiveIntegerField(blank=True, null=True, verbose_name='Período Aquisitivo')),
+                ('descricao', models.CharField(blank=True, max_length=200, verbose_name='Descrição')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rh.empresa')),
+                ('ferias', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimentos', to='rh.ferias', verbose_name='Férias')),
+                ('funcionario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimentos_ferias', to='rh.funcionario', verbose_name='Funcionário')),
+            ],
+            options={
+                'verbose_name': 'Movimento de Férias',
+                'verbose_name_plural': 'Movimentos de Férias',
+                'ordering': ['data', 'id'],
+                'indexes': [models.Index(fields=['funcionario', 'data'], name='movferias_func_data_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0005_saldo_ferias'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empresa',
+            name='logo_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='funcionario',
+            name='foto_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:15
+
+import rh.armazenamento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0006_miniaturas_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='advertencia',
+            name='arquivo_documento',
+            field=models.FileField(blank=True, null=True, storage=rh.armazenamento.obter_armazenamento, upload_to='advertencias/', verbose_name='Documento Oficial'),
+        ),
+        migrations.AlterField(
+            model_name='documento',
+            name='arquivo',
+            field=models.FileField(storage=rh.armazenamento.obter_armazenamento, upload_to='documentos/', verbose_name='Arquivo'),
+        ),
+        migrations.AlterField(
+            model_name='falta',
+            name='arquivo_comprovante',
+            field=models.FileField(blank=True, null=True, storage=rh.armazenamento.obter_armazenamento, upload_to='faltas/comprovantes/', verbose_name='Comprovante'),
+        ),
+        migrations.AlterField(
+            model_name='justificativafalta',
+            name='arquivo_comprovante',
+            field=models.FileField(blank=True, null=True, storage=rh.armazenamento.obter_armazenamento, upload_to='justificativas/', verbose_name='Comprovante'),
+        ),
+        migrations.CreateModel(
+            name='ArquivoConteudo',
+            fields=[
+                ('hash', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='SHA-256')),
+                ('nome', models.CharField(max_length=255, unique=True, verbose_name='Caminho')),
+                ('tamanho', models.BigIntegerField(default=0, verbose_name='Tamanho (bytes)')),
+                ('referencias', models.IntegerField(default=0, verbose_name='Referências')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+            ],
+            options={
+                'verbose_name': 'Conteúdo de Arquivo',
+                'verbose_name_plural': 'Conteúdos de Arquivos',
+                'indexes': [models.Index(fields=['referencias'], name='arquivo_conteudo_refs_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0007_armazenamento_deduplicado'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='documento',
+            index=models.Index(fields=['empresa', 'data_validade'], name='documento_empresa_validade_idx'),
+        ),
+    ]
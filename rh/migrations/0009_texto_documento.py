@@ -0,0 +1,81 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Índice de texto integral sobre rh_textodocumento, conforme o banco de dados.
+# Em SQLite é uma tabela FTS5 de conteúdo externo mantida por gatilhos; se
+# uma migração futura recriar rh_textodocumento, os gatilhos têm de ser
+# recriados (indexar_documentos --reconstruir repõe o índice).
+FTS_SQL = {
+    'sqlite': (
+        [
+            "CREATE VIRTUAL TABLE rh_documento_fts USING fts5("
+            "texto, empresa_id, content='rh_textodocumento', content_rowid='documento_id', "
+            "tokenize='unicode61 remove_diacritics 2')",
+            "CREATE TRIGGER rh_textodocumento_ai AFTER INSERT ON rh_textodocumento BEGIN "
+            "INSERT INTO rh_documento_fts(rowid, texto, empresa_id) VALUES (new.documento_id, new.texto, new.empresa_id); "
+            "END",
+            "CREATE TRIGGER rh_textodocumento_ad AFTER DELETE ON rh_textodocumento BEGIN "
+            "INSERT INTO rh_documento_fts(rh_documento_fts, rowid, texto, empresa_id) "
+            "VALUES ('delete', old.documento_id, old.texto, old.empresa_id); "
+            "END",
+            "CREATE TRIGGER rh_textodocumento_au AFTER UPDATE ON rh_textodocumento BEGIN "
+            "INSERT INTO rh_documento_fts(rh_documento_fts, rowid, texto, empresa_id) "
+            "VALUES ('delete', old.documento_id, old.texto, old.empresa_id); "
+            "INSERT INTO rh_documento_fts(rowid, texto, empresa_id) VALUES (new.documento_id, new.texto, new.empresa_id); "
+            "END",
+        ],
+        [
+            "DROP TRIGGER IF EXISTS rh_textodocumento_au",
+            "DROP TRIGGER IF EXISTS rh_textodocumento_ad",
+            "DROP TRIGGER IF EXISTS rh_textodocumento_ai",
+            "DROP TABLE IF EXISTS rh_documento_fts",
+        ],
+    ),
+    'postgresql': (
+        ["CREATE INDEX rh_textodocumento_fts_idx ON rh_textodocumento "
+         "USING GIN (to_tsvector('portuguese', texto))"],
+        ["DROP INDEX IF EXISTS rh_textodocumento_fts_idx"],
+    ),
+}
+
+
+def _executar(schema_editor, indice):
+    for sql in FTS_SQL.get(schema_editor.connection.vendor, ([], []))[indice]:
+        schema_editor.execute(sql)
+
+
+def criar_indice_texto(apps, schema_editor):
+    _executar(schema_editor, 0)
+
+
+def remover_indice_texto(apps, schema_editor):
+    _executar(schema_editor, 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0008_documento_validade_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TextoDocumento',
+            fields=[
+                ('documento', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='texto', serialize=False, to='rh.documento')),
+                ('origem', models.CharField(max_length=100)),
+                ('texto', models.TextField(blank=True)),
+                ('erro', models.CharField(blank=True, max_length=200)),
+                ('extraido_em', models.DateTimeField(auto_now=True)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rh.empresa')),
+            ],
+            options={
+                'verbose_name': 'Texto de Documento',
+                'verbose_name_plural': 'Textos de Documentos',
+            },
+        ),
+        migrations.RunPython(criar_indice_texto, remover_indice_texto),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:23
+
+import rh.armazenamento
+import rh.upload
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0009_texto_documento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documento',
+            name='tamanho_arquivo',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True, verbose_name='Tamanho (bytes)'),
+        ),
+        migrations.AddField(
+            model_name='documento',
+            name='tipo_mime',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Tipo MIME'),
+        ),
+        migrations.AlterField(
+            model_name='advertencia',
+            name='arquivo_documento',
+            field=models.FileField(blank=True, null=True, storage=rh.armazenamento.obter_armazenamento, upload_to='advertencias/', validators=[rh.upload.validar_upload], verbose_name='Documento Oficial'),
+        ),
+        migrations.AlterField(
+            model_name='documento',
+            name='arquivo',
+            field=models.FileField(storage=rh.armazenamento.obter_armazenamento, upload_to='documentos/', validators=[rh.upload.validar_upload], verbose_name='Arquivo'),
+        ),
+        migrations.AlterField(
+            model_name='falta',
+            name='arquivo_comprovante',
+            field=models.FileField(blank=True, null=True, storage=rh.armazenamento.obter_armazenamento, upload_to='faltas/comprovantes/', validators=[rh.upload.validar_upload], verbose_name='Comprovante'),
+        ),
+        migrations.AlterField(
+            model_name='justificativafalta',
+            name='arquivo_comprovante',
+            field=models.FileField(blank=True, null=True, storage=rh.armazenamento.obter_armazenamento, upload_to='justificativas/', validators=[rh.upload.validar_upload], verbose_name='Comprovante'),
+        ),
+    ]
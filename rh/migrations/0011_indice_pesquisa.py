@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0010_upload_metadados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntradaPesquisa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=20)),
+                ('objeto_id', models.PositiveIntegerField()),
+                ('titulo', models.CharField(max_length=200)),
+                ('detalhe', models.CharField(blank=True, max_length=200)),
+                ('texto', models.TextField(blank=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rh.empresa')),
+            ],
+            options={
+                'verbose_name': 'Entrada de Pesquisa',
+                'verbose_name_plural': 'Entradas de Pesquisa',
+            },
+        ),
+        migrations.CreateModel(
+            name='TermoPesquisa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('termo', models.CharField(max_length=40)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rh.empresa')),
+                ('entrada', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='termos', to='rh.entradapesquisa')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='entradapesquisa',
+            constraint=models.UniqueConstraint(fields=('tipo', 'objeto_id'), name='entrada_pesquisa_unica'),
+        ),
+        migrations.AddIndex(
+            model_name='termopesquisa',
+            index=models.Index(fields=['empresa', 'termo', 'entrada'], name='termo_pesquisa_prefixo_idx'),
+        ),
+    ]
@@ -0,0 +1,82 @@
+from datetime import date
+
+from django.db import migrations
+
+
+# Cópia das regras de rh.saldo_ferias à data desta migração: as migrações
+# não devem depender do código atual da aplicação.
+STATUS_CONSOMEM = ('Aprovada', 'Gozada')
+
+
+def _direito_ferias(periodo):
+    if periodo == 1:
+        return 12
+    if periodo == 2:
+        return 24
+    return 30
+
+
+def _aniversario(data_admissao, anos):
+    try:
+        return data_admissao.replace(year=data_admissao.year + anos)
+    except ValueError:  # 29/02
+        return date(data_admissao.year + anos, 3, 1)
+
+
+def preencher_saldos(apps, schema_editor):
+    """
+    Livro e saldo iniciais dos funcionários sem movimentos (o campo
+    saldo_ferias foi criado com 0): aquisições vencidas até hoje e um
+    consumo por férias aprovadas/gozadas, como recalcular_saldo_ferias.
+    """
+    Funcionario = apps.get_model('rh', 'Funcionario')
+    Ferias = apps.get_model('rh', 'Ferias')
+    MovimentoFerias = apps.get_model('rh', 'MovimentoFerias')
+
+    hoje = date.today()
+    funcionarios = list(
+        Funcionario.objects.filter(movimentos_ferias__isnull=True)
+        .only('id', 'empresa_id', 'data_admissao', 'data_demissao')
+    )
+    if not funcionarios:
+        return
+    saldos = {}
+    novos = []
+    for funcionario in funcionarios:
+        limite = min(hoje, funcionario.data_demissao) if funcionario.data_demissao else hoje
+        periodo = 1
+        while _aniversario(funcionario.data_admissao, periodo) <= limite:
+            dias = _direito_ferias(periodo)
+            novos.append(MovimentoFerias(
+                empresa_id=funcionario.empresa_id, funcionario_id=funcionario.id, tipo='Aquisicao', dias=dias,
+                data=_aniversario(funcionario.data_admissao, periodo), periodo=periodo,
+                descricao=f'{periodo}º ano de serviço',
+            ))
+            saldos[funcionario.id] = saldos.get(funcionario.id, 0) + dias
+            periodo += 1
+
+    for ferias in Ferias.objects.filter(
+        funcionario__in=[f.id for f in funcionarios], status__in=STATUS_CONSOMEM
+    ).only('id', 'empresa_id', 'funcionario_id', 'data_inicio', 'dias_uteis', 'status'):
+        novos.append(MovimentoFerias(
+            empresa_id=ferias.empresa_id, funcionario_id=ferias.funcionario_id, ferias_id=ferias.id,
+            tipo='Consumo', dias=-ferias.dias_uteis, data=ferias.data_inicio,
+            descricao=f'Solicitada -> {ferias.status}',
+        ))
+        saldos[ferias.funcionario_id] = saldos.get(ferias.funcionario_id, 0) - ferias.dias_uteis
+
+    MovimentoFerias.objects.bulk_create(novos, batch_size=1000)
+    for funcionario in funcionarios:
+        funcionario.saldo_ferias = saldos.get(funcionario.id, 0)
+    Funcionario.objects.bulk_update(funcionarios, ['saldo_ferias'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0011_indice_pesquisa'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_saldos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0012_preencher_saldo_ferias'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='advertencia',
+            name='tamanho_arquivo',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True, verbose_name='Tamanho (bytes)'),
+        ),
+        migrations.AddField(
+            model_name='advertencia',
+            name='tipo_mime',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Tipo MIME'),
+        ),
+        migrations.AddField(
+            model_name='falta',
+            name='tamanho_arquivo',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True, verbose_name='Tamanho (bytes)'),
+        ),
+        migrations.AddField(
+            model_name='falta',
+            name='tipo_mime',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Tipo MIME'),
+        ),
+        migrations.AddField(
+            model_name='justificativafalta',
+            name='tamanho_arquivo',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True, verbose_name='Tamanho (bytes)'),
+        ),
+        migrations.AddField(
+            model_name='justificativafalta',
+            name='tipo_mime',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Tipo MIME'),
+        ),
+    ]
@@ -0,0 +1,114 @@
+"""
+Miniaturas de Funcionario.foto e Empresa.logo.
+
+Cada imagem gera variantes de 64 e 256 px em WebP e JPEG, gravadas no
+mesmo storage ao lado do original, numa pasta "miniaturas" e com o hash
+SHA-256 do conteúdo original no nome. Nomes derivados do conteúdo tornam
+a geração idempotente e permitem cache longo no navegador. O hash fica
+guardado no campo <campo>_hash do modelo e é o que a template tag usa
+para montar os URLs sem tocar no storage.
+
+A geração corre ao gravar um upload novo (ver rh.signals) e o comando
+gerar_miniaturas processa uploads antigos num pool de processos.
+"""
+import hashlib
+import io
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+
+TAMANHOS = (64, 256)
+# extensão -> (formato Pillow, opções de gravação)
+FORMATOS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+# Campos com miniaturas: (app_label.Modelo, campo, recortar em quadrado)
+CAMPOS = [
+    ('rh.Funcionario', 'foto', True),
+    ('rh.Empresa', 'logo', False),
+]
+
+
+def nome_miniatura(nome_original, hash_conteudo, tamanho, extensao):
+    pasta = posixpath.dirname(nome_original)
+    return posixpath.join(pasta, 'miniaturas', f'{hash_conteudo[:32]}_{tamanho}.{extensao}')
+
+
+def url_miniatura(arquivo, tamanho, extensao='webp', storage=None):
+    """
+    URL da menor variante com pelo menos `tamanho` px do FieldFile
+    `arquivo`, ou o URL do original se as miniaturas ainda não existem.
+    """
+    if not arquivo:
+        return ''
+    hash_conteudo = getattr(arquivo.instance, f'{arquivo.field.name}_hash', '')
+    if not hash_conteudo:
+        return arquivo.url
+    variante = next((t for t in TAMANHOS if t >= tamanho), TAMANHOS[-1])
+    storage = storage or arquivo.storage
+    return storage.url(nome_miniatura(arquivo.name, hash_conteudo, variante, extensao))
+
+
+def _redimensionar(imagem, tamanho, recortar):
+    from PIL import ImageOps
+
+    if recortar:
+        return ImageOps.fit(imagem, (tamanho, tamanho), method=3)  # LANCZOS
+    copia = imagem.copy()
+    copia.thumbnail((tamanho, tamanho), resample=3)
+    return copia
+
+
+def gerar_miniaturas(nome_original, recortar=True, storage=None):
+    """
+    Gera as variantes do ficheiro `nome_original` e devolve o hash do seu
+    conteúdo. Variantes já existentes não são regravadas.
+    """
+    from PIL import Image, ImageOps
+
+    storage = storage or default_storage
+    with storage.open(nome_original, 'rb') as f:
+        conteudo = f.read()
+    hash_conteudo = hashlib.sha256(conteudo).hexdigest()
+
+    pendentes = [
+        (tamanho, extensao)
+        for tamanho in TAMANHOS
+        for extensao in FORMATOS
+        if not storage.exists(nome_miniatura(nome_original, hash_conteudo, tamanho, extensao))
+    ]
+    if not pendentes:
+        return hash_conteudo
+
+    with Image.open(io.BytesIO(conteudo)) as imagem:
+        imagem = ImageOps.exif_transpose(imagem)
+        if imagem.mode in ('RGBA', 'LA', 'P'):
+            # JPEG não tem transparência: compõe sobre fundo branco
+            imagem = imagem.convert('RGBA')
+            fundo = Image.new('RGB', imagem.size, (255, 255, 255))
+            fundo.paste(imagem, mask=imagem.getchannel('A'))
+            imagem = fundo
+        else:
+            imagem = imagem.convert('RGB')
+
+        redimensionadas = {}
+        for tamanho, extensao in pendentes:
+            if tamanho not in redimensionadas:
+                redimensionadas[tamanho] = _redimensionar(imagem, tamanho, recortar)
+            formato, opcoes = FORMATOS[extensao]
+            saida = io.BytesIO()
+            redimensionadas[tamanho].save(saida, formato, **opcoes)
+            storage.save(nome_miniatura(nome_original, hash_conteudo, tamanho, extensao), ContentFile(saida.getvalue()))
+    return hash_conteudo
+
+
+def atualizar_miniaturas(instancia, campo, recortar=True):
+    """Gera as miniaturas do campo da instância e grava o hash sem disparar save()"""
+    arquivo = getattr(instancia, campo)
+    hash_conteudo = gerar_miniaturas(arquivo.name, recortar, arquivo.storage) if arquivo else ''
+    setattr(instancia, f'{campo}_hash', hash_conteudo)
+    type(instancia).objects.filter(pk=instancia.pk).update(**{f'{campo}_hash': hash_conteudo})
+    return hash_conteudo
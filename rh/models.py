@@ -7,6 +7,9 @@ import uuid
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
 
+from .armazenamento import obter_armazenamento
+from .upload import registar_metadados, validar_upload
+
 
 class Empresa(models.Model):
     nome = models.CharField(max_length=200, verbose_name='Nome da Empresa')
@@ -15,6 +18,8 @@ class Empresa(models.Model):
     telefone = models.CharField(max_length=20, verbose_name='Telefone')
     email = models.EmailField(verbose_name='E-mail')
     logo = models.ImageField(upload_to='empresas/logos/', null=True, blank=True, verbose_name='Logo')
+    # Hash do conteúdo do logo usado nos nomes das miniaturas (rh.miniaturas)
+    logo_hash = models.CharField(max_length=64, blank=True, editable=False)
     ativa = models.BooleanField(default=True, verbose_name='Ativa')
     criada_em = models.DateTimeField(auto_now_add=True, verbose_name='Criada em')
     
@@ -113,6 +118,8 @@ class Funcionario(models.Model):
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Ativo', verbose_name='Status')
     foto = models.ImageField(upload_to='funcionarios/fotos/', null=True, blank=True, verbose_name='Foto')
+    # Hash do conteúdo da foto usado nos nomes das miniaturas (rh.miniaturas)
+    foto_hash = models.CharField(max_length=64, blank=True, editable=False)
     
     # Adicionando campo de turno
     turno = models.ForeignKey('TurnoTrabalho', on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Turno de Trabalho')
@@ -121,6 +128,9 @@ class Funcionario(models.Model):
     agencia = models.CharField(max_length=20, blank=True, verbose_name='Agência')
     conta_corrente = models.CharField(max_length=20, blank=True, verbose_name='Conta Corrente')
     
+    # Saldo desnormalizado do livro de férias (MovimentoFerias); ver rh.saldo_ferias
+    saldo_ferias = models.IntegerField(default=0, verbose_name='Saldo de Férias (dias)')
+    
     criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Criado em')
     atualizado_em = models.DateTimeField(auto_now=True, verbose_name='Atualizado em')
     
@@ -188,12 +198,14 @@ class TurnoTrabalho(models.Model):
 
 
     
-    def calcular_horas_mensais(self):
+    def calcular_horas_mensais(self, ano=None, mes=None):
         # Calcula horas mensais baseado no tipo de turno
-        if self.tipo == '8h':
+        if self.tipo in ('8h', '12h'):
+            if ano and mes:
+                # Dias úteis reais do mês (fins de semana e feriados excluídos)
+                from .calendario import dias_uteis_mes
+                return self.horas_diarias * dias_uteis_mes(ano, mes, self.empresa_id)
             return self.horas_diarias * 22  # 22 dias úteis padrão
-        elif self.tipo == '12h':
-            return self.horas_diarias * 22
         elif self.tipo == '12h_36h':
             # 12h trabalho, 36h folga = 5 dias de trabalho a cada 8 dias
             dias_mes = 30
@@ -274,7 +286,10 @@ class JustificativaFalta(models.Model):
     empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE)
     presenca = models.OneToOneField(Presenca, on_delete=models.CASCADE, related_name='justificativa', verbose_name='Presença/Falta')
     motivo = models.TextField(verbose_name='Motivo da Justificativa')
-    arquivo_comprovante = models.FileField(upload_to='justificativas/', null=True, blank=True, verbose_name='Comprovante')
+    arquivo_comprovante = models.FileField(upload_to='justificativas/', storage=obter_armazenamento, validators=[validar_upload], null=True, blank=True, verbose_name='Comprovante')
+    # Metadados do ficheiro, registados no upload (rh.upload)
+    tamanho_arquivo = models.PositiveBigIntegerField(null=True, blank=True, editable=False, verbose_name='Tamanho (bytes)')
+    tipo_mime = models.CharField(max_length=100, blank=True, editable=False, verbose_name='Tipo MIME')
     justificada_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Justificada por')
     criada_em = models.DateTimeField(auto_now_add=True, verbose_name='Criada em')
     
@@ -286,6 +301,7 @@ class JustificativaFalta(models.Model):
         return f"Justificativa - {self.presenca.funcionario.nome_completo} ({self.presenca.data})"
     
     def save(self, *args, **kwargs):
+        registar_metadados(self, 'arquivo_comprovante')
         super().save(*args, **kwargs)
         # Se a justificativa foi criada dentro de 24h, marca a presença como justificada
         if (timezone.now() - self.criada_em).total_seconds() <= 24 * 3600:
@@ -311,6 +327,24 @@ class ConfiguracaoRH(models.Model):
         return f"Configuração - {self.empresa.nome}"
 
 
+# Feriados adicionais por empresa (ou nacionais extraordinários, sem empresa).
+# Os feriados nacionais fixos de Moçambique já são conhecidos por rh.calendario.
+class Feriado(models.Model):
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, null=True, blank=True,
+                                related_name='feriados', verbose_name='Empresa')
+    data = models.DateField(verbose_name='Data')
+    nome = models.CharField(max_length=100, verbose_name='Nome do Feriado')
+    
+    class Meta:
+        verbose_name = 'Feriado'
+        verbose_name_plural = 'Feriados'
+        ordering = ['data']
+        unique_together = ['empresa', 'data']
+    
+    def __str__(self):
+        return f"{self.nome} ({self.data:%d/%m/%Y})"
+
+
 class Ferias(models.Model):
     STATUS_FERIAS = [
         ('Solicitada', 'Solicitada'),
@@ -337,11 +371,47 @@ class Ferias(models.Model):
         verbose_name = 'Férias'
         verbose_name_plural = 'Férias'
         ordering = ['-solicitada_em']
+        indexes = [
+            # Consultas por intervalo (data_fim >= inicio AND data_inicio <= fim)
+            models.Index(fields=['empresa', 'data_fim', 'data_inicio'], name='ferias_empresa_intervalo_idx'),
+        ]
     
     def __str__(self):
         return f"Férias {self.funcionario.nome_completo} - {self.data_inicio} a {self.data_fim}"
 
 
+# Livro de movimentos do saldo de férias: aquisições (+) e consumos (-)
+class MovimentoFerias(models.Model):
+    TIPO_MOVIMENTO = [
+        ('Aquisicao', 'Aquisição'),
+        ('Consumo', 'Consumo'),
+        ('Estorno', 'Estorno'),
+        ('Ajuste', 'Ajuste'),
+    ]
+    
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE)
+    funcionario = models.ForeignKey(Funcionario, on_delete=models.CASCADE, related_name='movimentos_ferias', verbose_name='Funcionário')
+    ferias = models.ForeignKey(Ferias, on_delete=models.SET_NULL, null=True, blank=True, related_name='movimentos', verbose_name='Férias')
+    tipo = models.CharField(max_length=20, choices=TIPO_MOVIMENTO, verbose_name='Tipo')
+    dias = models.IntegerField(verbose_name='Dias')
+    data = models.DateField(verbose_name='Data')
+    # Ano de serviço a que a aquisição se refere (1, 2, 3...)
+    periodo = models.PositiveIntegerField(null=True, blank=True, verbose_name='Período Aquisitivo')
+    descricao = models.CharField(max_length=200, blank=True, verbose_name='Descrição')
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Criado em')
+    
+    class Meta:
+        verbose_name = 'Movimento de Férias'
+        verbose_name_plural = 'Movimentos de Férias'
+        ordering = ['data', 'id']
+        indexes = [
+            models.Index(fields=['funcionario', 'data'], name='movferias_func_data_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.dias:+d} - {self.funcionario.nome_completo}"
+
+
 class Falta(models.Model):
     TIPO_FALTA = [
         ('Justificada', 'Justificada'),
@@ -356,7 +426,10 @@ class Falta(models.Model):
     motivo = models.TextField(blank=True, verbose_name='Motivo/Observação')
     justificativa = models.TextField(blank=True, verbose_name='Justificativa')
     horas_abonadas = models.DecimalField(max_digits=5, decimal_places=2, default=8.0, verbose_name='Horas Abonadas')
-    arquivo_comprovante = models.FileField(upload_to='faltas/comprovantes/', null=True, blank=True, verbose_name='Comprovante')
+    arquivo_comprovante = models.FileField(upload_to='faltas/comprovantes/', storage=obter_armazenamento, validators=[validar_upload], null=True, blank=True, verbose_name='Comprovante')
+    # Metadados do ficheiro, registados no upload (rh.upload)
+    tamanho_arquivo = models.PositiveBigIntegerField(null=True, blank=True, editable=False, verbose_name='Tamanho (bytes)')
+    tipo_mime = models.CharField(max_length=100, blank=True, editable=False, verbose_name='Tipo MIME')
     registrada_em = models.DateTimeField(auto_now_add=True, verbose_name='Registrada em')
     registrada_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Registrada por')
     
@@ -368,6 +441,10 @@ class Falta(models.Model):
     def __str__(self):
         return f"Falta {self.funcionario.nome_completo} - {self.data}"
 
+    def save(self, *args, **kwargs):
+        registar_metadados(self, 'arquivo_comprovante')
+        super().save(*args, **kwargs)
+
 
 class FolhaPagamento(models.Model):
     empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE)
@@ -474,6 +551,25 @@ class AvaliacaoDesempenho(models.Model):
         super().save(*args, **kwargs)
 
 
+# Blob do armazenamento endereçado por conteúdo (rh.armazenamento)
+class ArquivoConteudo(models.Model):
+    hash = models.CharField(max_length=64, primary_key=True, verbose_name='SHA-256')
+    nome = models.CharField(max_length=255, unique=True, verbose_name='Caminho')
+    tamanho = models.BigIntegerField(default=0, verbose_name='Tamanho (bytes)')
+    referencias = models.IntegerField(default=0, verbose_name='Referências')
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Criado em')
+    
+    class Meta:
+        verbose_name = 'Conteúdo de Arquivo'
+        verbose_name_plural = 'Conteúdos de Arquivos'
+        indexes = [
+            models.Index(fields=['referencias'], name='arquivo_conteudo_refs_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.nome} ({self.referencias} ref.)"
+
+
 class Documento(models.Model):
     TIPO_DOCUMENTO = [
         ('BI', 'BI'),
@@ -491,9 +587,12 @@ class Documento(models.Model):
     tipo = models.CharField(max_length=30, choices=TIPO_DOCUMENTO, verbose_name='Tipo de Documento')
     numero = models.CharField(max_length=50, blank=True, verbose_name='Número')
     descricao = models.CharField(max_length=200, blank=True, verbose_name='Descrição')
-    arquivo = models.FileField(upload_to='documentos/', verbose_name='Arquivo')
+    arquivo = models.FileField(upload_to='documentos/', storage=obter_armazenamento, validators=[validar_upload], verbose_name='Arquivo')
     data_emissao = models.DateField(null=True, blank=True, verbose_name='Data de Emissão')
     data_validade = models.DateField(null=True, blank=True, verbose_name='Data de Validade')
+    # Metadados do ficheiro, registados no upload (rh.upload)
+    tamanho_arquivo = models.PositiveBigIntegerField(null=True, blank=True, editable=False, verbose_name='Tamanho (bytes)')
+    tipo_mime = models.CharField(max_length=100, blank=True, editable=False, verbose_name='Tipo MIME')
     
     criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Criado em')
     
@@ -501,10 +600,36 @@ class Documento(models.Model):
         verbose_name = 'Documento'
         verbose_name_plural = 'Documentos'
         ordering = ['-criado_em']
+        indexes = [
+            # Documentos a vencer de uma empresa: varredura por intervalo (rh.validade_documentos)
+            models.Index(fields=['empresa', 'data_validade'], name='documento_empresa_validade_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.funcionario.nome_completo}"
 
+    def save(self, *args, **kwargs):
+        registar_metadados(self, 'arquivo')
+        super().save(*args, **kwargs)
+
+
+class TextoDocumento(models.Model):
+    """Texto extraído do PDF de um Documento, indexado para pesquisa (rh.indexacao_documentos)"""
+    documento = models.OneToOneField(Documento, on_delete=models.CASCADE, primary_key=True, related_name='texto')
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE)
+    # Nome do ficheiro de que o texto foi extraído; difere de Documento.arquivo quando o ficheiro muda
+    origem = models.CharField(max_length=100)
+    texto = models.TextField(blank=True)
+    erro = models.CharField(max_length=200, blank=True)
+    extraido_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Texto de Documento'
+        verbose_name_plural = 'Textos de Documentos'
+
+    def __str__(self):
+        return f"Texto do documento {self.documento_id}"
+
 
 class Treinamento(models.Model):
     STATUS_TREINAMENTO = [
@@ -583,7 +708,10 @@ class Advertencia(models.Model):
     )
 
     
-    arquivo_documento = models.FileField(upload_to='advertencias/', null=True, blank=True, verbose_name='Documento Oficial')
+    arquivo_documento = models.FileField(upload_to='advertencias/', storage=obter_armazenamento, validators=[validar_upload], null=True, blank=True, verbose_name='Documento Oficial')
+    # Metadados do ficheiro, registados no upload (rh.upload)
+    tamanho_arquivo = models.PositiveBigIntegerField(null=True, blank=True, editable=False, verbose_name='Tamanho (bytes)')
+    tipo_mime = models.CharField(max_length=100, blank=True, editable=False, verbose_name='Tipo MIME')
     
     criada_em = models.DateTimeField(auto_now_add=True, verbose_name='Criada em')
     
@@ -595,6 +723,10 @@ class Advertencia(models.Model):
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.funcionario.nome_completo}"
 
+    def save(self, *args, **kwargs):
+        registar_metadados(self, 'arquivo_documento')
+        super().save(*args, **kwargs)
+
 
 class Beneficio(models.Model):
     TIPO_BENEFICIO = [
@@ -641,4 +773,38 @@ class BeneficioFuncionario(models.Model):
     class Meta:
         verbose_name = 'Benefício do Funcionário'
         verbose_name_plural = 'Benefícios dos Funcionários'
-   
\ No newline at end of file
+   
+
+
+class EntradaPesquisa(models.Model):
+    """Registo de qualquer entidade no índice da pesquisa global (rh.pesquisa)"""
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE)
+    tipo = models.CharField(max_length=20)
+    objeto_id = models.PositiveIntegerField()
+    titulo = models.CharField(max_length=200)
+    detalhe = models.CharField(max_length=200, blank=True)
+    # Texto sem acentos e em minúsculas
+    texto = models.TextField(blank=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Entrada de Pesquisa'
+        verbose_name_plural = 'Entradas de Pesquisa'
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'objeto_id'], name='entrada_pesquisa_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} {self.objeto_id}: {self.titulo}"
+
+
+class TermoPesquisa(models.Model):
+    """Termo normalizado de uma EntradaPesquisa; a pesquisa por prefixo percorre só este índice"""
+    entrada = models.ForeignKey(EntradaPesquisa, on_delete=models.CASCADE, related_name='termos')
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE)
+    termo = models.CharField(max_length=40)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['empresa', 'termo', 'entrada'], name='termo_pesquisa_prefixo_idx'),
+        ]
@@ -0,0 +1,43 @@
+"""
+Renderização parcial das listas (filtros e paginação sem recarregar a página).
+
+Um pedido com o cabeçalho X-Fragmento: tabela (enviado pelo JavaScript de
+base.html) ou com ?fragmento=tabela recebe só o template da tabela, sem o
+layout de base.html, os filtros e o resto do contexto que só a página
+completa usa. As respostas variam pelo cabeçalho (Vary), e as chaves de
+rh.cache_empresa das listas com fragmentos incluem o fragmento pedido
+(partes_pedido=partes_fragmento).
+"""
+from django.shortcuts import render
+from django.utils.cache import patch_vary_headers
+
+
+CABECALHO = 'X-Fragmento'
+PARAMETRO = 'fragmento'
+TABELA = 'tabela'
+
+
+def fragmento_pedido(request):
+    """Nome do fragmento pedido ('' para a página completa)"""
+    return request.headers.get(CABECALHO) or request.GET.get(PARAMETRO) or ''
+
+
+def partes_fragmento(request):
+    """Partes da chave de cache e do ETag (rh.cache_empresa) que distinguem o fragmento"""
+    fragmento = fragmento_pedido(request)
+    return (fragmento,) if fragmento else ()
+
+
+def so_tabela(request):
+    return fragmento_pedido(request) == TABELA
+
+
+def variar_por_fragmento(response):
+    patch_vary_headers(response, (CABECALHO,))
+    return response
+
+
+def render_lista(request, template, template_tabela, contexto):
+    """render() da página completa ou só da tabela, conforme o pedido"""
+    response = render(request, template_tabela if so_tabela(request) else template, contexto)
+    return variar_por_fragmento(response)
@@ -0,0 +1,196 @@
+"""
+Índice da pesquisa global (barra de pesquisa do topo).
+
+Funcionários, departamentos, cargos, treinamentos, advertências e
+benefícios têm cada um uma EntradaPesquisa por empresa, com título,
+detalhe e texto normalizado (sem acentos, minúsculas), e um TermoPesquisa
+por palavra distinta. Os sinais em rh.signals mantêm o índice a cada
+gravação ou remoção; reindexar() reconstrói-o em lote (comando
+reindexar_pesquisa, dados gerados com bulk_create).
+
+Uma pesquisa é uma única consulta: o termo mais longo é procurado por
+prefixo como intervalo [termo, termo + '\\uffff') no índice
+(empresa, termo, entrada), que qualquer banco percorre por B-tree, e os
+restantes termos filtram o texto das poucas entradas candidatas.
+"""
+import re
+import unicodedata
+
+from django.db import transaction
+from django.urls import reverse
+
+from .models import (
+    EntradaPesquisa, TermoPesquisa, Funcionario, Departamento, Cargo, Treinamento, Advertencia, Beneficio
+)
+
+
+TAMANHO_TERMO = 40
+MAX_TERMOS = 64
+LIMITE_RESULTADOS = 10
+
+
+def normalizar(texto):
+    decomposto = unicodedata.normalize('NFKD', str(texto or ''))
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def termos(texto):
+    """Palavras distintas do texto normalizado, pela ordem em que aparecem"""
+    palavras = (p[:TAMANHO_TERMO] for p in re.findall(r'\w+', normalizar(texto)))
+    return list(dict.fromkeys(palavras))[:MAX_TERMOS]
+
+
+class Entidade:
+    """
+    Um tipo pesquisável. `campos` são os campos do modelo que entram no
+    texto indexado (e cuja alteração obriga a reindexar); `relacionados`
+    são as chaves estrangeiras usadas no título.
+    """
+
+    def __init__(self, tipo, rotulo, modelo, campos, titulo, detalhe, url, relacionados=()):
+        self.tipo = tipo
+        self.rotulo = rotulo
+        self.modelo = modelo
+        self.campos = campos
+        self.titulo = titulo
+        self.detalhe = detalhe
+        self.url = url
+        self.relacionados = relacionados
+
+    def entrada(self, obj):
+        titulo = self.titulo(obj)
+        texto = ' '.join(str(getattr(obj, campo) or '') for campo in self.campos)
+        return EntradaPesquisa(
+            empresa_id=obj.empresa_id, tipo=self.tipo, objeto_id=obj.pk,
+            titulo=titulo[:200], detalhe=self.detalhe(obj)[:200],
+            texto=normalizar(f'{titulo} {texto}'),
+        )
+
+    def afetado_por(self, update_fields):
+        """Se um save(update_fields=...) pode mudar a entrada"""
+        return update_fields is None or bool(set(update_fields) & {*self.campos, *self.relacionados, 'empresa'})
+
+    def objetos(self, empresa_id=None):
+        qs = self.modelo.objects.all()
+        if self.relacionados:
+            qs = qs.select_related(*self.relacionados)
+        if empresa_id:
+            qs = qs.filter(empresa_id=empresa_id)
+        return qs
+
+
+ENTIDADES = [
+    Entidade(
+        'funcionario', 'Funcionário', Funcionario, ['nome_completo', 'matricula', 'email_corporativo', 'cpf'],
+        lambda o: o.nome_completo,
+        lambda o: o.matricula,
+        lambda pk: reverse('funcionario_detail', args=[pk]),
+    ),
+    Entidade(
+        'departamento', 'Departamento', Departamento, ['nome', 'sigla'],
+        lambda o: o.nome,
+        lambda o: o.sigla,
+        lambda pk: reverse('departamento_update', args=[pk]),
+    ),
+    Entidade(
+        'cargo', 'Cargo', Cargo, ['nome', 'nivel_hierarquico'],
+        lambda o: o.nome,
+        lambda o: o.get_nivel_hierarquico_display(),
+        lambda pk: reverse('cargo_list'),
+    ),
+    Entidade(
+        'treinamento', 'Treinamento', Treinamento, ['nome', 'instrutor', 'local', 'data_inicio'],
+        lambda o: o.nome,
+        lambda o: f'{o.data_inicio:%d/%m/%Y} - {o.instrutor}',
+        lambda pk: reverse('treinamento_list'),
+    ),
+    Entidade(
+        'advertencia', 'Advertência', Advertencia, ['tipo', 'motivo'],
+        lambda o: f'{o.get_tipo_display()} - {o.funcionario.nome_completo}',
+        lambda o: o.motivo[:120],
+        lambda pk: reverse('advertencia_list'),
+        relacionados=('funcionario',),
+    ),
+    Entidade(
+        'beneficio', 'Benefício', Beneficio, ['nome', 'tipo', 'descricao'],
+        lambda o: o.nome,
+        lambda o: o.get_tipo_display(),
+        lambda pk: reverse('beneficio_list'),
+    ),
+]
+POR_MODELO = {e.modelo: e for e in ENTIDADES}
+POR_TIPO = {e.tipo: e for e in ENTIDADES}
+
+
+def _termos_da_entrada(entrada):
+    return [TermoPesquisa(entrada=entrada, empresa_id=entrada.empresa_id, termo=t) for t in termos(entrada.texto)]
+
+
+def indexar(obj):
+    """Atualiza a entrada do objeto; devolve False se nada mudou"""
+    entidade = POR_MODELO[type(obj)]
+    nova = entidade.entrada(obj)
+    atual = EntradaPesquisa.objects.filter(tipo=entidade.tipo, objeto_id=obj.pk).first()
+    if atual and (atual.titulo, atual.detalhe, atual.texto, atual.empresa_id) == (
+            nova.titulo, nova.detalhe, nova.texto, nova.empresa_id):
+        return False
+    with transaction.atomic():
+        if atual:
+            nova.pk = atual.pk
+            nova.save(force_update=True)
+            TermoPesquisa.objects.filter(entrada=nova).delete()
+        else:
+            nova.save(force_insert=True)
+        TermoPesquisa.objects.bulk_create(_termos_da_entrada(nova))
+    return True
+
+
+def remover(obj):
+    EntradaPesquisa.objects.filter(tipo=POR_MODELO[type(obj)].tipo, objeto_id=obj.pk).delete()
+
+
+@transaction.atomic
+def reindexar(empresa_id=None, lote=1000):
+    """Reconstrói o índice (de uma empresa ou de todas) em lote; devolve o número de entradas"""
+    antigas = EntradaPesquisa.objects.all()
+    if empresa_id:
+        antigas = antigas.filter(empresa_id=empresa_id)
+    antigas.delete()
+    total = 0
+    for entidade in ENTIDADES:
+        entradas = [entidade.entrada(obj) for obj in entidade.objetos(empresa_id).iterator(chunk_size=lote)]
+        # SQLite e PostgreSQL devolvem as chaves geradas no bulk_create
+        EntradaPesquisa.objects.bulk_create(entradas, batch_size=lote)
+        TermoPesquisa.objects.bulk_create(
+            [termo for entrada in entradas for termo in _termos_da_entrada(entrada)], batch_size=lote
+        )
+        total += len(entradas)
+    return total
+
+
+def buscar(empresa_id, consulta, limite=LIMITE_RESULTADOS):
+    """Entradas da empresa que contêm todos os termos (o mais longo por prefixo)"""
+    procurados = termos(consulta)[:8]
+    if not procurados:
+        return []
+    principal = max(procurados, key=len)
+    qs = EntradaPesquisa.objects.filter(
+        empresa_id=empresa_id,
+        termos__empresa_id=empresa_id,
+        termos__termo__gte=principal,
+        termos__termo__lt=principal + '\uffff',
+    )
+    for termo in procurados:
+        if termo != principal:
+            qs = qs.filter(texto__contains=termo)
+    linhas = qs.distinct().order_by('tipo', 'titulo').values('tipo', 'objeto_id', 'titulo', 'detalhe')[:limite]
+    return [
+        {
+            'tipo': linha['tipo'],
+            'rotulo': POR_TIPO[linha['tipo']].rotulo,
+            'titulo': linha['titulo'],
+            'detalhe': linha['detalhe'],
+            'url': POR_TIPO[linha['tipo']].url(linha['objeto_id']),
+        }
+        for linha in linhas
+    ]
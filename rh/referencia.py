@@ -0,0 +1,60 @@
+"""
+Dados de referência por empresa: cargos, departamentos e turnos ativos.
+
+São tabelas pequenas e que mudam pouco, mas entram em todos os
+formulários de funcionário e na barra de filtros da lista. Cada processo
+guarda, por empresa, as opções já formatadas e o mapa cargo -> salário
+base, junto com as versões dos grupos 'cargo', 'departamento' e
+'turnotrabalho' de rh.cache_empresa. Cada leitura compara essas versões
+(uma ida ao cache, nenhuma ao banco); uma gravação em qualquer processo
+incrementa a versão e a próxima leitura recarrega as três tabelas.
+"""
+import threading
+from dataclasses import dataclass
+
+from . import cache_empresa
+
+
+GRUPOS = ('cargo', 'departamento', 'turnotrabalho')
+
+_cache = {}
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class DadosReferencia:
+    cargos: tuple
+    departamentos: tuple
+    turnos: tuple
+    salarios: dict
+
+
+def _carregar(empresa_id):
+    from .models import Cargo, Departamento, TurnoTrabalho
+
+    cargos = list(Cargo.objects.filter(empresa_id=empresa_id, ativo=True))
+    return DadosReferencia(
+        cargos=tuple((c.pk, str(c)) for c in cargos),
+        departamentos=tuple(
+            (d.pk, str(d)) for d in Departamento.objects.filter(empresa_id=empresa_id, ativo=True)
+        ),
+        turnos=tuple((t.pk, str(t)) for t in TurnoTrabalho.objects.filter(empresa_id=empresa_id, ativo=True)),
+        salarios={c.pk: c.salario_base for c in cargos},
+    )
+
+
+def dados_referencia(empresa_id):
+    """DadosReferencia da empresa, recarregados só quando as versões mudam"""
+    versao = tuple(sorted(cache_empresa.versoes(empresa_id, GRUPOS).items()))
+    atual = _cache.get(empresa_id)
+    if atual is not None and atual[0] == versao:
+        return atual[1]
+    dados = _carregar(empresa_id)
+    with _lock:
+        _cache[empresa_id] = (versao, dados)
+    return dados
+
+
+def limpar_cache():
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,323 @@
+"""
+Saldo de férias mantido incrementalmente.
+
+Cada aquisição (aniversário de admissão) e cada consumo/estorno de férias
+é um MovimentoFerias; o saldo corrente fica desnormalizado em
+Funcionario.saldo_ferias e é atualizado na mesma transação que cria o
+movimento, por isso mostrar ou validar o saldo é a leitura de uma linha.
+O comando recalcular_saldo_ferias reconstrói o livro a partir das férias
+existentes e credita as aquisições vencidas.
+"""
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .cache_empresa import invalidar
+from .cobertura import ResultadoCobertura, cobertura_bloqueia, verificar_cobertura, verificar_cobertura_em_lote
+from .models import Departamento, Ferias, Funcionario, MovimentoFerias
+
+
+# Férias cujo período é descontado do saldo
+STATUS_CONSOMEM = ('Aprovada', 'Gozada')
+
+# Mudanças de status permitidas; Rejeitada, Cancelada e Gozada são finais
+TRANSICOES = {
+    'Solicitada': {'Aprovada', 'Rejeitada', 'Cancelada'},
+    'Aprovada': {'Gozada', 'Cancelada'},
+}
+
+
+class TransicaoInvalida(ValueError):
+    def __init__(self, anterior, status):
+        self.anterior, self.status = anterior, status
+        super().__init__(f'Férias {anterior.lower()} não podem passar a {status.lower()}.')
+
+
+def direito_ferias(periodo):
+    """Dias adquiridos ao completar o ano de serviço `periodo` (Lei do Trabalho)"""
+    if periodo == 1:
+        return 12
+    if periodo == 2:
+        return 24
+    return 30
+
+
+def _aniversario(data_admissao, anos):
+    try:
+        return data_admissao.replace(year=data_admissao.year + anos)
+    except ValueError:  # 29/02
+        return date(data_admissao.year + anos, 3, 1)
+
+
+def aquisicoes_devidas(funcionario, ate, desde_periodo=0):
+    """Movimentos de aquisição vencidos até `ate`, a partir de `desde_periodo` + 1"""
+    limite = min(ate, funcionario.data_demissao) if funcionario.data_demissao else ate
+    movimentos = []
+    periodo = desde_periodo + 1
+    while True:
+        data = _aniversario(funcionario.data_admissao, periodo)
+        if data > limite:
+            break
+        dias = direito_ferias(periodo)
+        movimentos.append(MovimentoFerias(
+            empresa_id=funcionario.empresa_id,
+            funcionario_id=funcionario.id,
+            tipo='Aquisicao',
+            dias=dias,
+            data=data,
+            periodo=periodo,
+            descricao=f'{periodo}º ano de serviço',
+        ))
+        periodo += 1
+    return movimentos
+
+
+def movimento_da_mudanca(ferias, status_anterior, status_novo):
+    """
+    Movimento gerado pela passagem de `status_anterior` para `status_novo`,
+    ou None se o saldo não muda (ex.: Aprovada -> Gozada).
+    """
+    consumia = status_anterior in STATUS_CONSOMEM
+    consome = status_novo in STATUS_CONSOMEM
+    if consumia == consome:
+        return None
+    return MovimentoFerias(
+        empresa_id=ferias.empresa_id,
+        funcionario_id=ferias.funcionario_id,
+        ferias=ferias,
+        tipo='Consumo' if consome else 'Estorno',
+        dias=-ferias.dias_uteis if consome else ferias.dias_uteis,
+        data=ferias.data_inicio,
+        descricao=f'{status_anterior} -> {status_novo}',
+    )
+
+
+@transaction.atomic
+def alterar_status(ferias, status, usuario=None):
+    """
+    Muda o status das férias e regista o movimento correspondente no saldo.
+
+    A linha de férias é bloqueada (select_for_update) para que duas
+    aprovações concorrentes não descontem o mesmo período duas vezes.
+    Levanta TransicaoInvalida se o status atual (lido já com o bloqueio)
+    não permite a mudança. Devolve o movimento criado, ou None.
+    """
+    anterior = Ferias.objects.select_for_update().values_list('status', flat=True).get(pk=ferias.pk)
+    if status not in TRANSICOES.get(anterior, ()):
+        raise TransicaoInvalida(anterior, status)
+    ferias.status = status
+    if status == 'Aprovada':
+        ferias.aprovada_em = timezone.now()
+        ferias.aprovada_por = usuario
+    ferias.save()
+
+    movimento = movimento_da_mudanca(ferias, anterior, status)
+    if movimento is not None:
+        movimento.save()
+        Funcionario.objects.filter(pk=ferias.funcionario_id).update(
+            saldo_ferias=F('saldo_ferias') + movimento.dias
+        )
+        invalidar(ferias.empresa_id, 'funcionario')
+    return movimento
+
+
+def bloquear_departamentos(ids):
+    """
+    Bloqueia (select_for_update) as linhas dos departamentos, sempre pela
+    ordem do id: aprovações concorrentes no mesmo departamento verificam a
+    cobertura uma de cada vez, sem deadlocks entre lotes.
+    """
+    ids = sorted({pk for pk in ids if pk is not None})
+    if ids:
+        list(Departamento.objects.select_for_update().filter(pk__in=ids).order_by('pk').values_list('pk', flat=True))
+
+
+@dataclass
+class ResultadoAprovacao:
+    aprovada: bool = False
+    erro: str = ''
+    cobertura: ResultadoCobertura = None
+
+
+@transaction.atomic
+def aprovar(ferias, usuario=None):
+    """
+    Aprova um pedido de férias verificando cobertura e saldo na mesma
+    transação, depois de bloquear o departamento e o funcionário: duas
+    aprovações concorrentes não podem passar ambas pelo limite de
+    ausentes nem pelo mesmo saldo. Levanta TransicaoInvalida como
+    alterar_status.
+    """
+    funcionario = ferias.funcionario
+    bloquear_departamentos([funcionario.departamento_id])
+    saldo = Funcionario.objects.select_for_update().values_list('saldo_ferias', flat=True).get(pk=funcionario.pk)
+
+    resultado = ResultadoAprovacao(cobertura=verificar_cobertura(ferias))
+    if resultado.cobertura.excedido and cobertura_bloqueia():
+        resultado.erro = f'Férias de {funcionario.nome_completo} não aprovadas. {resultado.cobertura.mensagem()}'
+        return resultado
+    if ferias.status not in STATUS_CONSOMEM and ferias.dias_uteis > saldo:
+        resultado.erro = (f'Férias de {funcionario.nome_completo} não aprovadas: saldo de '
+                          f'{saldo} dias insuficiente para {ferias.dias_uteis} dias úteis.')
+        return resultado
+    alterar_status(ferias, 'Aprovada', usuario)
+    resultado.aprovada = True
+    return resultado
+
+
+@dataclass
+class ResultadoLote:
+    alteradas: list = field(default_factory=list)
+    sem_saldo: list = field(default_factory=list)
+    sem_cobertura: list = field(default_factory=list)
+    avisos: list = field(default_factory=list)
+    ignoradas: int = 0
+
+
+@transaction.atomic
+def alterar_status_em_lote(empresa, ids, status, usuario=None):
+    """
+    Aprova ou rejeita várias solicitações de férias de uma vez.
+
+    Só pedidos 'Solicitada' da empresa são considerados. Na aprovação, com
+    os departamentos bloqueados, o saldo é verificado por funcionário
+    (pedidos mais antigos primeiro) e a cobertura por departamento com
+    verificar_cobertura_em_lote; os pedidos
+    aceites são atualizados num único UPDATE ... WHERE id IN (...) AND
+    empresa_id = ..., os movimentos do livro inseridos em lote e os saldos
+    ajustados num bulk_update.
+    """
+    if status not in ('Aprovada', 'Rejeitada'):
+        raise ValueError(f'Status inválido para operação em lote: {status}')
+    ids = {int(pk) for pk in ids}
+    if status == 'Aprovada':
+        # Departamentos antes dos pedidos, pela mesma ordem que aprovar()
+        bloquear_departamentos(
+            Ferias.objects.filter(empresa=empresa, pk__in=ids, status='Solicitada')
+            .values_list('funcionario__departamento_id', flat=True)
+        )
+    pedidos = list(
+        Ferias.objects.select_for_update(of=('self',))
+        .filter(empresa=empresa, pk__in=ids, status='Solicitada')
+        .select_related('funcionario')
+        .only('id', 'empresa_id', 'funcionario_id', 'data_inicio', 'data_fim', 'dias_uteis', 'status',
+              'funcionario__nome_completo', 'funcionario__departamento_id', 'funcionario__saldo_ferias')
+        .order_by('data_inicio', 'id')
+    )
+    resultado = ResultadoLote(ignoradas=len(ids) - len(pedidos))
+
+    if status == 'Aprovada':
+        saldos = {}
+        aceites = []
+        for ferias in pedidos:
+            saldo = saldos.setdefault(ferias.funcionario_id, ferias.funcionario.saldo_ferias)
+            if ferias.dias_uteis > saldo:
+                resultado.sem_saldo.append(ferias)
+            else:
+                saldos[ferias.funcionario_id] = saldo - ferias.dias_uteis
+                aceites.append(ferias)
+        pedidos = []
+        coberturas = verificar_cobertura_em_lote(aceites)
+        for ferias in aceites:
+            cobertura = coberturas[ferias.pk]
+            if cobertura.excedido and cobertura_bloqueia():
+                resultado.sem_cobertura.append((ferias, cobertura))
+                continue
+            if cobertura.excedido:
+                resultado.avisos.append((ferias, cobertura))
+            pedidos.append(ferias)
+
+    if not pedidos:
+        return resultado
+
+    campos = {'status': status}
+    if status == 'Aprovada':
+        campos.update(aprovada_em=timezone.now(), aprovada_por=usuario)
+    Ferias.objects.filter(empresa=empresa, pk__in=[f.pk for f in pedidos]).update(**campos)
+
+    movimentos = [m for m in (movimento_da_mudanca(f, 'Solicitada', status) for f in pedidos) if m is not None]
+    if movimentos:
+        MovimentoFerias.objects.bulk_create(movimentos, batch_size=1000)
+        deltas = {}
+        for movimento in movimentos:
+            deltas[movimento.funcionario_id] = deltas.get(movimento.funcionario_id, 0) + movimento.dias
+        Funcionario.objects.bulk_update(
+            [Funcionario(pk=pk, saldo_ferias=F('saldo_ferias') + dias) for pk, dias in deltas.items()],
+            ['saldo_ferias'], batch_size=1000,
+        )
+    invalidar(empresa.pk, 'ferias', 'movimentoferias', 'funcionario')
+    for ferias in pedidos:
+        ferias.status = status
+    resultado.alteradas = pedidos
+    return resultado
+
+
+@transaction.atomic
+def creditar_aquisicoes(funcionarios, ate=None):
+    """
+    Credita as aquisições vencidas que ainda não constam do livro.
+
+    Uma consulta obtém o último período creditado de cada funcionário;
+    os movimentos novos são inseridos em lote. Devolve o número de
+    movimentos criados.
+    """
+    ate = ate or date.today()
+    ultimos = dict(
+        MovimentoFerias.objects.filter(funcionario__in=funcionarios, tipo='Aquisicao')
+        .values('funcionario_id').annotate(ultimo=Max('periodo')).values_list('funcionario_id', 'ultimo')
+    )
+    novos = []
+    alterados = []
+    for funcionario in funcionarios.only('id', 'empresa_id', 'data_admissao', 'data_demissao'):
+        movimentos = aquisicoes_devidas(funcionario, ate, ultimos.get(funcionario.id) or 0)
+        if movimentos:
+            novos.extend(movimentos)
+            funcionario.saldo_ferias = F('saldo_ferias') + sum(m.dias for m in movimentos)
+            alterados.append(funcionario)
+    MovimentoFerias.objects.bulk_create(novos, batch_size=1000)
+    Funcionario.objects.bulk_update(alterados, ['saldo_ferias'], batch_size=1000)
+    for empresa_id in {f.empresa_id for f in alterados}:
+        invalidar(empresa_id, 'movimentoferias', 'funcionario')
+    return len(novos)
+
+
+@transaction.atomic
+def recalcular_saldos(funcionarios, ate=None):
+    """
+    Reconstrói o livro e o saldo dos funcionários a partir do zero:
+    aquisições vencidas até `ate` e um consumo por férias aprovadas/gozadas.
+    Ajustes manuais são preservados. Devolve o número de movimentos criados.
+    """
+    ate = ate or date.today()
+    MovimentoFerias.objects.filter(funcionario__in=funcionarios).exclude(tipo='Ajuste').delete()
+
+    saldos = {}
+    for funcionario_id, dias in MovimentoFerias.objects.filter(
+        funcionario__in=funcionarios, tipo='Ajuste'
+    ).values_list('funcionario_id', 'dias'):
+        saldos[funcionario_id] = saldos.get(funcionario_id, 0) + dias
+
+    novos = []
+    lista = list(funcionarios.only('id', 'empresa_id', 'data_admissao', 'data_demissao'))
+    for funcionario in lista:
+        movimentos = aquisicoes_devidas(funcionario, ate)
+        novos.extend(movimentos)
+        saldos[funcionario.id] = saldos.get(funcionario.id, 0) + sum(m.dias for m in movimentos)
+
+    for ferias in Ferias.objects.filter(funcionario__in=funcionarios, status__in=STATUS_CONSOMEM).only(
+        'id', 'empresa_id', 'funcionario_id', 'data_inicio', 'dias_uteis', 'status'
+    ):
+        movimento = movimento_da_mudanca(ferias, 'Solicitada', ferias.status)
+        novos.append(movimento)
+        saldos[ferias.funcionario_id] = saldos.get(ferias.funcionario_id, 0) + movimento.dias
+
+    MovimentoFerias.objects.bulk_create(novos, batch_size=1000)
+    for funcionario in lista:
+        funcionario.saldo_ferias = saldos.get(funcionario.id, 0)
+    Funcionario.objects.bulk_update(lista, ['saldo_ferias'], batch_size=1000)
+    for empresa_id in {f.empresa_id for f in lista}:
+        invalidar(empresa_id, 'movimentoferias', 'funcionario')
+    return len(novos)
@@ -0,0 +1,141 @@
+import logging
+
+from django.apps import apps
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from . import cache_empresa, calendario, pesquisa
+from .armazenamento import ajustar_referencias
+from .arquivos import ARQUIVOS_PROTEGIDOS
+from .miniaturas import atualizar_miniaturas
+from .models import Feriado, Funcionario, Empresa
+
+
+logger = logging.getLogger(__name__)
+
+
+@receiver([post_save, post_delete], sender=Feriado)
+def invalidar_calendario(sender, instance, raw=False, **kwargs):
+    calendario.limpar_cache()
+    # Os feriados da empresa já incrementam o grupo 'feriado' dela (ver abaixo)
+    if instance.empresa_id is None and not raw:
+        cache_empresa.invalidar(cache_empresa.EMPRESA_GLOBAL, 'feriado')
+
+
+# Miniaturas: um upload novo (ainda não gravado no storage) ou a remoção
+# da imagem limpa o hash no pre_save; o post_save regenera quando falta.
+CAMPOS_MINIATURA = {Funcionario: ('foto', True), Empresa: ('logo', False)}
+
+
+@receiver(pre_save, sender=Funcionario)
+@receiver(pre_save, sender=Empresa)
+def marcar_miniaturas(sender, instance, **kwargs):
+    campo, _ = CAMPOS_MINIATURA[sender]
+    arquivo = getattr(instance, campo)
+    if not arquivo or not arquivo._committed:
+        setattr(instance, f'{campo}_hash', '')
+
+
+@receiver(post_save, sender=Funcionario)
+@receiver(post_save, sender=Empresa)
+def gerar_miniaturas_do_upload(sender, instance, raw=False, **kwargs):
+    campo, recortar = CAMPOS_MINIATURA[sender]
+    if raw or not getattr(instance, campo) or getattr(instance, f'{campo}_hash'):
+        return
+    try:
+        atualizar_miniaturas(instance, campo, recortar)
+    except Exception:
+        # A imagem original continua a ser servida; gerar_miniaturas pode repetir
+        logger.exception('Falha ao gerar miniaturas de %s %s', sender.__name__, instance.pk)
+
+
+# Contagem de referências dos blobs deduplicados (rh.armazenamento)
+CAMPOS_CAS = {modelo: campo for modelo, campo in ARQUIVOS_PROTEGIDOS.values()}
+
+
+def _registrar_sinais_cas():
+    for modelo in CAMPOS_CAS:
+        pre_save.connect(guardar_arquivo_anterior, sender=modelo, dispatch_uid=f'cas_pre_{modelo.__name__}')
+        post_save.connect(contar_referencias, sender=modelo, dispatch_uid=f'cas_post_{modelo.__name__}')
+        post_delete.connect(descontar_referencia, sender=modelo, dispatch_uid=f'cas_del_{modelo.__name__}')
+
+
+def guardar_arquivo_anterior(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        instance._arquivo_anterior = ''
+        return
+    campo = CAMPOS_CAS[sender]
+    instance._arquivo_anterior = sender.objects.filter(pk=instance.pk).values_list(campo, flat=True).first() or ''
+
+
+def contar_referencias(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    novo = getattr(instance, CAMPOS_CAS[sender]).name or ''
+    anterior = getattr(instance, '_arquivo_anterior', '')
+    if novo != anterior:
+        ajustar_referencias(novo, 1)
+        ajustar_referencias(anterior, -1)
+    instance._arquivo_anterior = novo
+
+
+def descontar_referencia(sender, instance, **kwargs):
+    ajustar_referencias(getattr(instance, CAMPOS_CAS[sender]).name or '', -1)
+
+
+_registrar_sinais_cas()
+
+
+# Índice da pesquisa global (rh.pesquisa)
+def _registrar_sinais_pesquisa():
+    for entidade in pesquisa.ENTIDADES:
+        nome = entidade.modelo.__name__
+        post_save.connect(atualizar_indice_pesquisa, sender=entidade.modelo, dispatch_uid=f'pesquisa_post_{nome}')
+        post_delete.connect(remover_do_indice_pesquisa, sender=entidade.modelo, dispatch_uid=f'pesquisa_del_{nome}')
+
+
+def atualizar_indice_pesquisa(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not pesquisa.POR_MODELO[sender].afetado_por(update_fields):
+        return
+    if pesquisa.indexar(instance) and sender is Funcionario:
+        # O nome do funcionário aparece no título das suas advertências
+        for advertencia in instance.advertencias.all():
+            advertencia.funcionario = instance
+            pesquisa.indexar(advertencia)
+
+
+def remover_do_indice_pesquisa(sender, instance, **kwargs):
+    pesquisa.remover(instance)
+
+
+_registrar_sinais_pesquisa()
+
+
+# Versões do cache por empresa (rh.cache_empresa): cada modelo é um grupo
+MODELOS_SEM_VERSAO = {'usuario', 'arquivoconteudo', 'entradapesquisa', 'termopesquisa'}
+# Grupos invalidados além do do próprio modelo
+GRUPOS_EXTRA = {Empresa: (cache_empresa.GRUPO_CABECALHO,)}
+
+
+def _empresa_do_registo(instance):
+    if isinstance(instance, Empresa):
+        return instance.pk
+    return instance.empresa_id
+
+
+def invalidar_cache_empresa(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    cache_empresa.invalidar(_empresa_do_registo(instance), sender._meta.model_name, *GRUPOS_EXTRA.get(sender, ()))
+
+
+def _registrar_sinais_cache():
+    for modelo in apps.get_app_config('rh').get_models():
+        nome = modelo._meta.model_name
+        if nome in MODELOS_SEM_VERSAO:
+            continue
+        post_save.connect(invalidar_cache_empresa, sender=modelo, dispatch_uid=f'cache_post_{nome}')
+        post_delete.connect(invalidar_cache_empresa, sender=modelo, dispatch_uid=f'cache_del_{nome}')
+
+
+_registrar_sinais_cache()
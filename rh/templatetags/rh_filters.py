@@ -1,4 +1,7 @@
 from django import template
+from django.utils.html import format_html
+
+from rh.miniaturas import url_miniatura
 
 register = template.Library()
 
@@ -17,4 +20,25 @@ def filter_status(queryset, status):
 def timesince_hours(datetime_obj):
     from django.utils import timezone
     delta = timezone.now() - datetime_obj
-    return delta.total_seconds() / 3600
\ No newline at end of file
+    return delta.total_seconds() / 3600
+
+@register.simple_tag
+def miniatura_url(arquivo, tamanho=64, formato='webp'):
+    """URL da miniatura com pelo menos `tamanho` px (ou do original se ainda não gerada)"""
+    return url_miniatura(arquivo, int(tamanho), formato)
+
+
+@register.simple_tag
+def miniatura(arquivo, tamanho=64, alt='', css=''):
+    """<picture> com WebP e JPEG de fallback, exibido a `tamanho` px"""
+    if not arquivo:
+        return ''
+    tamanho = int(tamanho)
+    # Densidade 2x para ecrãs de alta resolução
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}">'
+        '<img src="{}" alt="{}" class="{}" width="{}" height="{}" loading="lazy" decoding="async"></picture>',
+        url_miniatura(arquivo, tamanho * 2, 'webp'),
+        url_miniatura(arquivo, tamanho * 2, 'jpg'),
+        alt, css, tamanho, tamanho,
+    )
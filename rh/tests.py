@@ -1,3 +1,1706 @@
-from django.test import TestCase
+import gzip
+import hashlib
+import importlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import random
+from datetime import date, timedelta
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import Count
+from django.template import Context, Template
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from . import cache_empresa, calendario, referencia
+from .checks import cache_partilhado
+from .cobertura import limite_ausentes, pico_ausencias
+from .dashboard import WIDGETS
+from .dados_sinteticos import GeradorDadosSinteticos
+from .management.commands.teste_carga import Resultados, percentil
+from .forms import FeriasForm, FuncionarioForm
+from .instrumentacao import registro
+from .linha_tempo import FONTES, PRESENCA_EXCECOES
+from .middleware import OrcamentoConsultasExcedido
+from .upload import ArquivoRecebido, ArquivoStreamingHandler
+from .validade_documentos import resumo_validade
+from .indexacao_documentos import documentos_pendentes, pesquisar
+from .pesquisa import buscar
+from .miniaturas import FORMATOS, TAMANHOS, nome_miniatura
+from .models import (
+    Empresa, Usuario, Funcionario, Feriado, Ferias, MovimentoFerias, AvaliacaoDesempenho, Documento,
+    ArquivoConteudo, TextoDocumento, Treinamento, Advertencia, EntradaPesquisa, Cargo, Departamento, Beneficio,
+    Falta, FolhaPagamento,
+)
+from .saldo_ferias import (
+    TransicaoInvalida, alterar_status, alterar_status_em_lote, aprovar, creditar_aquisicoes, recalcular_saldos
+)
+
+
+# Volume do tenant sintético; aumente via ambiente para benchmarks completos
+# (ex.: RH_BENCH_FUNCIONARIOS=10000 RH_BENCH_MESES=12)
+BENCH_FUNCIONARIOS = int(os.environ.get('RH_BENCH_FUNCIONARIOS', 150))
+BENCH_MESES = int(os.environ.get('RH_BENCH_MESES', 2))
+# Multiplicador dos orçamentos de tempo (máquinas de CI lentas)
+BENCH_FATOR_TEMPO = float(os.environ.get('RH_BENCH_FATOR_TEMPO', 1))
+# Cache próprio dos testes: o padrão (FileBasedCache em BASE_DIR/cache) é o do servidor de desenvolvimento
+CACHE_TESTES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def criar_tenant(nome, cnpj, funcionarios, meses, semente=42):
+    """Cria Empresa, gestor RH e dados sintéticos; devolve (empresa, usuario)"""
+    empresa = Empresa.objects.create(
+        nome=nome, cnpj=cnpj, endereco='Maputo', telefone='840000000', email=f'rh@{cnpj}.co.mz'
+    )
+    usuario = Usuario.objects.create_user(username=f'gestor{cnpj}', password='senha-teste', empresa=empresa)
+    GeradorDadosSinteticos(empresa, semente=semente).gerar(
+        departamentos=6, cargos_por_departamento=4, turnos=3,
+        funcionarios=funcionarios, meses=meses,
+    )
+    return empresa, usuario
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class DesempenhoTestCase(TestCase):
+    """Base dos testes de regressão de desempenho com dois tenants de volumes diferentes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa, cls.usuario = criar_tenant('Tenant Grande', '100', BENCH_FUNCIONARIOS, BENCH_MESES)
+        cls.empresa_pequena, cls.usuario_pequeno = criar_tenant('Tenant Pequeno', '200', 5, 1, semente=7)
+        cls.funcionario = Funcionario.objects.filter(empresa=cls.empresa, status='Ativo').first()
+        cls.funcionario_pequeno = Funcionario.objects.filter(empresa=cls.empresa_pequena, status='Ativo').first()
+
+    def setUp(self):
+        cache.clear()
+        calendario.limpar_cache()
+        referencia.limpar_cache()
+        self.client.force_login(self.usuario)
+
+    def medir(self, url, metodo='get', data=None, usuario=None):
+        """Executa a requisição e devolve (response, consultas, segundos)"""
+        if usuario is not None:
+            self.client.force_login(usuario)
+        with CaptureQueriesContext(connection) as ctx:
+            inicio = time.perf_counter()
+            response = getattr(self.client, metodo)(url, data or {})
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+            duracao = time.perf_counter() - inicio
+        return response, len(ctx.captured_queries), duracao
+
+    def assertOrcamento(self, url, consultas, segundos, metodo='get', data=None):
+        response, n, duracao = self.medir(url, metodo, data)
+        self.assertEqual(response.status_code, 200, url)
+        self.assertEqual(
+            n, consultas,
+            f'{url}: {n} consultas (esperado {consultas})'
+        )
+        self.assertLess(
+            duracao, segundos * BENCH_FATOR_TEMPO,
+            f'{url}: {duracao:.3f}s (orçamento {segundos * BENCH_FATOR_TEMPO:.3f}s)'
+        )
+        return response
+
+    def assertConsultasIndependentesDoVolume(self, url_grande, url_pequena, metodo='get', data=None):
+        # Compara requisições em regime (caches de processo já aquecidos)
+        self.medir(url_grande, metodo, data, usuario=self.usuario)
+        self.medir(url_pequena, metodo, data, usuario=self.usuario_pequeno)
+        _, n_grande, _ = self.medir(url_grande, metodo, data, usuario=self.usuario)
+        _, n_pequeno, _ = self.medir(url_pequena, metodo, data, usuario=self.usuario_pequeno)
+        self.assertEqual(
+            n_grande, n_pequeno,
+            f'{url_grande}: número de consultas cresce com o volume ({n_pequeno} -> {n_grande})'
+        )
+
+
+class DashboardDesempenhoTests(DesempenhoTestCase):
+    def test_dashboard(self):
+        # Só o esqueleto: sessão e utilizador
+        self.assertOrcamento(reverse('dashboard'), consultas=2, segundos=1.0)
+
+    def test_dashboard_nao_cresce_com_volume(self):
+        self.assertConsultasIndependentesDoVolume(reverse('dashboard'), reverse('dashboard'))
+
+    def test_widgets_nao_crescem_com_volume(self):
+        for nome in WIDGETS:
+            url = reverse('dashboard_widget', args=[nome])
+            self.assertConsultasIndependentesDoVolume(url, url)
+
+    def test_dashboard_data(self):
+        self.assertOrcamento(reverse('dashboard_data'), consultas=11, segundos=1.0)
+
+    def test_dashboard_data_nao_cresce_com_volume(self):
+        self.assertConsultasIndependentesDoVolume(reverse('dashboard_data'), reverse('dashboard_data'))
+
+
+class FuncionarioDesempenhoTests(DesempenhoTestCase):
+    def test_lista(self):
+        # A primeira carrega os dados de referência (3 consultas); as seguintes não
+        self.assertOrcamento(reverse('funcionario_list'), consultas=8, segundos=1.0)
+        self.assertOrcamento(reverse('funcionario_list'), consultas=5, segundos=1.0)
+
+    def test_lista_com_filtro(self):
+        self.medir(reverse('funcionario_list'))
+        self.assertOrcamento(reverse('funcionario_list') + '?nome=Maria&status=Ativo', consultas=5, segundos=1.0)
+
+    def test_detalhe(self):
+        url = reverse('funcionario_detail', args=[self.funcionario.pk])
+        self.assertOrcamento(url, consultas=8, segundos=1.0)
+
+    def test_detalhe_consultas_fixas_com_historico(self):
+        # Sessão, usuário, funcionário (com cargo/departamento/turno) e uma consulta por aba
+        avaliador = Funcionario.objects.filter(empresa=self.empresa).exclude(pk=self.funcionario.pk).first()
+        for n in range(8):
+            AvaliacaoDesempenho.objects.create(
+                empresa=self.empresa, funcionario=self.funcionario, avaliador=avaliador,
+                periodo_inicio=date(2024, 1, 1), periodo_fim=date(2024, 6, 30),
+                qualidade_trabalho=4, produtividade=4, pontualidade=4, relacionamento=4,
+                iniciativa=4, lideranca=4, nota_final=4,
+            )
+            Documento.objects.create(empresa=self.empresa, funcionario=self.funcionario,
+                                     tipo=Documento.TIPO_DOCUMENTO[0][0], arquivo=f'documentos/{n}.pdf')
+        url = reverse('funcionario_detail', args=[self.funcionario.pk])
+        with self.assertNumQueries(8):
+            response = self.client.get(url)
+        for painel in ('ferias', 'faltas', 'folhas_pagamento', 'avaliacoes', 'documentos'):
+            self.assertLessEqual(len(response.context[painel]), 5)
+        self.assertEqual(len(response.context['avaliacoes']), 5)
+        self.assertContains(response, avaliador.nome_completo)
+
+    def test_detalhe_de_outra_empresa(self):
+        url = reverse('funcionario_detail', args=[self.funcionario_pequeno.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_detalhe_nao_cresce_com_volume(self):
+        self.assertConsultasIndependentesDoVolume(
+            reverse('funcionario_detail', args=[self.funcionario.pk]),
+            reverse('funcionario_detail', args=[self.funcionario_pequeno.pk]),
+        )
+
+
+class LinhaTempoTests(DesempenhoTestCase):
+    def _todas_as_paginas(self, funcionario, limite):
+        url = reverse('funcionario_linha_tempo', args=[funcionario.pk])
+        eventos, cursor = [], None
+        while True:
+            dados = self.client.get(url, {'limite': limite, **({'cursor': cursor} if cursor else {})}).json()
+            eventos.extend(dados['eventos'])
+            cursor = dados['proximo']
+            if not cursor:
+                return eventos
+
+    def test_paginas_cobrem_o_historico_em_ordem(self):
+        eventos = self._todas_as_paginas(self.funcionario, 7)
+        chaves = [(e['data'], e['tipo'], e['id']) for e in eventos]
+        self.assertEqual(chaves, sorted(chaves, reverse=True))
+        self.assertEqual(len(set(chaves)), len(chaves))
+        esperado = (
+            1
+            + Ferias.objects.filter(funcionario=self.funcionario).count()
+            + self.funcionario.faltas.count()
+            + self.funcionario.folhas_pagamento.count()
+            + self.funcionario.presencas.filter(status__in=PRESENCA_EXCECOES).count()
+        )
+        self.assertEqual(len(eventos), esperado)
+        self.assertIn(self.funcionario.data_admissao.isoformat(), {e['data'] for e in eventos if e['tipo'] == 'admissao'})
+
+    def test_pagina_antiga_com_consultas_fixas(self):
+        url = reverse('funcionario_linha_tempo', args=[self.funcionario.pk])
+        cursor = self.client.get(url, {'limite': 5}).json()['proximo']
+        # Sessão, usuário, funcionário e uma consulta por fonte
+        with self.assertNumQueries(3 + len(FONTES)):
+            self.client.get(url, {'limite': 5, 'cursor': cursor})
+
+    def test_cursor_invalido_e_outra_empresa(self):
+        url = reverse('funcionario_linha_tempo', args=[self.funcionario.pk])
+        self.assertEqual(self.client.get(url, {'cursor': 'lixo'}).status_code, 400)
+        url = reverse('funcionario_linha_tempo', args=[self.funcionario_pequeno.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class PresencaDesempenhoTests(DesempenhoTestCase):
+    def test_faltas_do_dia(self):
+        self.assertOrcamento(reverse('faltas_do_dia'), consultas=8, segundos=2.0)
+
+    def test_faltas_do_dia_nao_cresce_com_volume(self):
+        self.assertConsultasIndependentesDoVolume(reverse('faltas_do_dia'), reverse('faltas_do_dia'))
+
+
+class FeriasCalendarioDesempenhoTests(DesempenhoTestCase):
+    def _url(self):
+        hoje = date.today()
+        return reverse('ferias_calendario_data') + f'?inicio={hoje.year - 1}-01-01&fim={hoje.year}-12-31'
+
+    def test_calendario_dados(self):
+        self.assertOrcamento(self._url(), consultas=4, segundos=1.0)
+
+    def test_calendario_nao_cresce_com_volume(self):
+        self.assertConsultasIndependentesDoVolume(self._url(), self._url())
+
+    def test_ausentes_por_dia_igual_a_contagem_dia_a_dia(self):
+        dados = self.client.get(self._url()).json()
+        inicio = date.fromisoformat(dados['inicio'])
+        ferias = list(Ferias.objects.filter(empresa=self.empresa, status__in=['Aprovada', 'Gozada']))
+        for n in range(0, len(dados['ausentes']), 7):
+            dia = inicio + timedelta(days=n)
+            esperado = len({f.funcionario_id for f in ferias if f.data_inicio <= dia <= f.data_fim})
+            self.assertEqual(dados['ausentes'][n], esperado, dia)
+
+    def test_janela_invalida(self):
+        response = self.client.get(reverse('ferias_calendario_data') + '?inicio=2025-02-01&fim=2025-01-01')
+        self.assertEqual(response.status_code, 400)
+
+    def test_departamento_invalido(self):
+        for valor in ('abc', '-1', '1.5'):
+            response = self.client.get(self._url() + f'&departamento={valor}')
+            self.assertEqual(response.status_code, 400, valor)
+        departamento = self.funcionario.departamento
+        dados = self.client.get(self._url() + f'&departamento={departamento.pk}').json()
+        self.assertEqual({f['departamento'] for f in dados['funcionarios']} - {departamento.sigla}, set())
+
+
+class FolhaDesempenhoTests(DesempenhoTestCase):
+    def _dados_folha(self, funcionario):
+        hoje = date.today()
+        return {'funcionario': funcionario.pk, 'mes_referencia': hoje.month, 'ano_referencia': hoje.year}
+
+    def test_gerar_folha_moz(self):
+        self.assertOrcamento(
+            reverse('gerar_folha_moz'), consultas=12, segundos=1.0,
+            metodo='post', data=self._dados_folha(self.funcionario),
+        )
+
+    def test_gerar_folha_moz_nao_cresce_com_volume(self):
+        url = reverse('gerar_folha_moz')
+        for _ in range(2):
+            _, n_grande, _ = self.medir(url, 'post', self._dados_folha(self.funcionario), usuario=self.usuario)
+            _, n_pequeno, _ = self.medir(
+                url, 'post', self._dados_folha(self.funcionario_pequeno), usuario=self.usuario_pequeno,
+            )
+        self.assertEqual(n_grande, n_pequeno)
+
+    def test_payslip_pdf(self):
+        hoje = date.today()
+        url = reverse('payslip_pdf', args=[self.funcionario.pk, hoje.month, hoje.year])
+        response = self.assertOrcamento(url, consultas=9, segundos=1.0)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+    def test_folha_lista(self):
+        self.assertOrcamento(reverse('folha_pagamento_list'), consultas=8, segundos=1.0)
+
+    def test_folha_export_excel(self):
+        response = self.assertOrcamento(
+            reverse('folha_pagamento_list') + '?export=excel', consultas=5, segundos=10.0
+        )
+        self.assertIn('spreadsheetml', response['Content-Type'])
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class GerarDadosSinteticosTests(TestCase):
+    opcoes = dict(departamentos=2, cargos_por_departamento=2, turnos=1, funcionarios=4, meses=1,
+                  data_fim=date(2024, 3, 31), stdout=io.StringIO())
+
+    def test_segunda_execucao_continua_numeracao(self):
+        call_command('gerar_dados_sinteticos', **self.opcoes)
+        empresa = Empresa.objects.get()
+        self.assertEqual(Funcionario.objects.filter(empresa=empresa).count(), 4)
+        self.assertEqual(Departamento.objects.filter(empresa=empresa).count(), 2)
+        self.assertEqual(Cargo.objects.filter(empresa=empresa).count(), 4)
+        self.assertEqual(FolhaPagamento.objects.filter(empresa=empresa).count(), 4 * 2)
+
+        call_command('gerar_dados_sinteticos', empresa=empresa.pk, **self.opcoes)
+        self.assertEqual(Funcionario.objects.filter(empresa=empresa).count(), 8)
+        self.assertEqual(Departamento.objects.filter(empresa=empresa).count(), 4)
+        self.assertEqual(Cargo.objects.filter(empresa=empresa).count(), 8)
+        self.assertEqual(
+            sorted(Funcionario.objects.values_list('matricula', flat=True))[-1], f'E{empresa.pk}-0000007'
+        )
+
+    def test_empresa_inexistente(self):
+        with self.assertRaisesMessage(CommandError, 'não existe'):
+            call_command('gerar_dados_sinteticos', empresa=999, **self.opcoes)
+
+
+class TesteCargaTests(SimpleTestCase):
+    def test_percentil(self):
+        self.assertEqual(percentil([], 95), 0.0)
+        self.assertEqual(percentil([0.25], 50), 0.25)
+        self.assertEqual(percentil([0.25], 99), 0.25)
+        valores = [float(n) for n in range(1, 101)]
+        self.assertEqual([percentil(valores, p) for p in (50, 95, 99, 100)], [50.0, 95.0, 99.0, 100.0])
+        self.assertEqual(percentil([1.0, 2.0, 3.0, 4.0], 50), 2.0)
+
+    def test_resumo(self):
+        resultados = Resultados()
+        for segundos, ok in ((0.3, True), (0.1, True), (0.2, False)):
+            resultados.registrar('dashboard', segundos, ok)
+        resultados.registrar('login', 0.05, True)
+        resumo = resultados.resumo(duracao=2)
+        self.assertEqual(list(resumo), ['dashboard', 'login'])
+        self.assertEqual(resumo['dashboard'], {
+            'requisicoes': 3, 'erros': 1, 'p50_ms': 200.0, 'p95_ms': 300.0, 'p99_ms': 300.0,
+            'max_ms': 300.0, 'req_por_segundo': 1.5,
+        })
+        self.assertEqual(resumo['login']['erros'], 0)
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class TesteCargaEmbutidoTests(TransactionTestCase):
+    """Execução completa de teste_carga contra o servidor WSGI embutido"""
+
+    def test_embutido(self):
+        empresa, usuario = criar_tenant('Carga', '300', 5, 1, semente=3)
+        with tempfile.NamedTemporaryFile(suffix='.json') as saida:
+            call_command(
+                'teste_carga', embutido=True, usuario=usuario.username, senha='senha-teste',
+                utilizadores=1, iteracoes=4, duracao=30, rajada=2, saida_json=saida.name, stdout=io.StringIO(),
+            )
+            relatorio = json.load(saida)
+        endpoints = relatorio['endpoints']
+        self.assertEqual(endpoints['login']['requisicoes'], 1)
+        self.assertGreaterEqual(sum(e['requisicoes'] for e in endpoints.values()), 2 + 4)
+        self.assertEqual({nome: e['erros'] for nome, e in endpoints.items() if e['erros']}, {})
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class CalendarioTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        calendario.limpar_cache()
+        self.empresa = Empresa.objects.create(
+            nome='Calendário', cnpj='300', endereco='Maputo', telefone='1', email='c@c.co.mz'
+        )
+
+    def _dias_uteis_ingenuo(self, inicio, fim, empresa_id=None):
+        return sum(
+            1 for n in range((fim - inicio).days + 1)
+            if calendario.eh_dia_util(inicio + timedelta(days=n), empresa_id)
+        )
+
+    def test_dias_semana_igual_a_contagem_dia_a_dia(self):
+        rnd = random.Random(1)
+        for _ in range(500):
+            inicio = date(2024, 1, 1) + timedelta(days=rnd.randint(0, 800))
+            fim = inicio + timedelta(days=rnd.randint(0, 400))
+            esperado = sum(1 for n in range((fim - inicio).days + 1) if (inicio + timedelta(days=n)).weekday() < 5)
+            self.assertEqual(calendario.dias_semana(inicio, fim), esperado)
+
+    def test_dias_uteis_desconta_feriados(self):
+        rnd = random.Random(2)
+        for _ in range(200):
+            inicio = date(2024, 1, 1) + timedelta(days=rnd.randint(0, 800))
+            fim = inicio + timedelta(days=rnd.randint(0, 400))
+            self.assertEqual(calendario.dias_uteis(inicio, fim), self._dias_uteis_ingenuo(inicio, fim))
+
+    def test_feriado_no_domingo_transfere_para_segunda(self):
+        # 25/06/2023 foi domingo
+        self.assertFalse(calendario.eh_dia_util(date(2023, 6, 26)))
+        self.assertEqual(calendario.dias_uteis(date(2023, 6, 26), date(2023, 6, 30)), 4)
+
+    def test_feriado_da_empresa_invalida_cache(self):
+        dia = date(2025, 3, 12)
+        self.assertTrue(calendario.eh_dia_util(dia, self.empresa.id))
+        Feriado.objects.create(empresa=self.empresa, data=dia, nome='Dia da Cidade')
+        self.assertFalse(calendario.eh_dia_util(dia, self.empresa.id))
+        self.assertTrue(calendario.eh_dia_util(dia))
+
+    @override_settings(RH_CALENDARIO_REVALIDAR=0)
+    def test_feriado_gravado_noutro_processo(self):
+        dia = date(2025, 3, 12)
+        self.assertTrue(calendario.eh_dia_util(dia, self.empresa.id))
+        self.assertTrue(calendario.eh_dia_util(dia))
+        # bulk_create não dispara sinais: só muda a versão partilhada, como
+        # acontece a um processo que não fez a gravação
+        Feriado.objects.bulk_create([Feriado(empresa=None, data=dia, nome='Tolerância de ponto')])
+        self.assertTrue(calendario.eh_dia_util(dia, self.empresa.id))
+        cache_empresa.invalidar(cache_empresa.EMPRESA_GLOBAL, 'feriado')
+        self.assertFalse(calendario.eh_dia_util(dia, self.empresa.id))
+        self.assertFalse(calendario.eh_dia_util(dia))
+
+    def test_dias_uteis_mes_consulta_uma_vez_por_ano(self):
+        with self.assertNumQueries(1):
+            for mes in range(1, 13):
+                calendario.dias_uteis_mes(2025, mes, self.empresa.id)
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class CoberturaFeriasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa, cls.usuario = criar_tenant('Cobertura', '400', 10, 1, semente=3)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _dias_ingenuo(self, intervalos, inicio, fim):
+        maximo, dias = 0, []
+        for n in range((fim - inicio).days + 1):
+            dia = inicio + timedelta(days=n)
+            ausentes = len({f for f, i, t in intervalos if i <= dia <= t})
+            if ausentes > maximo:
+                maximo, dias = ausentes, [dia]
+            elif ausentes == maximo and maximo:
+                dias.append(dia)
+        return maximo, dias
+
+    def test_pico_ausencias_igual_a_contagem_dia_a_dia(self):
+        rnd = random.Random(5)
+        inicio, fim = date(2025, 1, 1), date(2025, 3, 31)
+        for _ in range(100):
+            intervalos = []
+            for _ in range(rnd.randint(1, 30)):
+                ini = date(2024, 12, 1) + timedelta(days=rnd.randint(0, 150))
+                intervalos.append((rnd.randint(1, 8), ini, ini + timedelta(days=rnd.randint(0, 20))))
+            intervalos = [(f, i, t) for f, i, t in intervalos if i <= fim and t >= inicio]
+            if intervalos:
+                self.assertEqual(pico_ausencias(intervalos, inicio, fim), self._dias_ingenuo(intervalos, inicio, fim))
+
+    def test_aprovacao_bloqueada_acima_do_limite(self):
+        dep = Funcionario.objects.filter(empresa=self.empresa).values('departamento').annotate(
+            n=Count('id')).order_by('-n').first()['departamento']
+        Funcionario.objects.filter(departamento_id=dep).update(saldo_ferias=30)
+        funcs = list(Funcionario.objects.filter(departamento_id=dep, status='Ativo'))
+        Ferias.objects.filter(funcionario__departamento_id=dep).delete()
+        inicio, fim = date(2030, 7, 1), date(2030, 7, 10)
+        limite = limite_ausentes(len(funcs))
+        pedidos = [
+            Ferias.objects.create(empresa=self.empresa, funcionario=f, data_inicio=inicio, data_fim=fim,
+                                  dias_totais=10, dias_uteis=8, status='Aprovada' if n < limite else 'Solicitada')
+            for n, f in enumerate(funcs[:limite + 1])
+        ]
+        if len(pedidos) <= limite:
+            self.skipTest('Departamento pequeno demais para exceder o limite')
+        with self.settings(RH_COBERTURA_ACAO='bloquear'):
+            self.client.post(reverse('ferias_aprovar', args=[pedidos[-1].pk]))
+        pedidos[-1].refresh_from_db()
+        self.assertEqual(pedidos[-1].status, 'Solicitada')
+        with self.settings(RH_COBERTURA_ACAO='avisar'):
+            self.client.post(reverse('ferias_aprovar', args=[pedidos[-1].pk]))
+        pedidos[-1].refresh_from_db()
+        self.assertEqual(pedidos[-1].status, 'Aprovada')
+
+    def test_cobertura_verificada_com_departamento_bloqueado(self):
+        func = Funcionario.objects.filter(empresa=self.empresa, status='Ativo').select_related('departamento').first()
+        Funcionario.objects.filter(pk=func.pk).update(saldo_ferias=30)
+        ferias = Ferias.objects.create(empresa=self.empresa, funcionario=func, data_inicio=date(2032, 2, 2),
+                                       data_fim=date(2032, 2, 6), dias_totais=5, dias_uteis=5)
+        with CaptureQueriesContext(connection) as ctx:
+            resultado = aprovar(ferias, self.usuario)
+        self.assertTrue(resultado.aprovada)
+        sql = [q['sql'] for q in ctx.captured_queries]
+        inicio_transacao = next(i for i, q in enumerate(sql) if q.startswith('SAVEPOINT'))
+        bloqueio = next(i for i, q in enumerate(sql) if 'FROM "rh_departamento"' in q)
+        cobertura = next(i for i, q in enumerate(sql) if 'COUNT(' in q and 'rh_funcionario' in q)
+        fim_transacao = next(i for i, q in enumerate(sql) if q.startswith('RELEASE SAVEPOINT'))
+        self.assertLess(inicio_transacao, bloqueio)
+        self.assertLess(bloqueio, cobertura)
+        self.assertLess(cobertura, fim_transacao)
+
+    def test_sobreposicao_do_mesmo_funcionario(self):
+        Funcionario.objects.filter(empresa=self.empresa).update(saldo_ferias=30)
+        func = Funcionario.objects.filter(empresa=self.empresa).first()
+        Ferias.objects.create(empresa=self.empresa, funcionario=func, data_inicio=date(2031, 1, 5),
+                              data_fim=date(2031, 1, 20), dias_totais=16, dias_uteis=12)
+        form = FeriasForm(data={'funcionario': func.pk, 'data_inicio': '2031-01-15', 'data_fim': '2031-01-25'})
+        self.assertFalse(form.is_valid())
+        form = FeriasForm(data={'funcionario': func.pk, 'data_inicio': '2031-01-21', 'data_fim': '2031-01-25'})
+        self.assertTrue(form.is_valid(), form.errors)
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class SaldoFeriasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa, cls.usuario = criar_tenant('Saldo', '500', 5, 1, semente=9)
+
+    def setUp(self):
+        self.funcionario = Funcionario.objects.filter(empresa=self.empresa).first()
+        self.funcionario.data_admissao = date(2020, 3, 10)
+        self.funcionario.data_demissao = None
+        self.funcionario.save()
+        self.funcionarios = Funcionario.objects.filter(pk=self.funcionario.pk)
+        Ferias.objects.filter(funcionario=self.funcionario).delete()
+        recalcular_saldos(self.funcionarios, date(2024, 6, 1))
+
+    def _saldo(self):
+        return Funcionario.objects.values_list('saldo_ferias', flat=True).get(pk=self.funcionario.pk)
+
+    def _soma_livro(self):
+        return sum(MovimentoFerias.objects.filter(funcionario=self.funcionario).values_list('dias', flat=True))
+
+    def test_aquisicoes_por_ano_de_servico(self):
+        # 2021: 12, 2022: 24, 2023: 30, 2024: 30
+        self.assertEqual(self._saldo(), 96)
+        self.assertEqual(creditar_aquisicoes(self.funcionarios, date(2024, 6, 1)), 0)
+        self.assertEqual(creditar_aquisicoes(self.funcionarios, date(2025, 3, 10)), 1)
+        self.assertEqual(self._saldo(), 126)
+
+    def test_aprovar_rejeitar_cancelar(self):
+        ferias = Ferias.objects.create(empresa=self.empresa, funcionario=self.funcionario,
+                                       data_inicio=date(2024, 7, 1), data_fim=date(2024, 7, 12),
+                                       dias_totais=12, dias_uteis=10)
+        alterar_status(ferias, 'Aprovada')
+        self.assertEqual(self._saldo(), 86)
+        with self.assertRaises(TransicaoInvalida):
+            alterar_status(ferias, 'Rejeitada')
+        alterar_status(ferias, 'Cancelada')
+        self.assertEqual(self._saldo(), 96)
+        self.assertEqual(self._saldo(), self._soma_livro())
+
+    def test_gozada_e_final(self):
+        ferias = Ferias.objects.create(empresa=self.empresa, funcionario=self.funcionario,
+                                       data_inicio=date(2024, 7, 1), data_fim=date(2024, 7, 12),
+                                       dias_totais=12, dias_uteis=10)
+        alterar_status(ferias, 'Aprovada')
+        alterar_status(ferias, 'Gozada')
+        self.assertEqual(self._saldo(), 86)
+        self.client.force_login(self.usuario)
+        for nome in ('ferias_cancelar', 'ferias_rejeitar', 'ferias_aprovar'):
+            response = self.client.post(reverse(nome, args=[ferias.pk]), follow=True)
+            self.assertEqual(len([m for m in response.context['messages'] if m.level_tag == 'error']), 1, nome)
+        ferias.refresh_from_db()
+        self.assertEqual(ferias.status, 'Gozada')
+        self.assertEqual(self._saldo(), 86)
+        self.assertEqual(self._saldo(), self._soma_livro())
+
+    def test_migracao_preenche_saldos(self):
+        from django.apps import apps
+        migracao = importlib.import_module('rh.migrations.0012_preencher_saldo_ferias')
+        Ferias.objects.create(empresa=self.empresa, funcionario=self.funcionario,
+                              data_inicio=date(2024, 7, 1), data_fim=date(2024, 7, 12),
+                              dias_totais=12, dias_uteis=10, status='Aprovada')
+        MovimentoFerias.objects.filter(funcionario=self.funcionario).delete()
+        Funcionario.objects.filter(pk=self.funcionario.pk).update(saldo_ferias=0)
+        migracao.preencher_saldos(apps, None)
+        esperado = Funcionario.objects.values_list('saldo_ferias', flat=True).get(pk=self.funcionario.pk)
+        recalcular_saldos(self.funcionarios)
+        self.assertEqual(self._saldo(), esperado)
+        self.assertGreater(esperado, 0)
+
+    def _pedidos(self, quantidade, dias=3):
+        return [
+            Ferias.objects.create(empresa=self.empresa, funcionario=self.funcionario,
+                                  data_inicio=date(2024, 9, 1) + timedelta(days=n * 7),
+                                  data_fim=date(2024, 9, 1) + timedelta(days=n * 7 + dias - 1),
+                                  dias_totais=dias, dias_uteis=dias)
+            for n in range(quantidade)
+        ]
+
+    def test_aprovacao_em_lote_consultas_fixas(self):
+        pequeno = [f.pk for f in self._pedidos(2)]
+        with CaptureQueriesContext(connection) as ctx:
+            alterar_status_em_lote(self.empresa, pequeno, 'Aprovada')
+        grande = [f.pk for f in self._pedidos(20)]
+        with self.settings(RH_COBERTURA_ACAO='avisar'), self.assertNumQueries(len(ctx.captured_queries)):
+            resultado = alterar_status_em_lote(self.empresa, grande, 'Aprovada')
+        self.assertEqual(len(resultado.alteradas), 20)
+        self.assertEqual(self._saldo(), 96 - 22 * 3)
+        self.assertEqual(self._saldo(), self._soma_livro())
+
+    def test_aprovacao_em_lote_respeita_saldo_e_empresa(self):
+        pedidos = self._pedidos(3, dias=40)
+        outra, _ = criar_tenant('Outra', '501', 1, 1, semente=1)
+        with self.settings(RH_COBERTURA_ACAO='avisar'):
+            resultado = alterar_status_em_lote(outra, [f.pk for f in pedidos], 'Aprovada')
+            self.assertEqual(resultado.ignoradas, 3)
+            resultado = alterar_status_em_lote(self.empresa, [f.pk for f in pedidos], 'Aprovada')
+        self.assertEqual([f.pk for f in resultado.alteradas], [pedidos[0].pk, pedidos[1].pk])
+        self.assertEqual([f.pk for f in resultado.sem_saldo], [pedidos[2].pk])
+        self.assertEqual(self._saldo(), 16)
+
+    def test_rejeicao_em_lote_pela_lista(self):
+        pedidos = self._pedidos(3)
+        self.client.force_login(self.usuario)
+        response = self.client.post(reverse('ferias_acao_em_lote'), {
+            'acao': 'rejeitar', 'ids': [f.pk for f in pedidos], 'proximo': 'https://exemplo.com/',
+        })
+        self.assertRedirects(response, reverse('ferias_list'), fetch_redirect_response=False)
+        self.assertEqual(Ferias.objects.filter(pk__in=[f.pk for f in pedidos], status='Rejeitada').count(), 3)
+        self.assertEqual(self._saldo(), 96)
+
+    def test_recalcular_reproduz_saldo_incremental(self):
+        for n, status in enumerate(['Aprovada', 'Rejeitada', 'Aprovada']):
+            ferias = Ferias.objects.create(empresa=self.empresa, funcionario=self.funcionario,
+                                           data_inicio=date(2024, 8, 1 + n * 5), data_fim=date(2024, 8, 3 + n * 5),
+                                           dias_totais=3, dias_uteis=3)
+            alterar_status(ferias, status)
+        incremental = self._saldo()
+        recalcular_saldos(self.funcionarios, date(2024, 6, 1))
+        self.assertEqual(self._saldo(), incremental)
+        self.assertEqual(incremental, 90)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='rh-miniaturas-'), CACHES=CACHE_TESTES)
+class MiniaturasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa, cls.usuario = criar_tenant('Miniaturas', '600', 2, 1, semente=4)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def _imagem(self, cor='red', tamanho=(1200, 900)):
+        saida = io.BytesIO()
+        Image.new('RGB', tamanho, cor).save(saida, 'JPEG')
+        return SimpleUploadedFile('foto.jpg', saida.getvalue(), content_type='image/jpeg')
+
+    def _variantes(self, arquivo):
+        return [
+            nome_miniatura(arquivo.name, getattr(arquivo.instance, f'{arquivo.field.name}_hash'), t, e)
+            for t in TAMANHOS for e in FORMATOS
+        ]
+
+    def test_upload_gera_variantes(self):
+        funcionario = Funcionario.objects.filter(empresa=self.empresa).first()
+        funcionario.foto = self._imagem()
+        funcionario.save()
+        funcionario.refresh_from_db()
+        self.assertEqual(len(funcionario.foto_hash), 64)
+        for nome in self._variantes(funcionario.foto):
+            self.assertTrue(default_storage.exists(nome), nome)
+        with default_storage.open(self._variantes(funcionario.foto)[0]) as f, Image.open(f) as img:
+            self.assertEqual(img.size, (64, 64))
+        html = Template('{% load rh_filters %}{% miniatura f.foto 40 %}').render(Context({'f': funcionario}))
+        self.assertIn('_256.webp', html)
+        self.assertIn('.jpg', html)
+
+    def test_nova_foto_troca_hash_e_salvar_outros_campos_mantem(self):
+        funcionario = Funcionario.objects.filter(empresa=self.empresa).first()
+        funcionario.foto = self._imagem('red')
+        funcionario.save()
+        primeiro = funcionario.foto_hash
+        funcionario.telefone = '841234567'
+        funcionario.save()
+        self.assertEqual(funcionario.foto_hash, primeiro)
+        funcionario.foto = self._imagem('blue')
+        funcionario.save()
+        self.assertNotEqual(funcionario.foto_hash, primeiro)
+
+    def test_comando_preenche_uploads_antigos(self):
+        self.empresa.logo = self._imagem(tamanho=(600, 200))
+        self.empresa.save()
+        Empresa.objects.filter(pk=self.empresa.pk).update(logo_hash='')
+        call_command('gerar_miniaturas', processos=2, stdout=io.StringIO())
+        self.empresa.refresh_from_db()
+        self.assertTrue(self.empresa.logo_hash)
+        with default_storage.open(self._variantes(self.empresa.logo)[-1]) as f, Image.open(f) as img:
+            self.assertEqual(img.size, (256, 85))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='rh-arquivos-'), CACHES=CACHE_TESTES)
+class ArquivoProtegidoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa, cls.usuario = criar_tenant('Arquivos', '700', 2, 1, semente=5)
+        cls.outra, cls.usuario_outra = criar_tenant('Outra', '701', 1, 1, semente=6)
+        cls.conteudo = b'%PDF-1.4\n' + bytes(range(256)) * 40
+        cls.documento = Documento.objects.create(
+            empresa=cls.empresa, funcionario=Funcionario.objects.filter(empresa=cls.empresa).first(),
+            tipo=Documento.TIPO_DOCUMENTO[0][0],
+            arquivo=SimpleUploadedFile('contrato.pdf', cls.conteudo, content_type='application/pdf'),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        self.url = reverse('arquivo_protegido', args=['documento', self.documento.pk])
+
+    def test_download_completo(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.conteudo)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertNotIn('attachment', response['Content-Disposition'])
+        self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+        self.assertEqual(response['Content-Security-Policy'], 'sandbox')
+
+    def test_html_entregue_como_anexo(self):
+        documento = Documento.objects.create(
+            empresa=self.empresa, funcionario=self.documento.funcionario, tipo=Documento.TIPO_DOCUMENTO[0][0],
+            arquivo=SimpleUploadedFile('evil.html', b'<script>alert(1)</script>', content_type='text/html'),
+        )
+        url = reverse('arquivo_protegido', args=['documento', documento.pk])
+        for servidor in ('', 'nginx'):
+            with self.settings(RH_ARQUIVOS_SERVIDOR=servidor):
+                response = self.client.get(url)
+            self.assertEqual(response['Content-Type'], 'application/octet-stream', servidor)
+            self.assertTrue(response['Content-Disposition'].startswith('attachment'), servidor)
+            self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+            self.assertEqual(response['Content-Security-Policy'], 'sandbox')
+
+    def test_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.conteudo)}')
+        self.assertEqual(b''.join(response.streaming_content), self.conteudo[100:200])
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(response.streaming_content), self.conteudo[-10:])
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.conteudo)}-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_range_invalido_ignorado(self):
+        # Sintaticamente inválido: resposta completa, não 416
+        for cabecalho in ('bytes=500-100', 'bytes=abc', 'linhas=1-2'):
+            response = self.client.get(self.url, HTTP_RANGE=cabecalho)
+            self.assertEqual(response.status_code, 200, cabecalho)
+            self.assertEqual(b''.join(response.streaming_content), self.conteudo)
+        # Válido mas além do fim do ficheiro
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.conteudo) + 10}-{len(self.conteudo) + 20}')
+        self.assertEqual(response.status_code, 416)
+
+    def test_outra_empresa_nao_acede(self):
+        self.client.force_login(self.usuario_outra)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_delegacao_ao_servidor_web(self):
+        with self.settings(RH_ARQUIVOS_SERVIDOR='nginx'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protegido/' + self.documento.arquivo.name)
+        self.assertEqual(response.content, b'')
+        with self.settings(RH_ARQUIVOS_SERVIDOR='apache'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], self.documento.arquivo.path)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='rh-cas-'), CACHES=CACHE_TESTES)
+class ArmazenamentoDeduplicadoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa, cls.usuario = criar_tenant('CAS', '710', 2, 1, semente=7)
+        cls.outra, _ = criar_tenant('CAS Outra', '711', 1, 1, semente=8)
+        cls.conteudo = b'%PDF-1.4 contrato ' * 500
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def _documento(self, empresa, nome='contrato.pdf', conteudo=None):
+        return Documento.objects.create(
+            empresa=empresa, funcionario=Funcionario.objects.filter(empresa=empresa).first(),
+            tipo=Documento.TIPO_DOCUMENTO[0][0],
+            arquivo=SimpleUploadedFile(nome, conteudo or self.conteudo, content_type='application/pdf'),
+        )
+
+    def _limpar(self):
+        call_command('limpar_arquivos', horas=-1, stdout=io.StringIO())
+
+    def test_conteudo_igual_grava_um_blob(self):
+        a = self._documento(self.empresa)
+        b = self._documento(self.outra, nome='copia.PDF')
+        self.assertEqual(a.arquivo.name, b.arquivo.name)
+        self.assertTrue(a.arquivo.name.startswith('cas/'))
+        blob = ArquivoConteudo.objects.get()
+        self.assertEqual((blob.referencias, blob.tamanho), (2, len(self.conteudo)))
+
+        b.delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.referencias, 1)
+        self._limpar()
+        self.assertTrue(os.path.exists(a.arquivo.path))
+
+        a.delete()
+        self._limpar()
+        self.assertFalse(ArquivoConteudo.objects.exists())
+        self.assertFalse(os.path.exists(a.arquivo.path))
+
+    def test_extensao_vem_do_conteudo(self):
+        pdf = self._documento(self.empresa, nome='contrato.html')
+        self.assertTrue(pdf.arquivo.name.endswith('.pdf'))
+        self.assertEqual(pdf.tipo_mime, 'application/pdf')
+        html = self._documento(self.empresa, nome='falso.pdf', conteudo=b'<html><script>alert(1)</script>')
+        self.assertTrue(html.arquivo.name.endswith('.bin'))
+        self.assertEqual(html.tipo_mime, 'application/octet-stream')
+
+    def test_metadados_de_comprovantes(self):
+        falta = Falta.objects.create(
+            empresa=self.empresa, funcionario=Funcionario.objects.filter(empresa=self.empresa).first(),
+            data=date(2024, 3, 4), tipo='Atestado',
+            arquivo_comprovante=SimpleUploadedFile('atestado.pdf', self.conteudo),
+        )
+        self.assertEqual((falta.tamanho_arquivo, falta.tipo_mime), (len(self.conteudo), 'application/pdf'))
+        advertencia = Advertencia.objects.create(
+            empresa=self.empresa, funcionario=falta.funcionario, tipo=Advertencia.TIPO_ADVERTENCIA[0][0],
+            motivo='Atraso', descricao='Atrasos repetidos', data_ocorrencia=date(2024, 3, 5),
+            arquivo_documento=SimpleUploadedFile('carta.pdf', b'<svg onload="alert(1)"/>'),
+        )
+        self.assertEqual(advertencia.tipo_mime, 'application/octet-stream')
+        self.client.force_login(self.usuario)
+        response = self.client.get(reverse('arquivo_protegido', args=['advertencia', advertencia.pk]))
+        self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+
+    def test_substituir_ficheiro_ajusta_referencias(self):
+        doc = self._documento(self.empresa)
+        antigo = doc.arquivo.name
+        doc.arquivo = SimpleUploadedFile('novo.pdf', b'outro conteudo')
+        doc.save()
+        self.assertEqual(ArquivoConteudo.objects.get(nome=antigo).referencias, 0)
+        self.assertEqual(ArquivoConteudo.objects.get(nome=doc.arquivo.name).referencias, 1)
+        # Dentro do período de carência o blob sem referências é mantido
+        call_command('limpar_arquivos', stdout=io.StringIO())
+        self.assertTrue(ArquivoConteudo.objects.filter(nome=antigo).exists())
+
+    def test_recontar_e_orfaos(self):
+        doc = self._documento(self.empresa)
+        ArquivoConteudo.objects.all().delete()
+        orfao = default_storage.path('cas/00/00/' + '0' * 64 + '.pdf')
+        os.makedirs(os.path.dirname(orfao), exist_ok=True)
+        with open(orfao, 'wb') as f:
+            f.write(b'x')
+        call_command('limpar_arquivos', recontar=True, horas=-1, stdout=io.StringIO())
+        self.assertEqual(ArquivoConteudo.objects.get().referencias, 1)
+        self.assertTrue(os.path.exists(doc.arquivo.path))
+        self.assertFalse(os.path.exists(orfao))
+
+    def test_migrar_legado_partilhado(self):
+        legado = default_storage.path('documentos/antigo.pdf')
+        os.makedirs(os.path.dirname(legado), exist_ok=True)
+        with open(legado, 'wb') as f:
+            f.write(self.conteudo)
+        a = self._documento(self.empresa)
+        b = self._documento(self.outra)
+        ArquivoConteudo.objects.all().delete()
+        Documento.objects.filter(pk__in=[a.pk, b.pk]).update(arquivo='documentos/antigo.pdf')
+        erros = io.StringIO()
+        call_command('limpar_arquivos', migrar_legado=True, stdout=io.StringIO(), stderr=erros)
+        self.assertEqual(erros.getvalue(), '')
+        a.refresh_from_db()
+        b.refresh_from_db()
+        self.assertTrue(a.arquivo.name.startswith('cas/'))
+        self.assertEqual(a.arquivo.name, b.arquivo.name)
+        self.assertEqual(ArquivoConteudo.objects.get().referencias, 2)
+        self.assertFalse(os.path.exists(legado))
+
+    def test_download_usa_nome_legivel(self):
+        doc = self._documento(self.empresa)
+        self.client.force_login(self.usuario)
+        response = self.client.get(reverse('arquivo_protegido', args=['documento', doc.pk]) + '?download=1')
+        self.assertEqual(b''.join(response.streaming_content), self.conteudo)
+        self.assertIn(f'documento-{doc.pk}.pdf', response['Content-Disposition'])
+
+
+@override_settings(RH_VALIDADE_HORIZONTES=[7, 30], RH_VALIDADE_DIAS_VENCIDOS=10, CACHES=CACHE_TESTES)
+class ValidadeDocumentosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa, cls.usuario = criar_tenant('Validade', '720', 3, 1, semente=9)
+        cls.outra, _ = criar_tenant('Validade Outra', '721', 1, 1, semente=10)
+        cls.hoje = date(2024, 6, 1)
+        funcionario = Funcionario.objects.filter(empresa=cls.empresa).first()
+        for dias in (-30, -3, 0, 7, 8, 30, 31, None):
+            Documento.objects.create(
+                empresa=cls.empresa, funcionario=funcionario, tipo='BI', numero=str(dias),
+                data_validade=cls.hoje + timedelta(days=dias) if dias is not None else None,
+            )
+        Documento.objects.create(
+            empresa=cls.outra, funcionario=Funcionario.objects.filter(empresa=cls.outra).first(),
+            tipo='BI', numero='outra', data_validade=cls.hoje,
+        )
+
+    def test_grupos_numa_consulta(self):
+        with self.assertNumQueries(1):
+            resumo = resumo_validade(self.empresa, self.hoje)
+        self.assertEqual(
+            [[d.numero for d in g.documentos] for g in resumo.grupos],
+            [['-3'], ['0', '7'], ['8', '30']],
+        )
+        self.assertEqual(resumo.grupos[2].rotulo, 'Vencem entre 8 e 30 dias')
+
+    def test_comando_envia_um_email_por_empresa(self):
+        Empresa.objects.filter(pk=self.outra.pk).update(ativa=False)
+        call_command('avisar_validade_documentos', data=self.hoje.isoformat(), stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(self.empresa.email, mail.outbox[0].to)
+        self.assertIn('5 documentos', mail.outbox[0].subject)
+        self.assertNotIn('outra', mail.outbox[0].body)
+
+    def test_pagina(self):
+        self.client.force_login(self.usuario)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('documentos_validade'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'outra')
+
+
+def pdf_com_texto(*linhas):
+    from reportlab.pdfgen import canvas
+
+    saida = io.BytesIO()
+    pdf = canvas.Canvas(saida)
+    for i, linha in enumerate(linhas):
+        pdf.drawString(72, 750 - 20 * i, linha)
+    pdf.save()
+    return saida.getvalue()
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='rh-fts-'), CACHES=CACHE_TESTES)
+class IndexacaoDocumentosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa, cls.usuario = criar_tenant('Indexação', '730', 2, 1, semente=11)
+        cls.outra, _ = criar_tenant('Indexação Outra', '731', 1, 1, semente=12)
+        contrato = pdf_com_texto('Contrato de trabalho por prazo indeterminado', 'Cláusula de confidencialidade')
+        cls.contrato = cls._documento(cls.empresa, 'contrato.pdf', contrato)
+        cls.copia = cls._documento(cls.empresa, 'copia.pdf', contrato)
+        cls.certificado = cls._documento(cls.empresa, 'certificado.pdf', pdf_com_texto('Certificado de formação em soldadura'))
+        cls.alheio = cls._documento(cls.outra, 'contrato.pdf', pdf_com_texto('Contrato de prestação de serviços'))
+        cls._documento(cls.empresa, 'foto.png', b'nao e pdf')
+
+    @classmethod
+    def _documento(cls, empresa, nome, conteudo):
+        return Documento.objects.create(
+            empresa=empresa, funcionario=Funcionario.objects.filter(empresa=empresa).first(),
+            tipo='Contrato', arquivo=SimpleUploadedFile(nome, conteudo),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def _indexar(self):
+        saida = io.StringIO()
+        call_command('indexar_documentos', processos=1, stdout=saida, stderr=io.StringIO())
+        return saida.getvalue()
+
+    def test_indexacao_incremental(self):
+        self.assertIn('4 documentos indexados', self._indexar())
+        self.assertFalse(documentos_pendentes().exists())
+        self.assertIn('0 documentos indexados', self._indexar())
+
+        self.certificado.arquivo = SimpleUploadedFile('novo.pdf', pdf_com_texto('Atestado de aptidão médica'))
+        self.certificado.save()
+        self.assertEqual(list(documentos_pendentes().values_list('pk', flat=True)), [self.certificado.pk])
+        self.assertIn('1 documentos indexados', self._indexar())
+        self.assertEqual(pesquisar(self.empresa.pk, 'soldadura'), [])
+        self.assertEqual([r.documento for r in pesquisar(self.empresa.pk, 'aptidao')], [self.certificado])
+
+    def test_pesquisa_por_empresa_com_trecho(self):
+        self._indexar()
+        resultados = pesquisar(self.empresa.pk, 'contrato indeterminado')
+        self.assertEqual({r.documento for r in resultados}, {self.contrato, self.copia})
+        self.assertIn('<mark>indeterminado</mark>', resultados[0].trecho)
+        self.assertEqual([r.documento for r in pesquisar(self.outra.pk, 'contrato')], [self.alheio])
+        # Prefixo, sem acentos e sintaxe FTS tratada como texto
+        self.assertEqual(len(pesquisar(self.empresa.pk, 'clausula confidenc')), 2)
+        self.assertEqual(pesquisar(self.empresa.pk, '" OR * NEAR('), [])
+
+    def test_apagar_documento_remove_do_indice(self):
+        self._indexar()
+        self.copia.delete()
+        self.assertEqual([r.documento for r in pesquisar(self.empresa.pk, 'contrato')], [self.contrato])
+        self.assertEqual(TextoDocumento.objects.filter(empresa=self.empresa).count(), 2)
+
+    def test_pagina(self):
+        self._indexar()
+        self.client.force_login(self.usuario)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('documentos_busca'), {'q': 'confidencialidade'})
+        self.assertContains(response, '<mark>confidencialidade</mark>', count=2)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='rh-upload-'), RH_UPLOAD_MAX_BYTES=200 * 1024, CACHES=CACHE_TESTES)
+class UploadStreamingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa, cls.usuario = criar_tenant('Upload', '740', 1, 1, semente=13)
+        cls.funcionario = Funcionario.objects.filter(empresa=cls.empresa).first()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _enviar(self, nome, conteudo):
+        return self.client.post(reverse('documento_create'), {
+            'funcionario': self.funcionario.pk, 'tipo': 'Contrato',
+            'arquivo': SimpleUploadedFile(nome, conteudo),
+        })
+
+    def _temporarios(self):
+        pasta = os.path.join(settings.MEDIA_ROOT, 'cas', 'tmp')
+        return os.listdir(pasta) if os.path.isdir(pasta) else []
+
+    def test_pdf_gravado_com_metadados(self):
+        conteudo = b'%PDF-1.4\n' + os.urandom(150 * 1024)
+        response = self._enviar('scan.pdf', conteudo)
+        self.assertRedirects(response, reverse('documento_list'), fetch_redirect_response=False)
+        documento = Documento.objects.get(empresa=self.empresa)
+        self.assertEqual((documento.tamanho_arquivo, documento.tipo_mime), (len(conteudo), 'application/pdf'))
+        self.assertTrue(documento.arquivo.name.endswith(hashlib.sha256(conteudo).hexdigest() + '.pdf'))
+        with documento.arquivo.open('rb') as f:
+            self.assertEqual(f.read(), conteudo)
+        self.assertEqual(self._temporarios(), [])
+
+    def test_extensao_do_blob_pelo_tipo_detetado(self):
+        conteudo = b'\x89PNG\r\n\x1a\n' + os.urandom(1024)
+        self._enviar('digitalizacao.pdf', conteudo)
+        documento = Documento.objects.get(empresa=self.empresa)
+        self.assertEqual(documento.tipo_mime, 'image/png')
+        self.assertTrue(documento.arquivo.name.endswith(hashlib.sha256(conteudo).hexdigest() + '.png'))
+
+    def test_ficheiro_grande_recusado(self):
+        # Detetado durante a receção
+        for tamanho in (250 * 1024, 2 * 1024 * 1024):
+            response = self._enviar('scan.pdf', b'%PDF-1.4\n' + b'0' * tamanho)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, 'excede o tamanho máximo')
+        self.assertFalse(Documento.objects.exists())
+        self.assertEqual(self._temporarios(), [])
+
+    def test_limite_por_ficheiro(self):
+        # Cada um abaixo do limite, juntos acima: os dois são aceites
+        metade = b'%PDF-1.4\n' + b'0' * (150 * 1024)
+        request = RequestFactory().post('/', {
+            'a': SimpleUploadedFile('a.pdf', metade), 'b': SimpleUploadedFile('b.pdf', metade),
+        })
+        for nome in ('a', 'b'):
+            self.assertIsInstance(request.FILES[nome], ArquivoRecebido)
+            self.assertEqual(request.FILES[nome].size, len(metade))
+            request.FILES[nome].close()
+
+    def test_upload_interrompido_apaga_temporario(self):
+        handler = ArquivoStreamingHandler()
+        handler.new_file('arquivo', 'scan.pdf', 'application/pdf', None)
+        handler.receive_data_chunk(b'%PDF-1.4\n' + b'0' * 1024, 0)
+        self.assertEqual(len(self._temporarios()), 1)
+        handler.upload_interrupted()
+        self.assertEqual(self._temporarios(), [])
+
+    def test_tipo_detetado_pelo_conteudo(self):
+        response = self._enviar('contrato.pdf', b'MZ\x90\x00 executavel disfarcado')
+        self.assertContains(response, 'Tipo de ficheiro não permitido')
+        self.assertFalse(Documento.objects.exists())
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class PesquisaGlobalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa, cls.usuario = criar_tenant('Pesquisa', '750', 5, 1, semente=14)
+        cls.outra, _ = criar_tenant('Pesquisa Outra', '751', 5, 1, semente=15)
+        cls.funcionario = Funcionario.objects.filter(empresa=cls.empresa).first()
+
+    def _titulos(self, consulta, empresa=None):
+        return [r['titulo'] for r in buscar((empresa or self.empresa).pk, consulta)]
+
+    def test_prefixo_sem_acentos_por_empresa(self):
+        Funcionario.objects.filter(pk=self.funcionario.pk).update(nome_completo='Joana Conceição Mabote')
+        self.funcionario.refresh_from_db()
+        self.funcionario.save()
+        self.assertEqual(self._titulos('concei mab'), ['Joana Conceição Mabote'])
+        self.assertEqual(self._titulos(self.funcionario.matricula), ['Joana Conceição Mabote'])
+        self.assertEqual(self._titulos('conceicao', self.outra), [])
+
+    def test_sinais_mantem_indice(self):
+        treinamento = Treinamento.objects.create(
+            empresa=self.empresa, nome='Primeiros Socorros', descricao='-', instrutor='Cruz Vermelha',
+            carga_horaria=8, data_inicio=date(2024, 3, 1), data_fim=date(2024, 3, 2), local='Maputo',
+        )
+        self.assertEqual(self._titulos('socorro'), ['Primeiros Socorros'])
+        treinamento.nome = 'Combate a Incêndios'
+        treinamento.save()
+        self.assertEqual(self._titulos('socorro'), [])
+        self.assertEqual(self._titulos('incendio'), ['Combate a Incêndios'])
+        treinamento.delete()
+        self.assertEqual(self._titulos('incendio'), [])
+
+        advertencia = Advertencia.objects.create(
+            empresa=self.empresa, funcionario=self.funcionario, tipo=Advertencia.TIPO_ADVERTENCIA[0][0],
+            motivo='Uso indevido de equipamento', descricao='-', data_ocorrencia=date(2024, 3, 1),
+        )
+        self.funcionario.nome_completo = 'Alberto Renomeado'
+        self.funcionario.save()
+        self.assertEqual(self._titulos('equipamento renomeado'), [f'{advertencia.get_tipo_display()} - Alberto Renomeado'])
+
+    def test_consulta_usa_indice(self):
+        sql, parametros = EntradaPesquisa.objects.filter(
+            empresa=self.empresa, termos__empresa=self.empresa, termos__termo__gte='ma', termos__termo__lt='ma\uffff'
+        ).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, parametros)
+            plano = ' '.join(str(linha) for linha in cursor.fetchall())
+        self.assertIn('termo_pesquisa_prefixo_idx', plano)
+
+    def test_endpoint(self):
+        self.client.force_login(self.usuario)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('pesquisa_global'), {'q': self.funcionario.nome_completo[:4]})
+        resultados = response.json()['resultados']
+        self.assertIn(reverse('funcionario_detail', args=[self.funcionario.pk]), [r['url'] for r in resultados])
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class CacheEmpresaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa, cls.usuario = criar_tenant('Cache', '760', 5, 1, semente=16)
+        cls.outra, _ = criar_tenant('Cache Outra', '761', 5, 1, semente=17)
+
+    def setUp(self):
+        cache.clear()
+        self.chamadas = []
+
+        @cache_empresa.em_cache('nomes_cargos', grupos=['cargo'])
+        def nomes_cargos(empresa_id):
+            self.chamadas.append(empresa_id)
+            return sorted(Cargo.objects.filter(empresa_id=empresa_id).values_list('nome', flat=True))
+
+        self.nomes_cargos = nomes_cargos
+
+    def test_valor_guardado_ate_gravacao_do_grupo(self):
+        primeiro = self.nomes_cargos(self.empresa.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.nomes_cargos(self.empresa.pk), primeiro)
+        # Gravar noutro grupo não invalida
+        Departamento.objects.filter(empresa=self.empresa).first().save()
+        self.nomes_cargos(self.empresa.pk)
+        self.assertEqual(self.chamadas, [self.empresa.pk])
+
+        cargo = Cargo.objects.filter(empresa=self.empresa).first()
+        cargo.nome = 'Cargo Renomeado'
+        cargo.save()
+        self.assertIn('Cargo Renomeado', self.nomes_cargos(self.empresa.pk))
+        self.assertEqual(self.chamadas, [self.empresa.pk, self.empresa.pk])
+
+    def test_invalidacao_isolada_por_empresa(self):
+        self.nomes_cargos(self.empresa.pk)
+        self.nomes_cargos(self.outra.pk)
+        Cargo.objects.filter(empresa=self.outra).first().save()
+        self.nomes_cargos(self.empresa.pk)
+        self.nomes_cargos(self.outra.pk)
+        self.assertEqual(self.chamadas, [self.empresa.pk, self.outra.pk, self.outra.pk])
+
+    def test_contador_perdido_nao_reutiliza_versao(self):
+        antes = cache_empresa.chave(self.empresa.pk, 'x', ['cargo'])
+        cache_empresa.invalidar(self.empresa.pk, 'cargo')
+        cache.clear()
+        time.sleep(0.002)
+        self.assertNotEqual(cache_empresa.chave(self.empresa.pk, 'x', ['cargo']), antes)
+
+    def test_cache_view(self):
+        chamadas = []
+
+        @cache_empresa.cache_view('teste', grupos=['funcionario'])
+        def view(request):
+            chamadas.append(request.GET.get('q'))
+            return HttpResponse(str(Funcionario.objects.filter(empresa=request.user.empresa).count()))
+
+        fabrica = RequestFactory()
+
+        def pedido(metodo='get', **dados):
+            request = getattr(fabrica, metodo)('/teste/', dados)
+            request.user = self.usuario
+            return view(request)
+
+        self.assertEqual(pedido(q='a').content, b'5')
+        self.assertEqual(pedido(q='a').content, b'5')
+        pedido(q='b')
+        pedido('post', q='a')
+        self.assertEqual(chamadas, ['a', 'b', None])
+
+        Funcionario.objects.filter(empresa=self.empresa).first().delete()
+        self.assertEqual(pedido(q='a').content, b'4')
+
+    def test_transacao_incrementa_cada_grupo_uma_vez(self):
+        inicial = cache_empresa.versoes(self.empresa.pk, ['cargo'])['cargo']
+        cargos = list(Cargo.objects.filter(empresa=self.empresa))
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                for cargo in cargos:
+                    cargo.save()
+                depois_das_gravacoes = cache_empresa.versoes(self.empresa.pk, ['cargo'])['cargo']
+                # Gravação depois de uma leitura: incrementa de novo na hora
+                cargos[0].save()
+                self.assertEqual(cache_empresa.versoes(self.empresa.pk, ['cargo'])['cargo'], inicial + 2)
+        self.assertGreater(len(cargos), 1)
+        self.assertEqual(depois_das_gravacoes, inicial + 1)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(cache_empresa.versoes(self.empresa.pk, ['cargo'])['cargo'], inicial + 3)
+
+    def test_rollback_descarta_lote(self):
+        inicial = cache_empresa.versoes(self.empresa.pk, ['cargo'])['cargo']
+        cargo = Cargo.objects.filter(empresa=self.empresa).first()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                try:
+                    with transaction.atomic():
+                        cargo.save()
+                        raise ValueError
+                except ValueError:
+                    pass
+                # O lote do savepoint desfeito não serve: esta gravação cria outro
+                Departamento.objects.filter(empresa=self.empresa).first().save()
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(cache_empresa.versoes(self.empresa.pk, ['cargo'])['cargo'], inicial + 1)
+
+    def test_aviso_cache_local_em_producao(self):
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with self.settings(CACHES=locmem, DEBUG=False):
+            self.assertEqual([a.id for a in cache_partilhado(None)], ['rh.W001'])
+        with self.settings(CACHES=locmem, DEBUG=True):
+            self.assertEqual(cache_partilhado(None), [])
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache'}}):
+            self.assertEqual(cache_partilhado(None), [])
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class ReferenciaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa, cls.usuario = criar_tenant('Referencia', '770', 5, 1, semente=18)
+        cls.outra, _ = criar_tenant('Referencia Outra', '771', 5, 1, semente=19)
+
+    def setUp(self):
+        referencia.limpar_cache()
+        self.client.force_login(self.usuario)
+
+    def test_opcoes_do_formulario_sem_consultas(self):
+        with self.assertNumQueries(3):
+            FuncionarioForm(empresa=self.empresa)
+        with self.assertNumQueries(0):
+            form = FuncionarioForm(empresa=self.empresa)
+            html = str(form['cargo']) + str(form['departamento']) + str(form['turno'])
+        cargo = Cargo.objects.filter(empresa=self.empresa, ativo=True).first()
+        self.assertIn(f'<option value="{cargo.pk}">{cargo}</option>', html)
+        self.assertNotIn(str(Cargo.objects.filter(empresa=self.outra).first()), html)
+
+    def test_gravacao_recarrega(self):
+        dados = referencia.dados_referencia(self.empresa.pk)
+        cargo = Cargo.objects.get(pk=dados.cargos[0][0])
+        cargo.ativo = False
+        cargo.save()
+        self.assertNotIn(cargo.pk, referencia.dados_referencia(self.empresa.pk).salarios)
+        # A outra empresa mantém o que já tinha carregado
+        referencia.dados_referencia(self.outra.pk)
+        with self.assertNumQueries(0):
+            referencia.dados_referencia(self.outra.pk)
+
+    def test_formulario_valida_pelo_banco(self):
+        alheio = Cargo.objects.filter(empresa=self.outra).first()
+        form = FuncionarioForm({'cargo': alheio.pk}, empresa=self.empresa)
+        self.assertIn('cargo', form.errors)
+
+    def test_mapa_de_salarios(self):
+        referencia.dados_referencia(self.empresa.pk)
+        with self.assertNumQueries(2):  # sessão e utilizador
+            response = self.client.get(reverse('salarios_cargos'))
+        cargos = Cargo.objects.filter(empresa=self.empresa, ativo=True)
+        self.assertEqual(
+            response.json()['salarios'], {str(c.pk): float(c.salario_base) for c in cargos}
+        )
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class PaginasEmCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa, cls.usuario = criar_tenant('Paginas', '780', 5, 1, semente=20)
+        cls.outra, _ = criar_tenant('Paginas Outra', '781', 5, 1, semente=21)
+
+    def setUp(self):
+        cache.clear()
+        referencia.limpar_cache()
+        self.client.force_login(self.usuario)
+        # O primeiro pedido define o cookie CSRF, que entra na chave
+        self.client.get(reverse('funcionario_list'))
+
+    def test_repeticao_sem_consultas_ate_gravar(self):
+        url = reverse('funcionario_list') + '?status=Ativo'
+        primeira = self.client.get(url).content
+        with self.assertNumQueries(2):  # sessão e utilizador
+            self.assertEqual(self.client.get(url).content, primeira)
+
+        funcionario = Funcionario.objects.filter(empresa=self.empresa, status='Ativo').first()
+        funcionario.nome_completo = 'Aaron Renomeado'
+        funcionario.save()
+        self.assertContains(self.client.get(url), 'Aaron Renomeado')
+
+    def test_gravacao_de_outra_empresa_nao_invalida(self):
+        url = reverse('cargo_list')
+        self.client.get(url)
+        Cargo.objects.filter(empresa=self.outra).first().save()
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+    def test_alterar_empresa_invalida_paginas(self):
+        url = reverse('cargo_list')
+        self.client.get(url)
+        self.empresa.nome = 'Paginas Renomeada'
+        self.empresa.save()
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(url)
+        self.assertGreater(len(consultas), 2)
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+    def test_mensagens_nao_ficam_em_cache(self):
+        url = reverse('beneficio_list')
+        self.client.get(url)
+        response = self.client.post(reverse('beneficio_create'), {
+            'nome': 'Seguro de Saúde', 'tipo': Beneficio.TIPO_BENEFICIO[0][0], 'descricao': '-',
+            'valor_empresa': '100', 'valor_funcionario': '0', 'ativo': 'on',
+        }, follow=True)
+        self.assertContains(response, 'Benefício criado com sucesso')
+        self.assertContains(response, 'Seguro de Saúde')
+        self.assertNotContains(self.client.get(url), 'Benefício criado com sucesso')
+
+    def test_filtros_por_empresa(self):
+        alheio = Funcionario.objects.filter(empresa=self.outra).first()
+        proprio = Funcionario.objects.filter(empresa=self.empresa).first()
+        for nome in ('ferias_list', 'folha_pagamento_list'):
+            response = self.client.get(reverse(nome))
+            self.assertContains(response, proprio.nome_completo)
+            self.assertNotContains(response, alheio.nome_completo)
+
+    def test_menu_lateral_por_secao(self):
+        self.assertContains(
+            self.client.get(reverse('cargo_list')), f'nav-link active" href="{reverse("cargo_list")}"'
+        )
+        self.assertContains(
+            self.client.get(reverse('beneficio_list')), f'nav-link active" href="{reverse("beneficio_list")}"'
+        )
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class PedidosCondicionaisTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa, cls.usuario = criar_tenant('Condicional', '790', 5, 1, semente=22)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+        # O cookie CSRF, definido no primeiro pedido de página, faz parte do ETag
+        self.client.get(reverse('cargo_list'))
+
+    def _revalidar(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        return response['ETag']
+
+    def test_304_sem_executar_a_view(self):
+        for url in (reverse('dashboard_data'), reverse('salarios_cargos'), reverse('cargo_list')):
+            etag = self._revalidar(url)
+            with self.assertNumQueries(2):  # sessão e utilizador
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(response.content, b'')
+
+    def test_gravacao_muda_etag(self):
+        url = reverse('dashboard_data')
+        etag = self._revalidar(url)
+        # Grupo que o endpoint não usa: mantém o ETag
+        Cargo.objects.filter(empresa=self.empresa).first().save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Ferias.objects.filter(funcionario__empresa=self.empresa).first().save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_por_utilizador(self):
+        url = reverse('salarios_cargos')
+        etag = self._revalidar(url)
+        colega = Usuario.objects.create_user(username='colega790', password='senha-teste', empresa=self.outra_empresa())
+        self.client.force_login(colega)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def outra_empresa(self):
+        return Empresa.objects.create(
+            nome='Outra', cnpj='791', endereco='Maputo', telefone='840000000', email='rh@791.co.mz'
+        )
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class CompressaoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa, cls.usuario = criar_tenant('Compressao', '800', 5, 1, semente=23)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def test_negociacao(self):
+        from .compressao import codificacao_aceite
+
+        self.assertEqual(codificacao_aceite('gzip, deflate, br'), 'br')
+        self.assertEqual(codificacao_aceite('gzip, br;q=0'), 'gzip')
+        self.assertEqual(codificacao_aceite('gzip, br', brotli_permitido=False), 'gzip')
+        self.assertIsNone(codificacao_aceite('identity'))
+        self.assertIsNone(codificacao_aceite(''))
+
+    def test_html_so_gzip_com_enchimento(self):
+        url = reverse('funcionario_list')
+        self.client.get(url)  # cookie CSRF
+        original = self.client.get(url).content
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), original)
+        self.assertLess(len(response.content), len(original) / 3)
+        self.assertTrue(response['ETag'].startswith('W/'))
+        # Enchimento aleatório no cabeçalho gzip: o tamanho varia entre pedidos
+        tamanhos = {len(self.client.get(url, HTTP_ACCEPT_ENCODING='gzip').content) for _ in range(10)}
+        self.assertGreater(len(tamanhos), 1)
+        # Só Brotli aceite: HTML vai sem compressão
+        self.assertFalse(self.client.get(url, HTTP_ACCEPT_ENCODING='br').has_header('Content-Encoding'))
+
+    def test_brotli_para_outros_tipos(self):
+        import brotli
+        from .compressao import CompressaoMiddleware
+
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, br')
+        corpo = b'id;nome\n' + b'1;funcionario\n' * 500
+        response = CompressaoMiddleware(lambda r: HttpResponse(corpo, content_type='text/csv'))(request)
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), corpo)
+
+    def test_resposta_pequena_nao_comprimida(self):
+        response = self.client.get(reverse('pesquisa_global'), {'q': 'zzz'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming_e_ficheiros(self):
+        from django.http import StreamingHttpResponse
+        from .compressao import CompressaoMiddleware
+
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        linhas = [f'{i};funcionario {i}\n'.encode() for i in range(2000)]
+        middleware = CompressaoMiddleware(lambda r: StreamingHttpResponse(iter(linhas), content_type='text/csv'))
+        response = middleware(request)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), b''.join(linhas))
+
+        def ficheiro(r):
+            response = HttpResponse(b'x' * 5000, content_type='text/plain')
+            response['Accept-Ranges'] = 'bytes'
+            return response
+        self.assertFalse(CompressaoMiddleware(ficheiro)(request).has_header('Content-Encoding'))
+
+    def test_collectstatic_pre_comprimido(self):
+        import brotli
+
+        origem = tempfile.mkdtemp()
+        destino = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, origem)
+        self.addCleanup(shutil.rmtree, destino)
+        os.makedirs(os.path.join(origem, 'rh'))
+        with open(os.path.join(origem, 'rh', 'app.js'), 'w') as f:
+            f.write('console.log("hr manager");\n' * 200)
+        with open(os.path.join(origem, 'rh', 'app.css'), 'w') as f:
+            f.write('body { background: url("fundo.svg"); }\n' + '.x { color: red; }\n' * 200)
+        with open(os.path.join(origem, 'rh', 'fundo.svg'), 'w') as f:
+            f.write('<svg xmlns="http://www.w3.org/2000/svg"></svg>')
+
+        with self.settings(STATICFILES_DIRS=[origem], STATIC_ROOT=destino, INSTALLED_APPS=['django.contrib.staticfiles']):
+            call_command('collectstatic', interactive=False, verbosity=0)
+
+        with open(os.path.join(destino, 'staticfiles.json')) as f:
+            manifesto = json.load(f)['paths']
+        for nome in ('rh/app.js', 'rh/app.css'):
+            caminho = os.path.join(destino, manifesto[nome])
+            with open(caminho, 'rb') as f:
+                original = f.read()
+            with open(caminho + '.gz', 'rb') as f:
+                self.assertEqual(gzip.decompress(f.read()), original)
+            with open(caminho + '.br', 'rb') as f:
+                self.assertEqual(brotli.decompress(f.read()), original)
+        # Mais pequeno comprimido do que o original: sem variantes
+        self.assertFalse(os.path.exists(os.path.join(destino, manifesto['rh/fundo.svg']) + '.br'))
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class RenderizacaoParcialTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa, cls.usuario = criar_tenant('Parcial', '810', 25, 2, semente=24)
+
+    def setUp(self):
+        cache.clear()
+        referencia.limpar_cache()
+        self.client.force_login(self.usuario)
+        self.client.get(reverse('funcionario_list'))  # cookie CSRF e dados de referência
+
+    def test_so_tabela_sem_layout_nem_filtros(self):
+        for nome in ('funcionario_list', 'ferias_list', 'folha_pagamento_list'):
+            url = reverse(nome)
+            completa = self.client.get(url)
+            parcial = self.client.get(url, HTTP_X_FRAGMENTO='tabela')
+            self.assertEqual(parcial.status_code, 200)
+            self.assertIn('X-Fragmento', parcial['Vary'])
+            self.assertNotContains(parcial, '<html')
+            self.assertNotContains(parcial, 'data-fragmento-filtros')
+            self.assertContains(parcial, '<table')
+            self.assertLess(len(parcial.content), len(completa.content) / 2)
+            self.assertNotIn('search_form', parcial.context)
+            # Também por parâmetro
+            self.assertNotContains(self.client.get(url, {'fragmento': 'tabela'}), '<html')
+
+    def test_paginacao_mantem_filtros(self):
+        response = self.client.get(
+            reverse('funcionario_list'), {'status': 'Ativo', 'fragmento': 'tabela'}
+        )
+        self.assertContains(response, 'href="?status=Ativo&amp;page=2"')
+
+    def test_consultas_do_fragmento(self):
+        url = reverse('ferias_list')
+        cache.clear()
+        with CaptureQueriesContext(connection) as completa:
+            self.client.get(url)
+        cache.clear()
+        with CaptureQueriesContext(connection) as parcial:
+            self.client.get(url, HTTP_X_FRAGMENTO='tabela')
+        # Sem a lista de funcionários do filtro
+        self.assertEqual(len(parcial), len(completa) - 1)
+
+    def test_proximo_sem_fragmento(self):
+        Ferias.objects.filter(empresa=self.empresa).update(status='Solicitada')
+        response = self.client.get(reverse('ferias_list'), {'status': 'Solicitada', 'fragmento': 'tabela'})
+        self.assertContains(response, f'name="proximo" value="{reverse("ferias_list")}?status=Solicitada"')
+
+    def test_cache_separa_pagina_e_fragmento(self):
+        url = reverse('funcionario_list')
+        self.client.get(url, HTTP_X_FRAGMENTO='tabela')
+        self.assertContains(self.client.get(url), '<html')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag, HTTP_X_FRAGMENTO='tabela').status_code, 200)
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class DashboardWidgetsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa, cls.usuario = criar_tenant('Widgets', '820', 20, 2, semente=25)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+        self.client.get(reverse('dashboard'))  # cookie CSRF
+
+    def test_esqueleto_aponta_para_os_widgets(self):
+        response = self.client.get(reverse('dashboard'))
+        for nome in WIDGETS:
+            url = reverse('dashboard_widget', args=[nome])
+            self.assertContains(response, f'data-widget="{url}"')
+
+    def test_widgets_em_cache(self):
+        for nome in WIDGETS:
+            url = reverse('dashboard_widget', args=[nome])
+            primeira = self.client.get(url)
+            self.assertEqual(primeira.status_code, 200, nome)
+            self.assertNotContains(primeira, '<html')
+            with self.assertNumQueries(2):  # sessão e utilizador
+                segunda = self.client.get(url)
+            self.assertEqual(segunda.content, primeira.content, nome)
+
+    def test_totais(self):
+        response = self.client.get(reverse('dashboard_widget', args=['totais']))
+        ativos = Funcionario.objects.filter(empresa=self.empresa, status='Ativo').count()
+        self.assertContains(response, f'<div class="stat-number">{ativos}</div>', html=True)
+
+    def test_grafico(self):
+        response = self.client.get(reverse('dashboard_widget', args=['status']))
+        self.assertContains(response, 'data-grafico="grafico-status"')
+        script = response.content.decode().split('<script id="grafico-status" type="application/json">')[1]
+        dados = json.loads(script.split('</script>')[0])
+        self.assertEqual(dados['tipo'], 'doughnut')
+        self.assertEqual(sum(dados['valores']), Funcionario.objects.filter(empresa=self.empresa).count())
+
+    def test_invalidacao_por_widget(self):
+        url_ferias = reverse('dashboard_widget', args=['ferias_recentes'])
+        url_totais = reverse('dashboard_widget', args=['totais'])
+        self.client.get(url_ferias)
+        self.client.get(url_totais)
+        Ferias.objects.filter(funcionario__empresa=self.empresa).first().save()
+        with self.assertNumQueries(2):
+            self.client.get(url_totais)
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(url_ferias)
+        self.assertGreater(len(consultas), 2)
+
+    @override_settings(RH_DASHBOARD_TTL={'totais': 0})
+    def test_ttl_configuravel(self):
+        self.assertEqual(WIDGETS['totais'].timeout, 0)
+        self.assertEqual(WIDGETS['status'].timeout, WIDGETS['status'].ttl)
+
+    def test_304(self):
+        url = reverse('dashboard_widget', args=['aniversariantes'])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_widget_desconhecido(self):
+        self.assertEqual(self.client.get(reverse('dashboard_widget', args=['nenhum'])).status_code, 404)
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class InstrumentacaoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa, cls.usuario = criar_tenant('Metricas', '830', 3, 1, semente=26)
+
+    def setUp(self):
+        cache.clear()
+        registro.limpar()
+
+    def test_metricas_so_para_staff(self):
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 302)
+        self.client.force_login(self.usuario)
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 403)
+
+    def test_metricas_json_e_prometheus(self):
+        self.client.force_login(self.usuario)
+        response = self.client.get(reverse('cargo_list'))
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        Usuario.objects.filter(pk=self.usuario.pk).update(is_staff=True)
+
+        dados = self.client.get(reverse('metricas')).json()['views']['cargo_list']
+        self.assertEqual(dados['requisicoes'], 1)
+        self.assertGreater(dados['consultas_max'], 0)
+        self.assertEqual(dados['orcamento_excedido'], 0)
+
+        for response in (
+            self.client.get(reverse('metricas'), {'formato': 'prometheus'}),
+            self.client.get(reverse('metricas'), HTTP_ACCEPT='text/plain'),
+        ):
+            self.assertTrue(response['Content-Type'].startswith('text/plain'))
+            self.assertContains(response, '# TYPE rh_requisicoes_total counter')
+            self.assertContains(response, 'rh_requisicoes_total{view="cargo_list"} 1')
+
+    @override_settings(RH_ORCAMENTO_CONSULTAS={'cargo_list': 0})
+    def test_orcamento_excedido(self):
+        self.client.force_login(self.usuario)
+        with self.settings(RH_ORCAMENTO_ACAO='log'), self.assertLogs('rh.instrumentacao', 'WARNING'):
+            self.assertEqual(self.client.get(reverse('cargo_list')).status_code, 200)
+        with self.settings(RH_ORCAMENTO_ACAO='erro'), self.assertRaises(OrcamentoConsultasExcedido):
+            self.client.get(reverse('cargo_list'))
+        self.assertEqual(registro.snapshot()['cargo_list']['orcamento_excedido'], 2)
+
+    @override_settings(RH_METRICAS_ATIVAS=False)
+    def test_metricas_desativadas(self):
+        self.client.force_login(self.usuario)
+        response = self.client.get(reverse('cargo_list'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(registro.snapshot(), {})
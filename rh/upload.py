@@ -0,0 +1,201 @@
+"""
+Receção de uploads em streaming (FILE_UPLOAD_HANDLERS).
+
+ArquivoStreamingHandler substitui os handlers padrão do Django (memória
+até FILE_UPLOAD_MAX_MEMORY_SIZE e depois ficheiro temporário): cada bloco
+recebido é escrito diretamente num temporário em MEDIA_ROOT/cas/tmp e
+somado ao SHA-256, sem nunca acumular o ficheiro em memória. O tipo MIME
+é detetado pelos primeiros bytes (assinatura do formato, não a extensão
+nem o Content-Type enviado pelo navegador).
+
+Ficheiros acima de RH_UPLOAD_MAX_BYTES ou de tipo fora de
+RH_UPLOAD_TIPOS_PERMITIDOS são rejeitados logo que o problema é
+detetado (pelo Content-Length da parte, quando o navegador o envia, pelo
+primeiro bloco ou ao ultrapassar o limite): o temporário é apagado e o
+resto do ficheiro é descartado. O limite é por ficheiro; um formulário
+com vários ficheiros dentro do limite é aceite mesmo que a soma o
+ultrapasse. Um upload interrompido apaga o seu temporário. O
+formulário recebe um ArquivoRejeitado e o validador validar_upload, nos
+campos de ficheiro dos modelos, mostra o motivo. O servidor web deve
+limitar o corpo dos pedidos (ex.: client_max_body_size no nginx).
+
+Como o temporário já está no mesmo sistema de ficheiros e o hash já é
+conhecido, gravar o ficheiro no armazenamento deduplicado é só uma
+mudança de nome (ver ArmazenamentoDeduplicado._save). A extensão do blob
+vem do tipo detetado, não do nome enviado pelo cliente.
+"""
+import hashlib
+import mimetypes
+import os
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.template.defaultfilters import filesizeformat
+
+from .armazenamento import PASTA_TMP, armazenamento_documentos
+
+
+TIPOS_PERMITIDOS_PADRAO = [
+    'application/pdf',
+    'image/jpeg',
+    'image/png',
+    'image/gif',
+    'image/webp',
+    'image/tiff',
+    'application/msword',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'application/vnd.oasis.opendocument.text',
+]
+
+# Assinaturas (prefixo, tipo MIME) dos formatos reconhecidos
+ASSINATURAS = [
+    (b'%PDF-', 'application/pdf'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/msword'),
+    (b'PK\x03\x04', 'application/zip'),
+]
+# Formatos Office/OpenDocument são ZIP: o tipo vem da extensão
+EXTENSOES_ZIP = {'.docx', '.xlsx', '.pptx', '.odt', '.ods'}
+
+
+def max_bytes():
+    return getattr(settings, 'RH_UPLOAD_MAX_BYTES', 25 * 1024 * 1024)
+
+
+def tipos_permitidos():
+    return getattr(settings, 'RH_UPLOAD_TIPOS_PERMITIDOS', TIPOS_PERMITIDOS_PADRAO)
+
+
+def detetar_tipo(inicio, nome=''):
+    """Tipo MIME a partir dos primeiros bytes do ficheiro"""
+    if inicio[:4] == b'RIFF' and inicio[8:12] == b'WEBP':
+        return 'image/webp'
+    for assinatura, tipo in ASSINATURAS:
+        if inicio.startswith(assinatura):
+            if tipo == 'application/zip':
+                extensao = os.path.splitext(nome)[1].lower()
+                if extensao in EXTENSOES_ZIP:
+                    return mimetypes.guess_type(nome)[0] or tipo
+            return tipo
+    return 'application/octet-stream'
+
+
+def tipo_do_arquivo(arquivo, nome=''):
+    """
+    Tipo MIME de um ficheiro a gravar: o detetado por ArquivoStreamingHandler
+    ou, para ficheiros que não vieram de um upload, o dos primeiros bytes.
+    Nunca o Content-Type enviado pelo navegador.
+    """
+    tipo = getattr(arquivo, 'tipo_mime', '')
+    if tipo:
+        return tipo
+    arquivo.seek(0)
+    inicio = arquivo.read(64)
+    arquivo.seek(0)
+    return detetar_tipo(inicio, nome or getattr(arquivo, 'name', '') or '')
+
+
+def registar_metadados(instancia, campo):
+    """Preenche tamanho_arquivo e tipo_mime de `instancia` quando `campo` recebe um ficheiro novo"""
+    arquivo = getattr(instancia, campo)
+    if arquivo and not arquivo._committed:
+        instancia.tamanho_arquivo = arquivo.file.size
+        instancia.tipo_mime = tipo_do_arquivo(arquivo.file, arquivo.name)
+
+
+def extensao_do_tipo(tipo):
+    """Extensão do blob gravado para um tipo MIME ('.bin' se desconhecido)"""
+    return mimetypes.guess_extension(tipo or '') or '.bin'
+
+
+class ArquivoRecebido(TemporaryUploadedFile):
+    """Upload já gravado num temporário de MEDIA_ROOT/cas/tmp, com hash e tipo"""
+
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        pasta = armazenamento_documentos.path(PASTA_TMP)
+        os.makedirs(pasta, exist_ok=True)
+        arquivo = tempfile.NamedTemporaryFile(suffix='.upload' + os.path.splitext(name)[1], dir=pasta)
+        UploadedFile.__init__(self, arquivo, name, content_type, size, charset, content_type_extra)
+        self.sha256 = ''
+        self.tipo_mime = ''
+
+
+class ArquivoRejeitado(UploadedFile):
+    """Marcador de um upload recusado; o conteúdo não é guardado"""
+
+    def __init__(self, name, size, erro):
+        super().__init__(BytesIO(), name, 'application/octet-stream', max(size, 1), None)
+        self.erro_upload = erro
+
+
+class ArquivoStreamingHandler(FileUploadHandler):
+    chunk_size = 64 * 1024
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.recebidos = 0
+        self.sha = hashlib.sha256()
+        self.erro = None
+        self.arquivo = None
+        if content_length is not None and content_length > max_bytes():
+            self.erro = f'O ficheiro excede o tamanho máximo de {filesizeformat(max_bytes())}.'
+        else:
+            self.arquivo = ArquivoRecebido(file_name, content_type, 0, charset, content_type_extra)
+
+    def _rejeitar(self, erro):
+        self.erro = erro
+        self.arquivo.close()  # apaga o temporário
+        self.arquivo = None
+
+    def receive_data_chunk(self, raw_data, start):
+        self.recebidos += len(raw_data)
+        if self.erro:
+            return None  # descarta o resto do ficheiro
+        if start == 0:
+            self.arquivo.tipo_mime = detetar_tipo(raw_data[:64], self.file_name)
+            if self.arquivo.tipo_mime not in tipos_permitidos():
+                self._rejeitar('Tipo de ficheiro não permitido. Envie PDF, imagem ou documento Word/OpenDocument.')
+                return None
+        if self.recebidos > max_bytes():
+            self._rejeitar(f'O ficheiro excede o tamanho máximo de {filesizeformat(max_bytes())}.')
+            return None
+        self.sha.update(raw_data)
+        self.arquivo.write(raw_data)
+        return None
+
+    def upload_interrupted(self):
+        # Como TemporaryFileUploadHandler: o temporário não fica em cas/tmp
+        arquivo = getattr(self, 'arquivo', None)
+        if arquivo is not None:
+            temporario = arquivo.temporary_file_path()
+            try:
+                arquivo.close()
+                os.remove(temporario)
+            except FileNotFoundError:
+                pass
+            self.arquivo = None
+
+    def file_complete(self, file_size):
+        if self.erro:
+            return ArquivoRejeitado(self.file_name, self.recebidos, self.erro)
+        self.arquivo.seek(0)
+        self.arquivo.size = file_size
+        self.arquivo.sha256 = self.sha.hexdigest()
+        return self.arquivo
+
+
+def validar_upload(valor):
+    """Validador dos campos de ficheiro: mostra o motivo de um upload recusado"""
+    arquivo = getattr(valor, '_file', None) or valor
+    erro = getattr(arquivo, 'erro_upload', None)
+    if erro:
+        raise ValidationError(erro, code='upload_rejeitado')
@@ -13,12 +13,16 @@ urlpatterns = [
     
     # Dashboard
     path('', views.dashboard, name='dashboard'),
+    path('dashboard/widgets/<str:nome>/', views.dashboard_widget, name='dashboard_widget'),
     path('dashboard-data/', views.dashboard_data, name='dashboard_data'),
+    path('metricas/', views.metricas, name='metricas'),
+    path('arquivos/<str:tipo>/<int:pk>/', views.arquivo_protegido, name='arquivo_protegido'),
     
     # Funcionários
     path('funcionarios/', views.FuncionarioListView.as_view(), name='funcionario_list'),
     path('funcionarios/novo/', views.FuncionarioCreateView.as_view(), name='funcionario_create'),
     path('funcionarios/<int:pk>/', views.FuncionarioDetailView.as_view(), name='funcionario_detail'),
+    path('funcionarios/<int:pk>/linha-tempo/', views.funcionario_linha_tempo, name='funcionario_linha_tempo'),
     path('funcionarios/<int:pk>/editar/', views.FuncionarioUpdateView.as_view(), name='funcionario_update'),
     path('funcionarios/<int:pk>/excluir/', views.FuncionarioDeleteView.as_view(), name='funcionario_delete'),
     
@@ -32,12 +36,17 @@ urlpatterns = [
     path('cargos/novo/', views.CargoCreateView.as_view(), name='cargo_create'),
     path('cargos/<int:pk>/editar/', views.CargoUpdateView.as_view(), name='cargo_update'),
     path('ajax/obter-salario-cargo/', views.obter_salario_cargo, name='obter_salario_cargo'),
+    path('ajax/salarios-cargos/', views.salarios_cargos, name='salarios_cargos'),
     
     # Férias
     path('ferias/', views.ferias_list, name='ferias_list'),
     path('ferias/novo/', views.ferias_create, name='ferias_create'),
+    path('ferias/calendario/', views.ferias_calendario, name='ferias_calendario'),
+    path('ferias/calendario/dados/', views.ferias_calendario_data, name='ferias_calendario_data'),
     path('ferias/<int:pk>/aprovar/', views.ferias_aprovar, name='ferias_aprovar'),
     path('ferias/<int:pk>/rejeitar/', views.ferias_rejeitar, name='ferias_rejeitar'),
+    path('ferias/<int:pk>/cancelar/', views.ferias_cancelar, name='ferias_cancelar'),
+    path('ferias/lote/', views.ferias_acao_em_lote, name='ferias_acao_em_lote'),
     
     # Faltas
     path('faltas/', views.FaltaListView.as_view(), name='falta_list'),
@@ -54,6 +63,9 @@ urlpatterns = [
     # Documentos
     path('documentos/', views.DocumentoListView.as_view(), name='documento_list'),
     path('documentos/novo/', views.DocumentoCreateView.as_view(), name='documento_create'),
+    path('documentos/validade/', views.documentos_validade, name='documentos_validade'),
+    path('documentos/busca/', views.documentos_busca, name='documentos_busca'),
+    path('pesquisa/', views.pesquisa_global, name='pesquisa_global'),
     
     # Treinamentos
     path('treinamentos/', views.TreinamentoListView.as_view(), name='treinamento_list'),
@@ -117,11 +117,15 @@ def generate_payroll_report(folhas):
 from decimal import Decimal, ROUND_HALF_UP
 from datetime import datetime
 
+from .calendario import dias_uteis_mes
 
-def calcular_salario_por_hora(salario_mensal, turno=None):
-    """Calcula o salário por hora baseado no turno"""
+
+def calcular_salario_por_hora(salario_mensal, turno=None, ano=None, mes=None):
+    """Calcula o salário por hora baseado no turno (e nos dias úteis do mês, se informado)"""
     if turno:
-        horas_mensais = turno.calcular_horas_mensais()
+        horas_mensais = turno.calcular_horas_mensais(ano, mes)
+    elif ano and mes:
+        horas_mensais = dias_uteis_mes(ano, mes) * 8
     else:
         # Padrão 22 dias úteis * 8 horas
         horas_mensais = 22 * 8
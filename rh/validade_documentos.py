@@ -0,0 +1,109 @@
+"""
+Documentos a vencer (BI, carta de condução, contratos...).
+
+O resumo de uma empresa é montado a partir de uma única consulta por
+intervalo de data_validade, servida pelo índice (empresa, data_validade):
+os documentos vencidos há até RH_VALIDADE_DIAS_VENCIDOS dias e os que
+vencem dentro do maior horizonte de RH_VALIDADE_HORIZONTES. A
+distribuição pelos grupos é feita em memória, numa só passagem. A mesma
+estrutura alimenta a página de validade e o e-mail diário enviado pelo
+comando avisar_validade_documentos.
+"""
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.template.loader import render_to_string
+
+from .models import Documento, Empresa
+
+
+@dataclass
+class GrupoValidade:
+    rotulo: str
+    vencidos: bool = False
+    documentos: list = field(default_factory=list)
+
+
+@dataclass
+class ResumoValidade:
+    empresa: object
+    data: date
+    grupos: list
+
+    @property
+    def total(self):
+        return sum(len(g.documentos) for g in self.grupos)
+
+
+def horizontes():
+    return sorted(getattr(settings, 'RH_VALIDADE_HORIZONTES', [7, 30, 60]))
+
+
+def documentos_a_vencer(empresa_id, desde, ate):
+    """Documentos da empresa com validade em [desde, ate], por data de validade"""
+    return (
+        Documento.objects
+        .filter(empresa_id=empresa_id, data_validade__range=(desde, ate))
+        .select_related('funcionario')
+        .only('tipo', 'numero', 'data_validade', 'arquivo',
+              'funcionario__nome_completo', 'funcionario__matricula')
+        .order_by('data_validade', 'pk')
+    )
+
+
+def _grupos(limites):
+    grupos = [GrupoValidade('Vencidos', vencidos=True)]
+    anterior = 0
+    for dias in limites:
+        if anterior == 0:
+            rotulo = f'Vencem em até {dias} dias'
+        else:
+            rotulo = f'Vencem entre {anterior + 1} e {dias} dias'
+        grupos.append(GrupoValidade(rotulo))
+        anterior = dias
+    return grupos
+
+
+def resumo_validade(empresa, hoje=None):
+    """ResumoValidade da empresa na data `hoje` (uma consulta)"""
+    hoje = hoje or date.today()
+    limites_dias = horizontes()
+    limites = [hoje + timedelta(days=d) for d in limites_dias]
+    desde = hoje - timedelta(days=getattr(settings, 'RH_VALIDADE_DIAS_VENCIDOS', 30))
+    grupos = _grupos(limites_dias)
+
+    for documento in documentos_a_vencer(empresa.pk, desde, limites[-1]):
+        documento.dias_restantes = (documento.data_validade - hoje).days
+        if documento.data_validade < hoje:
+            grupos[0].documentos.append(documento)
+        else:
+            grupos[1 + bisect_left(limites, documento.data_validade)].documentos.append(documento)
+    return ResumoValidade(empresa, hoje, grupos)
+
+
+def destinatarios(empresa):
+    """E-mail da empresa e do gestor de RH, sem repetições"""
+    enderecos = [empresa.email]
+    try:
+        enderecos.append(empresa.gestor_rh.email)
+    except Empresa.gestor_rh.RelatedObjectDoesNotExist:
+        pass
+    return list(dict.fromkeys(e for e in enderecos if e))
+
+
+def enviar_resumo(resumo, para=None):
+    """Envia o resumo por e-mail pelo EMAIL_BACKEND configurado; devolve 1 se enviado"""
+    para = para or destinatarios(resumo.empresa)
+    if not para or not resumo.total:
+        return 0
+    contexto = {'resumo': resumo}
+    mensagem = EmailMultiAlternatives(
+        subject=f'{resumo.empresa.nome}: {resumo.total} documentos vencidos ou a vencer',
+        body=render_to_string('rh/email/validade_documentos.txt', contexto),
+        to=para,
+    )
+    mensagem.attach_alternative(render_to_string('rh/email/validade_documentos.html', contexto), 'text/html')
+    return mensagem.send()
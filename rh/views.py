@@ -5,13 +5,17 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
-from django.db.models import Count, Sum, Avg, Q
-from django.http import HttpResponse, JsonResponse
+from django.db.models import Count, Sum, Avg, Q, Prefetch
+from django.http import HttpResponse, JsonResponse, Http404
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
 from django.template.loader import render_to_string
 from django.core.paginator import Paginator
 from datetime import datetime, timedelta
 import json
+import os
 from django.views.decorators.http import require_POST
+from django.utils.http import url_has_allowed_host_and_scheme
 
 from .models import (
     Empresa, Departamento, Cargo, Funcionario, Ferias, Falta,
@@ -26,6 +30,20 @@ from .forms import (
     FuncionarioSearchForm, FeriasSearchForm, FolhaPagamentoSearchForm
 )
 from .utils import export_to_excel, generate_employee_report, generate_payroll_report
+from .instrumentacao import registro, formatar_json, formatar_prometheus
+from .calendario import dias_uteis, eh_dia_util
+from .cobertura import verificar_cobertura, cobertura_bloqueia, ausentes_por_dia
+from .arquivos import ARQUIVOS_PROTEGIDOS, resposta_arquivo
+from .armazenamento import hash_do_nome
+from .validade_documentos import resumo_validade
+from .indexacao_documentos import pesquisar
+from .pesquisa import buscar
+from .cache_empresa import condicional, invalidar, pagina_em_cache
+from .dashboard import WIDGETS, renderizar
+from .referencia import dados_referencia
+from .parciais import partes_fragmento, render_lista, so_tabela, variar_por_fragmento
+from .linha_tempo import linha_tempo, CursorInvalido
+from .saldo_ferias import TransicaoInvalida, alterar_status, alterar_status_em_lote, aprovar
 
 
 # Views de Autenticação
@@ -55,52 +73,27 @@ def logout_view(request):
 # Dashboard
 @login_required
 def dashboard(request):
+    # Só o esqueleto: cada widget é carregado à parte (ver rh.dashboard)
+    return render(request, 'rh/dashboard.html')
 
-    empresa = request.user.empresa
 
-    # Estatísticas gerais
-    total_funcionarios = Funcionario.objects.filter(empresa=empresa, status='Ativo').count()
-    total_departamentos = Departamento.objects.filter(empresa=empresa, ativo=True).count()
-    total_cargos = Cargo.objects.filter(empresa=empresa, ativo=True).count()
-    
-    # Funcionários por departamento
-    funcionarios_por_departamento = Departamento.objects.filter(funcionario__empresa=empresa, ativo=True).annotate(
-        total_funcionarios=Count('funcionario', filter=Q(funcionario__status='Ativo'))
-    ).order_by('-total_funcionarios')[:5]
-    
-    # Férias recentes
-    ferias_recentes = Ferias.objects.filter(funcionario__empresa=empresa, status__in=['Aprovada', 'Solicitada']).order_by('-solicitada_em')[:5]
-    
-    # Aniversariantes do mês
-    mes_atual = datetime.now().month
-    aniversariantes = Funcionario.objects.filter(
-        empresa=empresa,
-        data_nascimento__month=mes_atual,
-        status='Ativo'
-    ).order_by('data_nascimento__day')[:10]
-    
-    # Funcionários recentes (últimos 30 dias)
-    trinta_dias_atras = datetime.now() - timedelta(days=30)
-    funcionarios_recentes = Funcionario.objects.filter(
-        empresa=empresa,
-        data_admissao__gte=trinta_dias_atras,
-        status='Ativo'
-    ).count()
-    
-    context = {
-        'total_funcionarios': total_funcionarios,
-        'total_departamentos': total_departamentos,
-        'total_cargos': total_cargos,
-        'funcionarios_por_departamento': funcionarios_por_departamento,
-        'ferias_recentes': ferias_recentes,
-        'aniversariantes': aniversariantes,
-        'funcionarios_recentes': funcionarios_recentes,
-    }
-    
-    return render(request, 'rh/dashboard.html', context)
+@login_required
+def dashboard_widget(request, nome):
+    widget = WIDGETS.get(nome)
+    if widget is None:
+        raise Http404
+
+    @condicional(grupos=widget.grupos, por_dia=widget.por_dia)
+    def responder(request):
+        return HttpResponse(renderizar(widget, request))
+
+    return responder(request)
 
 
 # Views de Funcionários
+@method_decorator(pagina_em_cache(
+    'funcionario_list', grupos=['funcionario', 'cargo', 'departamento'], partes_pedido=partes_fragmento
+), name='dispatch')
 class FuncionarioListView(LoginRequiredMixin, ListView):
     model = Funcionario
     template_name = 'rh/funcionario_list.html'
@@ -130,14 +123,44 @@ class FuncionarioListView(LoginRequiredMixin, ListView):
         
         return queryset.order_by('nome_completo')
     
+    def get_template_names(self):
+        if so_tabela(self.request):
+            return ['rh/parciais/funcionario_tabela.html']
+        return super().get_template_names()
+
     def get_context_data(self, **kwargs):
         empresa = self.request.user.empresa
         context = super().get_context_data(**kwargs)
-        context['search_form'] = FuncionarioSearchForm(self.request.GET)
-        context['departamentos'] = Departamento.objects.filter(empresa=empresa, ativo=True)
-        context['cargos'] = Cargo.objects.filter(empresa=empresa, ativo=True)
+        if not so_tabela(self.request):
+            context['search_form'] = FuncionarioSearchForm(self.request.GET, empresa=empresa)
         return context
 
+    def render_to_response(self, context, **response_kwargs):
+        return variar_por_fragmento(super().render_to_response(context, **response_kwargs))
+
+
+# Registos mostrados em cada aba do perfil do funcionário
+PAINEIS_PERFIL = 5
+
+
+def perfil_funcionario_queryset(empresa_id, limite=PAINEIS_PERFIL):
+    """
+    Funcionários da empresa com tudo o que a página de perfil usa: cargo,
+    departamento e turno por JOIN e os últimos `limite` registos de cada
+    aba em Prefetch fatiados (uma consulta por aba, qualquer que seja o
+    histórico), guardados em atributos *_recentes.
+    """
+    return Funcionario.objects.filter(empresa_id=empresa_id).select_related(
+        'cargo', 'departamento', 'turno'
+    ).prefetch_related(
+        Prefetch('ferias', queryset=Ferias.objects.all()[:limite], to_attr='ferias_recentes'),
+        Prefetch('faltas', queryset=Falta.objects.all()[:limite], to_attr='faltas_recentes'),
+        Prefetch('folhas_pagamento', queryset=FolhaPagamento.objects.all()[:limite], to_attr='folhas_recentes'),
+        Prefetch('avaliacoes', queryset=AvaliacaoDesempenho.objects.select_related('avaliador')[:limite],
+                 to_attr='avaliacoes_recentes'),
+        Prefetch('documentos', queryset=Documento.objects.all()[:limite], to_attr='documentos_recentes'),
+    )
+
 
 class FuncionarioDetailView(LoginRequiredMixin, DetailView):
     model = Funcionario
@@ -145,22 +168,33 @@ class FuncionarioDetailView(LoginRequiredMixin, DetailView):
     context_object_name = 'funcionario'
 
     def get_queryset(self):
-        return Funcionario.objects.filter(
-            empresa=self.request.user.empresa
-        )
+        return perfil_funcionario_queryset(self.request.user.empresa_id)
 
-    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        funcionario = self.get_object()
-        context['ferias'] = funcionario.ferias.all()[:5]
-        context['faltas'] = funcionario.faltas.all()[:5]
-        context['folhas_pagamento'] = funcionario.folhas_pagamento.all()[:5]
-        context['avaliacoes'] = funcionario.avaliacoes.all()[:5]
-        context['documentos'] = funcionario.documentos.all()[:5]
+        funcionario = self.object
+        context['ferias'] = funcionario.ferias_recentes
+        context['faltas'] = funcionario.faltas_recentes
+        context['folhas_pagamento'] = funcionario.folhas_recentes
+        context['avaliacoes'] = funcionario.avaliacoes_recentes
+        context['documentos'] = funcionario.documentos_recentes
         return context
 
 
+@login_required
+def funcionario_linha_tempo(request, pk):
+    """Histórico cronológico do funcionário, paginado por cursor (?cursor=...&limite=20)"""
+    funcionario = get_object_or_404(Funcionario, pk=pk, empresa_id=request.user.empresa_id)
+    try:
+        limite = min(max(int(request.GET.get('limite', 20)), 1), 100)
+        eventos, proximo = linha_tempo(funcionario, limite, request.GET.get('cursor'))
+    except (ValueError, CursorInvalido):
+        return JsonResponse({'erro': 'Parâmetros inválidos.'}, status=400)
+    for evento in eventos:
+        evento['data'] = evento['data'].isoformat()
+    return JsonResponse({'eventos': eventos, 'proximo': proximo})
+
+
 class FuncionarioCreateView(LoginRequiredMixin, CreateView):
     model = Funcionario
     form_class = FuncionarioForm
@@ -218,6 +252,7 @@ class FuncionarioDeleteView(LoginRequiredMixin, DeleteView):
 
 
 # Views de Departamentos
+@method_decorator(pagina_em_cache('departamento_list', grupos=['departamento', 'funcionario']), name='dispatch')
 class DepartamentoListView(LoginRequiredMixin, ListView):
     model = Departamento
     template_name = 'rh/departamento_list.html'
@@ -259,6 +294,7 @@ class DepartamentoUpdateView(LoginRequiredMixin, UpdateView):
 
 
 # Views de Cargos
+@method_decorator(pagina_em_cache('cargo_list', grupos=['cargo', 'departamento']), name='dispatch')
 class CargoListView(LoginRequiredMixin, ListView):
     model = Cargo
     template_name = 'rh/cargo_list.html'
@@ -301,17 +337,22 @@ class CargoUpdateView(LoginRequiredMixin, UpdateView):
 from django.http import JsonResponse
 
 @login_required
+@condicional(grupos=['cargo'])
 def obter_salario_cargo(request):
-    cargo_id = request.GET.get('cargo_id')
-
+    salarios = dados_referencia(request.user.empresa_id).salarios
     try:
-        cargo = Cargo.objects.get(
-            id=cargo_id,
-            empresa=request.user.empresa
-        )
-        return JsonResponse({'salario': float(cargo.salario_base)})
-    except Cargo.DoesNotExist:
-        return JsonResponse({'salario': 0})
+        salario = salarios.get(int(request.GET.get('cargo_id')), 0)
+    except (TypeError, ValueError):
+        salario = 0
+    return JsonResponse({'salario': float(salario)})
+
+
+@login_required
+@condicional(grupos=['cargo'])
+def salarios_cargos(request):
+    """Mapa cargo -> salário base dos cargos ativos, pedido uma vez por formulário"""
+    salarios = dados_referencia(request.user.empresa_id).salarios
+    return JsonResponse({'salarios': {str(pk): float(valor) for pk, valor in salarios.items()}})
 
 
 
@@ -336,15 +377,20 @@ def ferias_list(request):
     if ano:
         ferias = ferias.filter(data_inicio__year=ano)
     
-    paginator = Paginator(ferias, 10)
+    # Páginas maiores para as aprovações em lote
+    por_pagina = request.GET.get('por_pagina')
+    por_pagina = int(por_pagina) if por_pagina in ('10', '50', '200') else 10
+    paginator = Paginator(ferias, por_pagina)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
     context = {
         'page_obj': page_obj,
-        'search_form': FeriasSearchForm(request.GET),
+        'por_pagina': por_pagina,
     }
-    return render(request, 'rh/ferias_list.html', context)
+    if not so_tabela(request):
+        context['search_form'] = FeriasSearchForm(request.GET, empresa=empresa)
+    return render_lista(request, 'rh/ferias_list.html', 'rh/parciais/ferias_tabela.html', context)
 
 
 @login_required
@@ -359,12 +405,15 @@ def ferias_create(request):
                 id=ferias.funcionario.id,
             )
             # Calcular dias automaticamente
-            dias_totais = (ferias.data_fim - ferias.data_inicio).days + 1
-            dias_uteis = sum(1 for i in range(dias_totais) 
-                           if (ferias.data_inicio + timedelta(days=i)).weekday() < 5)
-            ferias.dias_totais = dias_totais
-            ferias.dias_uteis = dias_uteis
+            ferias.dias_totais = (ferias.data_fim - ferias.data_inicio).days + 1
+            ferias.dias_uteis = dias_uteis(ferias.data_inicio, ferias.data_fim, ferias.empresa_id)
+            cobertura = verificar_cobertura(ferias)
+            if cobertura.excedido and cobertura_bloqueia():
+                form.add_error(None, cobertura.mensagem())
+                return render(request, 'rh/ferias_form.html', {'form': form})
             ferias.save()
+            if cobertura.excedido:
+                messages.warning(request, cobertura.mensagem())
             messages.success(request, 'Solicitação de férias criada com sucesso!')
             return redirect('ferias_list')
     else:
@@ -375,12 +424,20 @@ def ferias_create(request):
 
 @login_required
 def ferias_aprovar(request, pk):
-    ferias = get_object_or_404(Ferias, pk=pk, funcionario__empresa=request.user.empresa)
+    ferias = get_object_or_404(
+        Ferias.objects.select_related('funcionario'), pk=pk, funcionario__empresa=request.user.empresa
+    )
     if request.method == 'POST':
-        ferias.status = 'Aprovada'
-        ferias.aprovada_em = datetime.now()
-        ferias.aprovada_por = request.user
-        ferias.save()
+        try:
+            resultado = aprovar(ferias, request.user)
+        except TransicaoInvalida as erro:
+            messages.error(request, str(erro))
+            return redirect('ferias_list')
+        if not resultado.aprovada:
+            messages.error(request, resultado.erro)
+            return redirect('ferias_list')
+        if resultado.cobertura.excedido:
+            messages.warning(request, resultado.cobertura.mensagem())
         messages.success(request, f'Férias de {ferias.funcionario.nome_completo} aprovadas!')
     return redirect('ferias_list')
 
@@ -389,12 +446,141 @@ def ferias_aprovar(request, pk):
 def ferias_rejeitar(request, pk):
     ferias = get_object_or_404(Ferias, pk=pk, funcionario__empresa=request.user.empresa)
     if request.method == 'POST':
-        ferias.status = 'Rejeitada'
-        ferias.save()
-        messages.warning(request, f'Férias de {ferias.funcionario.nome_completo} rejeitadas.')
+        try:
+            alterar_status(ferias, 'Rejeitada')
+        except TransicaoInvalida as erro:
+            messages.error(request, str(erro))
+        else:
+            messages.warning(request, f'Férias de {ferias.funcionario.nome_completo} rejeitadas.')
+    return redirect('ferias_list')
+
+
+def _voltar_para_lista(request):
+    # Mantém filtros e página da lista, sem permitir redirecionamento externo
+    proximo = request.POST.get('proximo', '')
+    if url_has_allowed_host_and_scheme(proximo, allowed_hosts={request.get_host()}):
+        return proximo
+    return 'ferias_list'
+
+
+@login_required
+@require_POST
+def ferias_acao_em_lote(request):
+    acao = request.POST.get('acao')
+    status = {'aprovar': 'Aprovada', 'rejeitar': 'Rejeitada'}.get(acao)
+    ids = [pk for pk in request.POST.getlist('ids') if pk.isdigit()]
+    if status is None or not ids:
+        messages.error(request, 'Selecione as solicitações e a ação a executar.')
+        return redirect(_voltar_para_lista(request))
+
+    resultado = alterar_status_em_lote(request.user.empresa, ids, status, request.user)
+    if resultado.alteradas:
+        texto = 'aprovadas' if status == 'Aprovada' else 'rejeitadas'
+        messages.success(request, f'{len(resultado.alteradas)} solicitações de férias {texto}.')
+    for ferias in resultado.sem_saldo:
+        messages.error(request, f'{ferias.funcionario.nome_completo}: saldo de férias insuficiente.')
+    for ferias, cobertura in resultado.sem_cobertura:
+        messages.error(request, f'{ferias.funcionario.nome_completo}: {cobertura.mensagem()}')
+    for ferias, cobertura in resultado.avisos:
+        messages.warning(request, f'{ferias.funcionario.nome_completo}: {cobertura.mensagem()}')
+    if resultado.ignoradas:
+        messages.info(request, f'{resultado.ignoradas} selecionadas já não estavam pendentes.')
+    return redirect(_voltar_para_lista(request))
+
+
+@login_required
+def ferias_cancelar(request, pk):
+    ferias = get_object_or_404(Ferias, pk=pk, funcionario__empresa=request.user.empresa)
+    if request.method == 'POST':
+        try:
+            alterar_status(ferias, 'Cancelada')
+        except TransicaoInvalida as erro:
+            messages.error(request, str(erro))
+        else:
+            messages.warning(request, f'Férias de {ferias.funcionario.nome_completo} canceladas.')
     return redirect('ferias_list')
 
 
+# Calendário (Gantt) de férias por departamento
+STATUS_CALENDARIO = ['Solicitada', 'Aprovada', 'Gozada']
+
+
+def _janela_calendario(request):
+    """Lê inicio/fim (AAAA-MM-DD) do GET; padrão é o ano corrente. Máximo de 3 anos."""
+    hoje = datetime.now().date()
+    try:
+        inicio = datetime.strptime(request.GET['inicio'], '%Y-%m-%d').date() if request.GET.get('inicio') else hoje.replace(month=1, day=1)
+        fim = datetime.strptime(request.GET['fim'], '%Y-%m-%d').date() if request.GET.get('fim') else inicio.replace(month=12, day=31)
+    except ValueError:
+        return None
+    if fim < inicio or (fim - inicio).days > 3 * 366:
+        return None
+    return inicio, fim
+
+
+@login_required
+def ferias_calendario(request):
+    departamentos = Departamento.objects.filter(empresa=request.user.empresa, ativo=True).order_by('nome')
+    return render(request, 'rh/ferias_calendario.html', {'departamentos': departamentos})
+
+
+@login_required
+def ferias_calendario_data(request):
+    """
+    Férias da empresa (ou de um departamento) que intersectam a janela,
+    numa única consulta por intervalo. Cada funcionário traz um vetor
+    compacto [inicio, fim, status, id] com deslocamentos em dias a partir
+    de `inicio`; as contagens diárias vêm de uma varredura sobre os eventos.
+    """
+    janela = _janela_calendario(request)
+    if janela is None:
+        return JsonResponse({'erro': 'Janela inválida (use inicio/fim AAAA-MM-DD, até 3 anos).'}, status=400)
+    inicio, fim = janela
+
+    ferias = Ferias.objects.filter(
+        empresa=request.user.empresa,
+        status__in=STATUS_CALENDARIO,
+        data_fim__gte=inicio,
+        data_inicio__lte=fim,
+    )
+    departamento_id = request.GET.get('departamento')
+    if departamento_id:
+        if not departamento_id.isdigit():
+            return JsonResponse({'erro': 'Departamento inválido.'}, status=400)
+        ferias = ferias.filter(funcionario__departamento_id=int(departamento_id))
+    linhas = ferias.order_by('funcionario__nome_completo', 'data_inicio').values_list(
+        'id', 'funcionario_id', 'funcionario__nome_completo', 'funcionario__departamento__sigla',
+        'data_inicio', 'data_fim', 'status',
+    )
+
+    indice_status = {status: i for i, status in enumerate(STATUS_CALENDARIO)}
+    funcionarios = {}
+    confirmadas = []
+    previstas = []
+    for pk, func_id, nome, sigla, data_inicio, data_fim, status in linhas:
+        item = funcionarios.get(func_id)
+        if item is None:
+            item = funcionarios[func_id] = {'id': func_id, 'nome': nome, 'departamento': sigla, 'intervalos': []}
+        item['intervalos'].append([
+            max((data_inicio - inicio).days, 0),
+            min((data_fim - inicio).days, (fim - inicio).days),
+            indice_status[status],
+            pk,
+        ])
+        previstas.append((func_id, data_inicio, data_fim))
+        if status != 'Solicitada':
+            confirmadas.append((func_id, data_inicio, data_fim))
+
+    return JsonResponse({
+        'inicio': inicio.isoformat(),
+        'fim': fim.isoformat(),
+        'status': STATUS_CALENDARIO,
+        'funcionarios': list(funcionarios.values()),
+        'ausentes': ausentes_por_dia(confirmadas, inicio, fim),
+        'ausentes_previstos': ausentes_por_dia(previstas, inicio, fim),
+    })
+
+
 # Views de Faltas
 class FaltaListView(LoginRequiredMixin, ListView):
     model = Falta
@@ -456,11 +642,23 @@ def folha_pagamento_list(request):
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
+    # Resumo financeiro dos filtros aplicados numa única agregação
+    resumo = folhas.aggregate(
+        total_liquido=Sum('salario_liquido'),
+        total_base=Sum('salario_base'),
+        total_inss=Sum('inss'),
+        total_irrf=Sum('irrf'),
+    )
+    
     context = {
         'page_obj': page_obj,
-        'search_form': FolhaPagamentoSearchForm(request.GET),
+        'resumo': resumo,
     }
-    return render(request, 'rh/folha_pagamento_list.html', context)
+    if not so_tabela(request):
+        context['search_form'] = FolhaPagamentoSearchForm(request.GET, empresa=empresa)
+    return render_lista(
+        request, 'rh/folha_pagamento_list.html', 'rh/parciais/folha_pagamento_tabela.html', context
+    )
 
 
 @login_required
@@ -542,6 +740,19 @@ class DocumentoCreateView(LoginRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
+@login_required
+def documentos_validade(request):
+    resumo = resumo_validade(request.user.empresa, timezone.localdate())
+    return render(request, 'rh/documento_validade.html', {'resumo': resumo})
+
+
+@login_required
+def documentos_busca(request):
+    consulta = request.GET.get('q', '').strip()
+    resultados = pesquisar(request.user.empresa_id, consulta) if consulta else []
+    return render(request, 'rh/documento_busca.html', {'consulta': consulta, 'resultados': resultados})
+
+
 # Views de Treinamentos
 class TreinamentoListView(LoginRequiredMixin, ListView):
     model = Treinamento
@@ -594,6 +805,7 @@ class AdvertenciaCreateView(LoginRequiredMixin, CreateView):
 
 
 # Views de Benefícios
+@method_decorator(pagina_em_cache('beneficio_list', grupos=['beneficio']), name='dispatch')
 class BeneficioListView(LoginRequiredMixin, ListView):
     model = Beneficio
     template_name = 'rh/beneficio_list.html'
@@ -652,6 +864,7 @@ def relatorios(request):
 
 # API para gráficos do dashboard
 @login_required
+@condicional(grupos=['departamento', 'funcionario', 'ferias'], por_dia=True)
 def dashboard_data(request):
     empresa = request.user.empresa
     # Dados para gráficos
@@ -691,6 +904,49 @@ def dashboard_data(request):
     return JsonResponse(data)
 
 
+# Download de ficheiros protegidos (ver rh.arquivos)
+@login_required
+def arquivo_protegido(request, tipo, pk):
+    if tipo not in ARQUIVOS_PROTEGIDOS:
+        raise Http404
+    modelo, campo = ARQUIVOS_PROTEGIDOS[tipo]
+    campos = [campo, 'tipo_mime'] if hasattr(modelo, 'tipo_mime') else [campo]
+    registro_arquivo = get_object_or_404(modelo.objects.only(*campos), pk=pk, empresa_id=request.user.empresa_id)
+    arquivo = getattr(registro_arquivo, campo)
+    if not arquivo:
+        raise Http404
+    # Blobs deduplicados têm o hash como nome; o utilizador recebe um nome legível
+    nome = f'{tipo}-{pk}{os.path.splitext(arquivo.name)[1]}' if hash_do_nome(arquivo.name) else None
+    try:
+        response = resposta_arquivo(
+            request, arquivo, como_anexo='download' in request.GET, nome=nome,
+            tipo_mime=getattr(registro_arquivo, 'tipo_mime', None),
+        )
+    except FileNotFoundError:
+        raise Http404
+    patch_cache_control(response, private=True, max_age=0)
+    return response
+
+
+@login_required
+def pesquisa_global(request):
+    resultados = buscar(request.user.empresa_id, request.GET.get('q', ''))
+    return JsonResponse({'resultados': resultados})
+
+
+# Métricas de desempenho por view
+@login_required
+def metricas(request):
+    if not request.user.is_staff:
+        return HttpResponse(status=403)
+
+    snapshot = registro.snapshot()
+    formato = request.GET.get('formato')
+    if formato == 'prometheus' or (formato is None and 'text/plain' in request.headers.get('Accept', '')):
+        return HttpResponse(formatar_prometheus(snapshot), content_type='text/plain; version=0.0.4; charset=utf-8')
+    return JsonResponse(formatar_json(snapshot))
+
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
@@ -785,16 +1041,22 @@ def faltas_do_dia(request):
     funcionarios_com_presenca = Presenca.objects.filter(empresa=empresa, data=data_atual).values_list('funcionario_id', flat=True)
     faltas_hoje = Funcionario.objects.filter(empresa=empresa, status='Ativo').exclude(id__in=funcionarios_com_presenca)
     
-    # Criar presenças como falta para quem não marcou
-    for funcionario in faltas_hoje:
-        Presenca.objects.filter(empresa=empresa).get_or_create(
-            funcionario=funcionario,
-            data=data_atual,
-            defaults={'status': 'Falta', 'registrada_por': request.user}
+    # Criar presenças como falta para quem não marcou (uma única inserção em lote),
+    # exceto em fins de semana e feriados
+    if eh_dia_util(data_atual, empresa.id):
+        Presenca.objects.bulk_create(
+            [
+                Presenca(empresa=empresa, funcionario_id=funcionario_id, data=data_atual,
+                         status='Falta', registrada_por=request.user)
+                for funcionario_id in faltas_hoje.values_list('id', flat=True)
+            ],
+            batch_size=500,
+            ignore_conflicts=True,
         )
+        invalidar(empresa.id, 'presenca')
     
     # Buscar todas as faltas do dia
-    presencas_falta = Presenca.objects.filter(empresa=empresa, data=data_atual, status__in=['Falta', 'Falta_Justificada']).select_related('funcionario', 'justificativa')
+    presencas_falta = Presenca.objects.filter(empresa=empresa, data=data_atual, status__in=['Falta', 'Falta_Justificada']).select_related('funcionario__departamento', 'funcionario__turno', 'justificativa')
     
     if request.method == 'POST':
         presenca_id = request.POST.get('presenca_id')
@@ -859,8 +1121,8 @@ def gerar_folha_moz(request):
             # Calcular horas trabalhadas no mês
             horas_trabalhadas = sum(p.horas_trabalhadas for p in presencas_mes)
             
-            # Calcular salário por hora
-            salario_hora = calcular_salario_por_hora(funcionario.salario_atual, funcionario.turno)
+            # Calcular salário por hora (dias úteis reais do mês)
+            salario_hora = calcular_salario_por_hora(funcionario.salario_atual, funcionario.turno, ano, mes)
             
             # Calcular salário bruto baseado nas horas trabalhadas
             salario_bruto = horas_trabalhadas * salario_hora
@@ -925,7 +1187,7 @@ def payslip_pdf(request, funcionario_id, mes, ano):
     )
     
     horas_trabalhadas = sum(p.horas_trabalhadas for p in presencas_mes)
-    salario_hora = calcular_salario_por_hora(funcionario.salario_atual, funcionario.turno)
+    salario_hora = calcular_salario_por_hora(funcionario.salario_atual, funcionario.turno, ano, mes)
     salario_bruto = horas_trabalhadas * salario_hora
     inss = calcular_inss_moz(salario_bruto)
     irps = calcular_irps_moz(salario_bruto, inss)